@@ -0,0 +1,73 @@
+import argparse
+import os
+
+
+def main() -> None:
+    """
+    Headless entry point: python -m src config.json --results-dir results
+    """
+    parser = argparse.ArgumentParser(description='Runs the pipeline without plotting and writes '
+                                                 'all preparer outputs to a results directory.')
+    parser.add_argument('config', help='path of the JSON config file (see BatchRunner)')
+    parser.add_argument('--results-dir', default='results',
+                        help='directory where the outputs are written')
+    parser.add_argument('--data-folder', default=None,
+                        help='path of the data folder, overrides data_folder_path of the config')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='maximal number of workers used for building the datasets')
+    parser.add_argument('--no-processes', action='store_true',
+                        help='run the handlers on threads instead of worker processes')
+    parser.add_argument('--backend', default=None, choices=['pandas', 'pyarrow', 'polars', 'auto'],
+                        help='engine used for loading and reshaping the data, overrides backend '
+                             'of the config')
+    parser.add_argument('--db', default=None,
+                        help='path of an SQLite database where the outputs are also saved')
+    parser.add_argument('--serve', type=int, default=None, metavar='PORT',
+                        help='instead of writing results, build the datasets and answer preparer '
+                             'queries on this local port (see QueryService)')
+    parser.add_argument('--profile', action='store_true',
+                        help='profile the main process with cProfile, stats are written to '
+                             'profile.prof in the results directory (time spent in the worker '
+                             'pools shows up as waiting time)')
+    args = parser.parse_args()
+
+    from src.batch_runner import BatchRunner
+
+    config = BatchRunner.load_config(config_path=args.config)
+    if args.data_folder is not None:
+        config['data_folder_path'] = args.data_folder
+    if args.backend is not None:
+        config['backend'] = args.backend
+
+    runner = BatchRunner(
+        config=config,
+        results_dir=args.results_dir,
+        max_workers=args.workers,
+        use_processes=not args.no_processes,
+        db_path=args.db
+    )
+
+    if args.serve is not None:
+        from src.query_service import QueryService
+
+        QueryService(runner=runner).serve(port=args.serve)
+        return
+
+    if not args.profile:
+        runner.run()
+        return
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    runner.run()
+    profiler.disable()
+
+    profiler.dump_stats(os.path.join(args.results_dir, 'profile.prof'))
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,39 +3,95 @@ import os
 import numpy as np
 import pandas as pd
 
+from src.analysis.partitioned_writer import PartitionedWriter
+from src.analysis.ragged_series import RaggedSeries
+from src.data_handling.crossing_index import CrossingIndex
+
 
 class DataAligner:
 
     @staticmethod
-    def align_data(data: pd.DataFrame) -> pd.DataFrame:
+    def align_data(data: pd.DataFrame, threshold: float = None) -> pd.DataFrame:
         """
-        Aligns data in the given dataframe. The first elements of the new columns are the first
-        nonzero elements of the old columns.
+        Aligns data in the given dataframe. If threshold is None, the first elements of the new
+        columns are the first nonzero elements of the old columns. Otherwise they are the first
+        elements reaching the threshold (e.g. 1 death/million), columns never reaching it are
+        left empty. All columns are shifted with one array operation.
         :param pd.DataFrame data: the given dataframe
+        :param float threshold: the alignment threshold
         :return pd.DataFrame: the aligned dataframe
         """
+        values = data.to_numpy(dtype=float)
         max_len = len(data)
-        new_dict = {}
+        start_positions = DataAligner.get_start_positions(data=data, threshold=threshold)
+
+        row_positions = start_positions[None, :] + np.arange(max_len)[:, None]
+        valid = (row_positions < max_len) & (start_positions >= 0)[None, :]
+        aligned = np.where(
+            valid,
+            values[np.minimum(row_positions, max_len - 1), np.arange(values.shape[1])[None, :]],
+            np.nan
+        )
+
+        return pd.DataFrame(aligned, columns=data.columns)
+
+    @staticmethod
+    def align_data_ragged(data: pd.DataFrame, threshold: float = None) -> RaggedSeries:
+        """
+        Aligns data like align_data(), but returns a ragged series, so the NaN padding of the
+        columns starting late is not stored.
+        :param pd.DataFrame data: the given dataframe
+        :param float threshold: the alignment threshold
+        :return RaggedSeries: the aligned data
+        """
+        return RaggedSeries.from_start_positions(
+            data=data,
+            start_positions=DataAligner.get_start_positions(data=data, threshold=threshold)
+        )
 
-        for col in data.columns:
-            nonzero_idx = data[col].ne(0).idxmax()
-            pos_idx = data.index.get_loc(nonzero_idx)
-            shifted = data[col].iloc[pos_idx:].reset_index(drop=True)
-            new_dict[col] = shifted.reindex(range(max_len), fill_value=np.nan)
+    @staticmethod
+    def get_start_positions(data: pd.DataFrame, threshold: float = None) -> np.ndarray:
+        """
+        Gets the row where the aligned data of every column starts: the first nonzero row if
+        threshold is None (the first row if all values are 0), otherwise the first row reaching
+        the threshold (-1 if it is never reached). Missing values (e.g. the first rows of rolling
+        or growth series) do not count as started.
+        :param pd.DataFrame data: the given dataframe
+        :param float threshold: the alignment threshold
+        :return np.ndarray: start positions
+        """
+        if threshold is not None:
+            return CrossingIndex(data=data).get_positions(thresholds=threshold)
+
+        values = data.to_numpy(dtype=float)
+        nonzero = np.isfinite(values) & (values != 0)
 
-        return pd.DataFrame(new_dict)
+        return np.where(nonzero.any(axis=0), nonzero.argmax(axis=0), 0)
 
     @staticmethod
-    def save_aligned(aligned_data: pd.DataFrame, data_folder_path: str) -> None:
+    def save_aligned(aligned_data: pd.DataFrame, data_folder_path: str,
+                     partition: dict = None, decimals: int = None) -> None:
         """
         Saves the transposed of aligned_data (columns are country names, indices are days after
         alignment)
         :param pd.DataFrame aligned_data: the aligned dataframe
         :param str data_folder_path: path of the data folder
+        :param dict partition: if given, aligned_data is saved at full precision with a
+        PartitionedWriter into generated/aligned instead of the csv file. Keys are
+        'dataset', 'index' and optionally 'params' and 'mode', see PartitionedWriter.write()
+        :param int decimals: if given, values of the csv file are rounded to this many decimals,
+        by default they are saved at full precision
         """
         if not os.path.exists(os.path.join(data_folder_path, 'generated')):
             os.makedirs(os.path.join(data_folder_path, 'generated'))
 
-        transposed_df = aligned_data.T.round(2)
+        if partition is not None:
+            writer = PartitionedWriter(root_path=os.path.join(data_folder_path, 'generated', 'aligned'))
+            writer.write(df=aligned_data, **partition)
+            return
+
+        transposed_df = aligned_data.T
+        if decimals is not None:
+            transposed_df = transposed_df.round(decimals)
 
         transposed_df.to_csv(data_folder_path + '/generated/' + 'aligned_values.csv')
@@ -1,6 +1,7 @@
 import json
 import os
 import random
+import threading
 from typing import Tuple
 
 import numpy as np
@@ -12,6 +13,10 @@ class ExcessDeathsPlotPreparer:
     """
     This is a helper class for plotting the excess deaths.
     """
+    # Serializes reading and creating the coordinate file, preparers can run on threads
+    # (see QueryService)
+    x_coordinates_lock = threading.Lock()
+
     def __init__(self, data_if: DataInterface,
                  year: str, week: int, data_folder_path: str):
         """
@@ -30,6 +35,7 @@ class ExcessDeathsPlotPreparer:
         self.y_coordinates = np.array([])
         self.y_medians = []
         self.country_names = []
+        self.group_labels = {}
 
     def run(self) -> None:
         """
@@ -49,6 +55,11 @@ class ExcessDeathsPlotPreparer:
         group2 = ['Belgium', 'Italy', 'Netherlands']
 
         self.country_names = group1 + group2
+        self.group_labels = {
+            country: label
+            for label, group in enumerate([group1, group2], start=1)
+            for country in group
+        }
 
         x_coordinates = self.get_x_coordinates(group1=group1, group2=group2)
         y_coordinates = self.get_y_coordinates()
@@ -62,25 +73,28 @@ class ExcessDeathsPlotPreparer:
         :param list group2: countries without universal BCG policy
         :return list: x coordinates
         """
-        if os.path.exists(os.path.join(self.data_folder_path, 'x_coordinates_excess.json')):
-            with open(os.path.join(self.data_folder_path, 'x_coordinates_excess.json'), 'r') as f:
-                x_coordinates_dict = json.load(f)
-                x_coordinates = x_coordinates_dict['coordinates']
+        file_path = os.path.join(self.data_folder_path, 'x_coordinates_excess.json')
+
+        with self.x_coordinates_lock:
+            if os.path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    x_coordinates_dict = json.load(f)
+                    x_coordinates = x_coordinates_dict['coordinates']
 
-        else:
-            x_range = np.linspace(0, 10, 1001)
+            else:
+                x_range = np.linspace(0, 10, 1001)
 
-            group1_coordinates = random.choices(x_range[200:400], k=len(group1))
-            group2_coordinates = random.choices(x_range[600:800], k=len(group2))
+                group1_coordinates = random.choices(x_range[200:400], k=len(group1))
+                group2_coordinates = random.choices(x_range[600:800], k=len(group2))
 
-            x_coordinates = group1_coordinates + group2_coordinates
+                x_coordinates = group1_coordinates + group2_coordinates
 
-            x_coordinates_dict = {'coordinates': x_coordinates}
+                x_coordinates_dict = {'coordinates': x_coordinates}
 
-            with open(os.path.join(self.data_folder_path, 'x_coordinates_excess.json'), 'w') as f:
-                json.dump(x_coordinates_dict, f)
+                with open(file_path, 'w') as f:
+                    json.dump(x_coordinates_dict, f)
 
-        return x_coordinates
+            return x_coordinates
 
     def get_y_coordinates(self) -> list:
         """
@@ -96,13 +110,14 @@ class ExcessDeathsPlotPreparer:
 
     def get_y_medians(self) -> None:
         """
-        Gets the medians of the y values in each group.
+        Gets the medians of the y values in each group. Groups are taken from self.group_labels,
+        see GroupStatistics for their uncertainty.
         """
-        cutting_points = [0, 5, 10]
+        labels = np.array([self.group_labels[country] for country in self.country_names])
 
         y_medians = []
-        for i, j in zip(cutting_points[:-1], cutting_points[1:]):
-            y_cut = self.y_coordinates[(i < self.x_coordinates) & (self.x_coordinates <= j)]
+        for label in [1, 2]:
+            y_cut = self.y_coordinates[labels == label]
 
             y_medians.append(np.median(y_cut))
 
@@ -1,6 +1,8 @@
+import hashlib
 import json
 import os
 import random
+import threading
 from typing import Tuple
 
 import numpy as np
@@ -12,24 +14,33 @@ class GermanyStatesPlotPreparer:
     """
     This is a helper class for plotting the deaths data in different German states.
     """
+    # Serializes reading and creating the coordinate file, preparers can run on threads
+    # (see QueryService)
+    x_coordinates_lock = threading.Lock()
+
     def __init__(self, data_if: DataInterface, year: str, week: int,
-                 data_folder_path: str):
+                 data_folder_path: str, groups: dict = None):
         """
         Constructor.
         :param DataInterface data_if: a DataInterface instance
         :param str year: year as a string
         :param int week: week of the year
         :param str data_folder_path: path of the data folder
+        :param dict groups: dictionary mapping states (or other regions) to groups, e.g.
+        RegionalDataHandler.get_groups('East-West'). If None, the west and east german states
+        are compared.
         """
         self.data = data_if.deaths_df
         week_str = str(week) if week >= 10 else f'0{week}'
         self.week_date = year + '-W' + week_str
         self.data_folder_path = data_folder_path
+        self.groups = groups
 
         self.x_coordinates = np.array([])
         self.y_coordinates = np.array([])
         self.y_means = []
         self.state_names = []
+        self.group_labels = {}
 
     def run(self) -> None:
         """
@@ -45,43 +56,66 @@ class GermanyStatesPlotPreparer:
         Function for getting the x and y coordinates.
         :return Tuple[np.ndarray, np.ndarray]: x and y coordinates in a tuple
         """
-        west = ['Bayern', 'Nordrhein-Westfalen', 'Baden-Württemberg', 'Niedersachsen', 'Hessen', 'Rheinland-Pfalz',
-                'Saarland', 'Schleswig-Holstein']
-        east = ['Brandenburg', 'Thüringen', 'Sachsen-Anhalt', 'Mecklenburg-Vorpommern', 'Sachsen']
-
-        self.state_names = west + east
-
-        x_coordinates = self.get_x_coordinates(group1=west, group2=east)
+        if self.groups is None:
+            west = ['Bayern', 'Nordrhein-Westfalen', 'Baden-Württemberg', 'Niedersachsen', 'Hessen',
+                    'Rheinland-Pfalz', 'Saarland', 'Schleswig-Holstein']
+            east = ['Brandenburg', 'Thüringen', 'Sachsen-Anhalt', 'Mecklenburg-Vorpommern', 'Sachsen']
+            state_groups = [west, east]
+        else:
+            state_groups = [
+                [state for state, group in self.groups.items() if group == group_name]
+                for group_name in dict.fromkeys(self.groups.values())
+            ]
+
+        self.state_names = [state for group in state_groups for state in group]
+        self.group_labels = {
+            state: label
+            for label, group in enumerate(state_groups, start=1)
+            for state in group
+        }
+
+        x_coordinates = self.get_x_coordinates(groups=state_groups)
         y_coordinates = self.get_y_coordinates()
 
         return np.array(x_coordinates), np.array(y_coordinates)
 
-    def get_x_coordinates(self, group1: list, group2: list) -> list:
+    def get_x_coordinates(self, groups: list) -> list:
         """
-        Gets or reads the random x coordinates.
-        :param list group1: west german states
-        :param list group2: east german states
+        Gets or reads the random x coordinates. Every group gets its own band of the x axis.
+        Coordinates of the default west-east grouping are saved in
+        x_coordinates_germany_states.json, those of other groupings in a file named by the hash of
+        the groups. A saved file is rebuilt if its number of coordinates does not match.
+        :param list groups: list of groups (lists of states), e.g. west and east german states
         :return list: x coordinates
         """
-        if os.path.exists(os.path.join(self.data_folder_path, 'x_coordinates_germany_states.json')):
-            with open(os.path.join(self.data_folder_path, 'x_coordinates_germany_states.json'), 'r') as f:
-                x_coordinates_dict = json.load(f)
-                x_coordinates = x_coordinates_dict['coordinates']
-
-        else:
-            x_range = np.linspace(0, 6, 601)
-
-            group1_coordinates = random.choices(x_range[50:250], k=len(group1))
-            group2_coordinates = random.choices(x_range[350:550], k=len(group2))
-
-            x_coordinates = group1_coordinates + group2_coordinates
+        file_name = 'x_coordinates_germany_states.json'
+        if self.groups is not None:
+            groups_hash = hashlib.sha1(json.dumps(groups).encode()).hexdigest()[:16]
+            file_name = f'x_coordinates_germany_states_{groups_hash}.json'
+        file_path = os.path.join(self.data_folder_path, file_name)
+        n_states = sum(len(group) for group in groups)
+
+        with self.x_coordinates_lock:
+            if os.path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    x_coordinates = json.load(f)['coordinates']
+                if len(x_coordinates) == n_states:
+                    return x_coordinates
+
+            # Bands split the [0, 6] axis, a sixth of each band is left empty on both sides
+            band_width = 6 / len(groups)
+            x_coordinates = []
+            for i, group in enumerate(groups):
+                band = np.linspace(i * band_width + band_width / 6,
+                                   (i + 1) * band_width - band_width / 6, 200, endpoint=False)
+                x_coordinates += random.choices(band.tolist(), k=len(group))
 
             x_coordinates_dict = {'coordinates': x_coordinates}
 
-            with open(os.path.join(self.data_folder_path, 'x_coordinates_germany_states.json'), 'w') as f:
+            with open(file_path, 'w') as f:
                 json.dump(x_coordinates_dict, f)
 
-        return x_coordinates
+            return x_coordinates
 
     def get_y_coordinates(self) -> list:
         """
@@ -97,13 +131,14 @@ class GermanyStatesPlotPreparer:
 
     def get_y_means(self) -> None:
         """
-        Gets the mean of the y values in each group.
+        Gets the mean of the y values in each group. Groups are taken from self.group_labels,
+        see GroupStatistics for their uncertainty.
         """
-        cutting_points = [0, 3, 6]
+        labels = np.array([self.group_labels[state] for state in self.state_names])
 
         y_means = []
-        for i, j in zip(cutting_points[:-1], cutting_points[1:]):
-            y_cut = self.y_coordinates[(i < self.x_coordinates) & (self.x_coordinates <= j)]
+        for label in sorted(set(labels)):
+            y_cut = self.y_coordinates[labels == label]
 
             y_means.append(np.mean(y_cut))
 
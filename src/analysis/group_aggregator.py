@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from src.data_handling.country_catalog import CountryCatalog
+from src.data_handling.data_interface import DataInterface
+
+
+class GroupAggregator:
+    """
+    This class computes population-weighted per million time series of groups of countries
+    (e.g. income groups, BCG policies, continents) over the whole history. Groups are built from
+    the metadata into a sparse country x group membership matrix, a country can belong to
+    several groups. The series of all groups are computed with one sparse matrix product.
+    """
+    # The groups of GroupPlotPreparer.get_groups()
+    paper_groups = {
+        'group 1': 'income == 2 and bcg_policy == 1',
+        'group 2': 'income in [3, 4] and bcg_policy == 1',
+        'group 3': 'income in [3, 4] and bcg_policy == 3'
+    }
+
+    def __init__(self, data_if: DataInterface, groupings: dict, data_type: str = 'deaths',
+                 min_population: float = None):
+        """
+        Constructor.
+        :param DataInterface data_if: a DataInterface instance (its meta_data has a 'Population'
+        column and the grouping columns)
+        :param dict groupings: dictionary mapping names of groupings either to a column of the
+        metadata (every value of the column is a group, e.g. 'income') or to a dictionary mapping
+        group names to queries on the metadata (e.g. GroupAggregator.paper_groups)
+        :param str data_type: 'deaths', 'cases' or a series derived from them, the values are
+        per million, see DataInterface.get_series()
+        :param float min_population: if given, only countries with at least this many
+        inhabitants are aggregated
+        """
+        self.data = data_if.get_series(data_type=data_type)
+        self.meta_data = data_if.meta_data
+        self.groupings = groupings
+        self.min_population = min_population
+
+        self.countries = []
+        self.groups = pd.DataFrame()
+        self.membership = None
+        self.aggregates = pd.DataFrame()
+
+    def run(self) -> None:
+        """
+        Run function. Builds the membership matrix, then gets the aggregate series of all groups.
+        """
+        self.check_columns()
+
+        population = self.get_population()
+        self.countries = CountryCatalog.shared().intersect(self.data.columns, population.index)
+        population = population.loc[self.countries].to_numpy(dtype=float)
+
+        self.membership, self.groups = self.get_membership_matrix()
+
+        self.aggregates = self.get_aggregates(population=population)
+
+    def check_columns(self) -> None:
+        """
+        Checks that the metadata has the population and the grouping columns (e.g. the metadata of
+        the Johns Hopkins data only has the population).
+        """
+        columns = ['Population'] + [definition for definition in self.groupings.values()
+                                    if isinstance(definition, str)]
+        missing = [column for column in columns if column not in self.meta_data.columns]
+        if missing:
+            raise Exception(f'Columns {", ".join(missing)} are not in the metadata, it has '
+                            f'{", ".join(map(str, self.meta_data.columns))}.')
+
+    def get_population(self) -> pd.Series:
+        """
+        Gets the population of the countries having one.
+        :return pd.Series: population indexed by countries
+        """
+        population = pd.to_numeric(
+            self.meta_data['Population'].astype(str).str.replace(',', ''), errors='coerce'
+        ).dropna()
+        if self.min_population is not None:
+            population = population[population >= self.min_population]
+
+        return population[~population.index.duplicated(keep='first')]
+
+    def get_membership_matrix(self) -> tuple:
+        """
+        Creates the sparse country x group membership matrix, an element is 1 if the country
+        belongs to the group.
+        :return tuple: the sparse matrix and a dataframe describing the groups (their grouping,
+        name and number of members)
+        """
+        from scipy import sparse
+
+        meta_data = self.meta_data.loc[self.countries]
+        country_positions, group_positions, group_rows = [], [], []
+        for grouping, definition in self.groupings.items():
+            if isinstance(definition, str):
+                codes, values = pd.factorize(meta_data[definition], sort=True)
+                members = {value: np.flatnonzero(codes == code) for code, value in enumerate(values)}
+            else:
+                members = {}
+                for name, query in definition.items():
+                    try:
+                        members[name] = np.flatnonzero(meta_data.eval(query).to_numpy(dtype=bool))
+                    except NameError as error:
+                        raise Exception(f'Query {query} of group {name} uses a column that is not '
+                                        f'in the metadata: {error}.')
+
+            for name, positions in members.items():
+                country_positions.append(positions)
+                group_positions.append(np.full(len(positions), len(group_rows)))
+                group_rows.append({'grouping': grouping, 'group': name, 'n_countries': len(positions)})
+
+        rows = np.concatenate(country_positions) if country_positions else np.array([], dtype=int)
+        columns = np.concatenate(group_positions) if group_positions else np.array([], dtype=int)
+        membership = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, columns)), shape=(len(self.countries), len(group_rows))
+        )
+
+        return membership, pd.DataFrame(group_rows, columns=['grouping', 'group', 'n_countries'])
+
+    def get_aggregates(self, population: np.ndarray) -> pd.DataFrame:
+        """
+        Gets the population-weighted per million series of every group:
+        sum(value * population) / sum(population) over the members having data on that date.
+        The weighted values and the weights of the present members are stacked, so every group
+        and date is computed with one sparse product.
+        :param np.ndarray population: population of self.countries
+        :return pd.DataFrame: indices are dates, columns are (grouping, group) pairs
+        """
+        values = self.data[self.countries].to_numpy(dtype=float)
+        present = np.isfinite(values)
+        weighted = np.where(present, values, 0.) * population
+        weights = present * population
+
+        sums = (self.membership.T @ np.concatenate([weighted, weights]).T).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            aggregates = sums[:len(values)] / sums[len(values):]
+
+        return pd.DataFrame(
+            aggregates,
+            index=self.data.index,
+            columns=pd.MultiIndex.from_frame(self.groups[['grouping', 'group']])
+        )
@@ -1,11 +1,13 @@
 import json
 import os.path
 import random
-from typing import Tuple
+import threading
+from typing import Tuple, Union
 
 import numpy as np
 import pandas as pd
 
+from src.data_handling.data_interface import DataInterface
 from src.data_handling.who_data_handler import WHODataHandler
 
 
@@ -13,29 +15,36 @@ class GroupPlotPreparer:
     """
     This is a helper class for plotting cases or deaths data grouped by some factors.
     """
-    def __init__(self, data_handler: WHODataHandler, date: str, data_type: str,
+    # Serializes reading and creating the coordinate file, preparers can run on threads
+    # (see QueryService)
+    x_coordinates_lock = threading.Lock()
+
+    def __init__(self, data_handler: Union[WHODataHandler, DataInterface], date: str, data_type: str,
                  data_folder_path: str):
         """
         Constructor.
-        :param WHODataHandler data_handler: a DataHandler instance
+        :param Union[WHODataHandler, DataInterface] data_handler: a DataHandler instance or the
+        DataInterface created by it
         :param str date: we only consider data on this day
-        :param str data_type: either 'cases' or 'deaths'
+        :param str data_type: 'cases', 'deaths' or a series derived from them
+        (e.g. 'deaths_rolling_7'), see DataInterface.get_series()
         :param str data_folder_path: path of the data folder
         """
-        self.dl = data_handler.dl
+        if isinstance(data_handler, DataInterface):
+            data_if = data_handler
+        else:
+            data_if = data_handler.data_if
+        self.meta_data = data_if.meta_data
         self.date = date
         self.data_type = data_type
         self.data_folder_path = data_folder_path
-        if self.data_type == 'cases':
-            self.data = data_handler.data_if.cases_df
-        elif self.data_type == 'deaths':
-            self.data = data_handler.data_if.deaths_df
-        else:
-            raise Exception('data_type can only be cases or deaths')
+        self.data = data_if.get_series(data_type=self.data_type)
 
         self.x_coordinates = np.array([])
         self.y_coordinates = np.array([])
         self.y_medians = []
+        self.country_names = []
+        self.group_labels = {}
 
     def run(self) -> None:
         """
@@ -56,7 +65,7 @@ class GroupPlotPreparer:
         Function for filtering data for countries with more than one million inhabitants
         :return pd.DataFrame: filtered dataframe
         """
-        df_over_one_mil = self.dl.meta_data[self.dl.meta_data['Population'] >= 1000000]
+        df_over_one_mil = self.meta_data[self.meta_data['Population'] >= 1000000]
 
         return df_over_one_mil
 
@@ -70,6 +79,12 @@ class GroupPlotPreparer:
         group1, group2, group3 = self.get_groups(df_over_one_mil=df_over_one_mil)
 
         grouped_countries = group1 + group2 + group3
+        self.country_names = grouped_countries
+        self.group_labels = {
+            country: label
+            for label, group in enumerate([group1, group2, group3], start=1)
+            for country in group
+        }
 
         x_coordinates = self.get_x_coordinates(group1=group1, group2=group2, group3=group3)
         y_coordinates = self.get_y_coordinates(grouped_countries=grouped_countries)
@@ -92,13 +107,14 @@ class GroupPlotPreparer:
 
     def get_y_medians(self) -> None:
         """
-        Gets the medians of the y values in each group.
+        Gets the medians of the y values in each group. Groups are taken from self.group_labels,
+        see GroupStatistics for their uncertainty.
         """
-        cutting_points = [0, 4, 8, 12]
+        labels = np.array([self.group_labels[country] for country in self.country_names])
 
         y_medians = []
-        for i, j in zip(cutting_points[:-1], cutting_points[1:]):
-            y_cut = self.y_coordinates[(i < self.x_coordinates) & (self.x_coordinates <= j)]
+        for label in [1, 2, 3]:
+            y_cut = self.y_coordinates[labels == label]
 
             y_medians.append(np.median(y_cut))
 
@@ -112,26 +128,29 @@ class GroupPlotPreparer:
         :param list group3: group 3 described in the docstring of get_groups()
         :return list: x coordinates
         """
-        if os.path.exists(os.path.join(self.data_folder_path, 'x_coordinates.json')):
-            with open(os.path.join(self.data_folder_path, 'x_coordinates.json'), 'r') as f:
-                x_coordinates_dict = json.load(f)
-                x_coordinates = x_coordinates_dict['coordinates']
+        file_path = os.path.join(self.data_folder_path, 'x_coordinates.json')
 
-        else:
-            x_range = np.linspace(0, 12, 1201)
+        with self.x_coordinates_lock:
+            if os.path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    x_coordinates_dict = json.load(f)
+                    x_coordinates = x_coordinates_dict['coordinates']
+
+            else:
+                x_range = np.linspace(0, 12, 1201)
 
-            group1_coordinates = random.choices(x_range[150:351], k=len(group1))
-            group2_coordinates = random.choices(x_range[500:701], k=len(group2))
-            group3_coordinates = random.choices(x_range[850:1051], k=len(group3))
+                group1_coordinates = random.choices(x_range[150:351], k=len(group1))
+                group2_coordinates = random.choices(x_range[500:701], k=len(group2))
+                group3_coordinates = random.choices(x_range[850:1051], k=len(group3))
 
-            x_coordinates = group1_coordinates + group2_coordinates + group3_coordinates
+                x_coordinates = group1_coordinates + group2_coordinates + group3_coordinates
 
-            x_coordinates_dict = {'coordinates': x_coordinates}
+                x_coordinates_dict = {'coordinates': x_coordinates}
 
-            with open(os.path.join(self.data_folder_path, 'x_coordinates.json'), 'w') as f:
-                json.dump(x_coordinates_dict, f)
+                with open(file_path, 'w') as f:
+                    json.dump(x_coordinates_dict, f)
 
-        return x_coordinates
+            return x_coordinates
 
     @staticmethod
     def get_groups(df_over_one_mil: pd.DataFrame) -> Tuple[list, list, list]:
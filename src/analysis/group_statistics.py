@@ -0,0 +1,214 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+
+def get_statistic(values: np.ndarray, statistic: str) -> np.ndarray:
+    """
+    Computes the median or the mean along the last axis.
+    :param np.ndarray values: array of any shape
+    :param str statistic: 'median' or 'mean'
+    :return np.ndarray: the statistic
+    """
+    if statistic == 'median':
+        return np.median(values, axis=-1)
+
+    return np.mean(values, axis=-1)
+
+
+def bootstrap_chunk(values: np.ndarray, n_resamples: int, statistic: str, seed) -> np.ndarray:
+    """
+    Bootstrap resamples of the statistic of one group for all dates at once. Defined on module
+    level, so that it can be executed in a worker process.
+    :param np.ndarray values: array of shape (dates, group members)
+    :param int n_resamples: number of resamples
+    :param str statistic: 'median' or 'mean'
+    :param seed: seed of the random generator
+    :return np.ndarray: resampled statistics of shape (dates, n_resamples)
+    """
+    rng = np.random.default_rng(seed)
+    resample_indices = rng.integers(0, values.shape[1], size=(n_resamples, values.shape[1]))
+
+    return get_statistic(values=values[:, resample_indices], statistic=statistic)
+
+
+def permutation_chunk(values: np.ndarray, n_first: int, n_resamples: int, statistic: str,
+                      seed) -> np.ndarray:
+    """
+    Differences of the statistic of two groups after randomly permuting the group labels, for
+    all dates at once. Defined on module level, so that it can be executed in a worker process.
+    :param np.ndarray values: array of shape (dates, members of both groups), members of the
+    first group come first
+    :param int n_first: number of members of the first group
+    :param int n_resamples: number of permutations
+    :param str statistic: 'median' or 'mean'
+    :param seed: seed of the random generator
+    :return np.ndarray: permuted differences of shape (dates, n_resamples)
+    """
+    rng = np.random.default_rng(seed)
+    permutations = rng.permuted(
+        np.tile(np.arange(values.shape[1]), (n_resamples, 1)), axis=1
+    )
+    permuted = values[:, permutations]
+
+    return (get_statistic(values=permuted[..., :n_first], statistic=statistic) -
+            get_statistic(values=permuted[..., n_first:], statistic=statistic))
+
+
+class GroupStatistics:
+    """
+    This class computes uncertainty of group medians (or means) and significance of differences
+    between groups, for all dates at once. Groups are given by explicit labels. Resamples are
+    vectorized, large resample counts are split into chunks computed on a process pool.
+    """
+    # Maximal number of elements of the (dates x resamples x members) arrays created at once
+    max_chunk_elements = 20_000_000
+
+    def __init__(self, values: pd.DataFrame, group_labels: dict, statistic: str = 'median',
+                 n_resamples: int = 1000, confidence_level: float = 0.95, seed: int = None,
+                 max_workers: int = None, process_threshold: int = 10000):
+        """
+        Constructor.
+        :param pd.DataFrame values: dataframe, indices are dates and columns are countries
+        (e.g. GroupPlotPreparer.data)
+        :param dict group_labels: dictionary mapping countries to group labels
+        (e.g. GroupPlotPreparer.group_labels)
+        :param str statistic: 'median' or 'mean'
+        :param int n_resamples: number of bootstrap resamples and permutations
+        :param float confidence_level: confidence level of the bootstrap intervals
+        :param int seed: seed of the random generator
+        :param int max_workers: maximal number of worker processes
+        :param int process_threshold: a process pool is used if n_resamples is at least this much
+        """
+        if statistic not in ['median', 'mean']:
+            raise Exception('statistic can only be median or mean.')
+
+        countries = [country for country in group_labels if country in values.columns]
+        self.values = values[countries]
+        self.group_labels = {country: group_labels[country] for country in countries}
+        self.statistic = statistic
+        self.n_resamples = n_resamples
+        self.confidence_level = confidence_level
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.max_workers = max_workers
+        self.process_threshold = process_threshold
+
+        self.groups = list(dict.fromkeys(self.group_labels.values()))
+        self.estimates = pd.DataFrame()
+        self.ci_lows = pd.DataFrame()
+        self.ci_highs = pd.DataFrame()
+        self.pairwise_tests = pd.DataFrame()
+
+    def run(self) -> None:
+        """
+        Run function. Gets the group estimates with bootstrap confidence intervals, and the
+        Mann-Whitney and permutation tests of every pair of groups.
+        """
+        self.get_bootstrap_intervals()
+
+        self.get_pairwise_tests()
+
+    def get_group_values(self, group) -> np.ndarray:
+        """
+        Gets the values of the members of a group.
+        :param group: label of the group
+        :return np.ndarray: array of shape (dates, group members)
+        """
+        members = [country for country, label in self.group_labels.items() if label == group]
+
+        return self.values[members].to_numpy(dtype=float)
+
+    def get_bootstrap_intervals(self) -> None:
+        """
+        Gets the statistic of each group for every date, and its percentile bootstrap
+        confidence interval.
+        """
+        alpha = (1 - self.confidence_level) / 2
+
+        estimates, ci_lows, ci_highs = {}, {}, {}
+        for group in self.groups:
+            group_values = self.get_group_values(group=group)
+
+            resampled = self.run_chunks(function=bootstrap_chunk, values=group_values)
+
+            estimates[group] = get_statistic(values=group_values, statistic=self.statistic)
+            ci_lows[group] = np.quantile(resampled, alpha, axis=1)
+            ci_highs[group] = np.quantile(resampled, 1 - alpha, axis=1)
+
+        self.estimates = pd.DataFrame(estimates, index=self.values.index)
+        self.ci_lows = pd.DataFrame(ci_lows, index=self.values.index)
+        self.ci_highs = pd.DataFrame(ci_highs, index=self.values.index)
+
+    def get_pairwise_tests(self) -> None:
+        """
+        Compares every pair of groups for every date with a Mann-Whitney U test and a
+        permutation test of the difference of the statistic.
+        """
+        from scipy import stats
+
+        results = []
+        for group_a, group_b in combinations(self.groups, 2):
+            values_a = self.get_group_values(group=group_a)
+            values_b = self.get_group_values(group=group_b)
+
+            u_statistic, mann_whitney_p = stats.mannwhitneyu(
+                values_a, values_b, alternative='two-sided', axis=1
+            )
+
+            difference = (get_statistic(values=values_a, statistic=self.statistic) -
+                          get_statistic(values=values_b, statistic=self.statistic))
+            permuted = self.run_chunks(
+                function=permutation_chunk,
+                values=np.concatenate([values_a, values_b], axis=1),
+                n_first=values_a.shape[1]
+            )
+            n_extreme = (np.abs(permuted) >= np.abs(difference)[:, None] - 1e-12).sum(axis=1)
+            permutation_p = (n_extreme + 1) / (self.n_resamples + 1)
+
+            results.append(pd.DataFrame({
+                'date': self.values.index,
+                'group_a': group_a,
+                'group_b': group_b,
+                'difference': difference,
+                'u_statistic': u_statistic,
+                'mann_whitney_p': mann_whitney_p,
+                'permutation_p': permutation_p
+            }))
+
+        if results:
+            self.pairwise_tests = pd.concat(results).set_index(['date', 'group_a', 'group_b'])
+
+    def run_chunks(self, function, values: np.ndarray, **kwargs) -> np.ndarray:
+        """
+        Splits the resamples into chunks that fit into GroupStatistics.max_chunk_elements and
+        computes them, on a process pool if there are many resamples.
+        :param function: bootstrap_chunk or permutation_chunk
+        :param np.ndarray values: array of shape (dates, members)
+        :param kwargs: further keyword arguments of the function
+        :return np.ndarray: results of shape (dates, n_resamples)
+        """
+        chunk_size = max(1, self.max_chunk_elements // max(values.size, 1))
+        use_processes = self.n_resamples >= self.process_threshold
+        if use_processes:
+            n_workers = self.max_workers if self.max_workers is not None else os.cpu_count()
+            chunk_size = min(chunk_size, -(-self.n_resamples // n_workers))
+        chunk_sizes = [min(chunk_size, self.n_resamples - start)
+                       for start in range(0, self.n_resamples, chunk_size)]
+        seeds = self.seed_sequence.spawn(len(chunk_sizes))
+
+        arguments = [
+            dict(values=values, n_resamples=size, statistic=self.statistic, seed=seed, **kwargs)
+            for size, seed in zip(chunk_sizes, seeds)
+        ]
+
+        if use_processes and len(arguments) > 1:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(function, **argument) for argument in arguments]
+                chunks = [future.result() for future in futures]
+        else:
+            chunks = [function(**argument) for argument in arguments]
+
+        return np.concatenate(chunks, axis=1)
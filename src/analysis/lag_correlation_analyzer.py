@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from src.data_handling.country_catalog import CountryCatalog
+
+
+class LagCorrelationAnalyzer:
+    """
+    This class finds the lag at which policy stringency best predicts later mortality for each
+    country. Cross-correlations for all countries and all lags are computed in one vectorized
+    FFT pass.
+    """
+    def __init__(self, stringency_data: pd.DataFrame, mortality_data: pd.DataFrame,
+                 max_lag: int, min_periods: int = 30, use_absolute: bool = True):
+        """
+        Constructor.
+        :param pd.DataFrame stringency_data: daily stringency dataframe, indices are dates and
+        columns are countries (e.g. the output of
+        StringencyIndexCreator.preprocess_stringency_dataframe())
+        :param pd.DataFrame mortality_data: daily mortality dataframe, indices are dates and
+        columns are countries (e.g. DataInterface.get_series('deaths_new'))
+        :param int max_lag: correlations are computed for lags 0, 1, ..., max_lag days
+        :param int min_periods: minimal number of overlapping days needed for a correlation
+        :param bool use_absolute: True if the best lag is the one with the largest absolute
+        correlation, False if it is the one with the largest correlation
+        """
+        self.stringency_data = stringency_data
+        self.mortality_data = mortality_data
+        self.max_lag = max_lag
+        self.min_periods = min_periods
+        self.use_absolute = use_absolute
+
+        self.correlations = pd.DataFrame()
+        self.best_lags = pd.Series(dtype=float)
+        self.best_correlations = pd.Series(dtype=float)
+
+    def run(self) -> None:
+        """
+        Run function. Aligns the two dataframes on common dates and countries, computes the
+        correlation of stringency at day t and mortality at day t + lag for every lag, then gets
+        the best lag of each country.
+        """
+        stringency, mortality = self.align_dataframes()
+
+        correlations = self.get_lagged_correlations(
+            x=stringency.to_numpy(dtype=float),
+            y=mortality.to_numpy(dtype=float)
+        )
+        self.correlations = pd.DataFrame(
+            correlations, index=pd.RangeIndex(len(correlations), name='lag'), columns=stringency.columns
+        )
+
+        self.get_best_lags()
+
+    def align_dataframes(self) -> tuple:
+        """
+        Restricts both dataframes to their common countries and to the same daily date axis.
+        :return tuple: the aligned stringency and mortality dataframes
+        """
+        countries = CountryCatalog.shared().intersect(
+            self.stringency_data.columns, self.mortality_data.columns
+        )
+
+        stringency = self.stringency_data[countries].set_axis(
+            pd.to_datetime(self.stringency_data.index), axis=0
+        )
+        mortality = self.mortality_data[countries].set_axis(
+            pd.to_datetime(self.mortality_data.index), axis=0
+        )
+
+        start = max(stringency.index.min(), mortality.index.min())
+        end = min(stringency.index.max(), mortality.index.max())
+        if start > end:
+            raise Exception('The two dataframes have no common dates.')
+        dates = pd.date_range(start=start, end=end, freq='D')
+
+        return stringency.reindex(dates), mortality.reindex(dates)
+
+    def get_lagged_correlations(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Computes the Pearson correlation of x[t] and y[t + lag] for every column and lag. Missing
+        values are left out: every sum over the overlapping days is a cross-correlation of masked
+        arrays, and all of them are computed with FFT at once.
+        :param np.ndarray x: array of shape (days, countries)
+        :param np.ndarray y: array of shape (days, countries)
+        :return np.ndarray: correlations of shape (max_lag + 1, countries)
+        """
+        x_mask = ~np.isnan(x)
+        y_mask = ~np.isnan(y)
+        x = np.where(x_mask, x, 0.)
+        y = np.where(y_mask, y, 0.)
+
+        # Pairs of (left, right) arrays, the lagged sums are sum_t left[t] * right[t + lag]
+        left = np.stack([x_mask, x, x ** 2, x_mask, x_mask, x])
+        right = np.stack([y_mask, y_mask, y_mask, y, y ** 2, y])
+        n, s_x, s_xx, s_y, s_yy, s_xy = self.cross_correlate(left=left, right=right)
+
+        n = np.round(n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = n * s_xy - s_x * s_y
+            var_x = n * s_xx - s_x ** 2
+            var_y = n * s_yy - s_y ** 2
+            correlations = cov / np.sqrt(var_x * var_y)
+
+        degenerate = (var_x <= 1e-10 * n * s_xx) | (var_y <= 1e-10 * n * s_yy)
+        correlations[(n < self.min_periods) | degenerate] = np.nan
+
+        return np.clip(correlations, -1., 1.)
+
+    def cross_correlate(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """
+        Computes sum_t left[..., t, c] * right[..., t + lag, c] for lags 0, ..., max_lag with FFT
+        along the time axis.
+        :param np.ndarray left: array of shape (..., days, countries)
+        :param np.ndarray right: array of shape (..., days, countries)
+        :return np.ndarray: array of shape (..., max_lag + 1, countries)
+        """
+        length = left.shape[-2]
+        fft_length = 1 << int(np.ceil(np.log2(2 * length)))
+
+        left_fft = np.fft.rfft(left, n=fft_length, axis=-2)
+        right_fft = np.fft.rfft(right, n=fft_length, axis=-2)
+        cross = np.fft.irfft(np.conj(left_fft) * right_fft, n=fft_length, axis=-2)
+
+        return cross[..., :min(self.max_lag, length - 1) + 1, :]
+
+    def get_best_lags(self) -> None:
+        """
+        Gets the lag with the best correlation for each country.
+        """
+        scores = self.correlations.abs() if self.use_absolute else self.correlations
+        valid = scores.notna().any()
+
+        self.best_lags = scores.loc[:, valid].idxmax().reindex(self.correlations.columns)
+        self.best_correlations = pd.Series(
+            [self.correlations.at[lag, country] if not pd.isna(lag) else np.nan
+             for country, lag in self.best_lags.items()],
+            index=self.correlations.columns
+        )
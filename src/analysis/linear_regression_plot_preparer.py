@@ -1,8 +1,9 @@
 import numpy as np
 import pandas as pd
-from scipy.stats import linregress
 
 from src.analysis.data_aligner import DataAligner
+from src.analysis.regression_estimators import RegressionEstimators
+from src.data_handling.country_catalog import CountryCatalog
 from src.data_handling.data_interface import DataInterface
 
 
@@ -12,7 +13,9 @@ class LinearRegressionPlotPreparer:
     """
     def __init__(self, data_if: DataInterface, countries_type: str,
                  do_align_data: bool, prepare_for_log_plot: bool,
-                 save_aligned: bool = False, data_folder_path: str = None):
+                 save_aligned: bool = False, data_folder_path: str = None,
+                 data_type: str = 'deaths', estimator: str = 'ols',
+                 alignment_threshold: float = None, index_name: str = None):
         """
         Constructor.
         :param DataInterface data_if: a DataInterface instance
@@ -20,15 +23,30 @@ class LinearRegressionPlotPreparer:
         :param str countries_type: either 'all' or 'similar'
         :param bool prepare_for_log_plot: True if we wish to create a plot with logarithmic y-axis,
         False if not
+        :param str data_type: 'deaths', 'cases' or a series derived from them
+        (e.g. 'deaths_new'), see DataInterface.get_series()
+        :param str estimator: 'ols' for ordinary least squares, 'theil_sen' for the outlier robust
+        Theil-Sen estimator (its p-value is the p-value of Kendall's tau)
+        :param float alignment_threshold: if given, data is aligned to the first day when it
+        reaches this value (e.g. 1 death/million) instead of the first nonzero day
+        :param str index_name: name of an index family in data_if.index_dicts, if None,
+        the index dictionaries of data_if are used
         """
-        self.deaths_df = data_if.deaths_df
+        self.deaths_df = data_if.get_series(data_type=data_type)
+        self.data_type = data_type
         self.do_align_data = do_align_data
-        if countries_type == 'all':
+        self.alignment_threshold = alignment_threshold
+        if countries_type not in ['all', 'similar']:
+            raise Exception('Incorrect type of countries (all/similar).')
+        if index_name is not None:
+            self.index = data_if.index_dicts[index_name][countries_type]
+        elif countries_type == 'all':
             self.index = data_if.index_all_countries_dict
-        elif countries_type == 'similar':
-            self.index = data_if.index_similar_countries_dict
         else:
-            raise Exception('Incorrect type of countries (all/similar).')
+            self.index = data_if.index_similar_countries_dict
+        if estimator not in ['ols', 'theil_sen']:
+            raise Exception('estimator can only be ols or theil_sen.')
+        self.estimator = estimator
 
         self.prepare_for_log_plot = prepare_for_log_plot
         self.save_aligned = save_aligned
@@ -78,10 +96,11 @@ class LinearRegressionPlotPreparer:
         """
         :param pd.DataFrame data: filtered deaths dataframe
         Filters countries and aligns data in the given dataframe. The first elements of
-        the new columns are the first nonzero elements of the old columns.
+        the new columns are the first nonzero elements of the old columns (or the first elements
+        reaching the alignment threshold).
         :return pd.DataFrame aligned data
         """
-        aligned_data = DataAligner.align_data(data=data)
+        aligned_data = DataAligner.align_data(data=data, threshold=self.alignment_threshold)
 
         if self.save_aligned:
             DataAligner.save_aligned(
@@ -96,11 +115,7 @@ class LinearRegressionPlotPreparer:
         Filters the indices and the dataframe containing the time series for only common countries.
         :return pd.DataFrame: the filtered dataframe
         """
-        countries_with_mortality_data = set(self.deaths_df.columns)
-
-        countries_with_index = set(self.index.keys())
-
-        common = list(countries_with_mortality_data.intersection(countries_with_index))
+        common = CountryCatalog.shared().intersect(self.deaths_df.columns, self.index.keys())
 
         self.index = {c: self.index[c] for c in common if c in self.index}
 
@@ -137,9 +152,16 @@ class LinearRegressionPlotPreparer:
         else:
             y = self.y_coordinates
 
-        self.slope, self.intercept, r_value, self.p_value, std_err = linregress(
-            self.x_coordinates, y
-        )
+        if self.estimator == 'theil_sen':
+            result = RegressionEstimators.theil_sen(x=self.x_coordinates, y=y[:, None])
+            self.slope, self.intercept = result['slope'][0], result['intercept'][0]
+            self.p_value = RegressionEstimators.kendall(x=self.x_coordinates, y=y[:, None])['p_value'][0]
+        else:
+            from scipy.stats import linregress
+
+            self.slope, self.intercept, r_value, self.p_value, std_err = linregress(
+                self.x_coordinates, y
+            )
 
         self.x_fit = np.linspace(self.x_coordinates.min(), self.x_coordinates.max(), 100)
         if self.prepare_for_log_plot:
@@ -162,3 +184,156 @@ class LinearRegressionPlotPreparer:
         denominator = np.sum((self.y_coordinates - np.mean(self.y_coordinates)) ** 2)
 
         self.r_squared = 1 - numerator / denominator
+
+    def run_sweep(self, days_after_alignment: list = None, dates: list = None,
+                  estimator: str = None) -> pd.DataFrame:
+        """
+        Fits the regression for many days after alignment (or dates) at once. The estimators are
+        vectorized over the whole sweep, so robust fits cost about the same as OLS.
+        :param list days_after_alignment: days after alignment, used if data is aligned
+        :param list dates: dates, used if data is not aligned
+        :param str estimator: 'ols', 'theil_sen', 'spearman' or 'kendall',
+        if None, self.estimator is used
+        :return pd.DataFrame: statistics of the fits, indices are the days after alignment
+        (or dates). For 'ols', r_squared is the square of the correlation in the fitted
+        (log or linear) space.
+        """
+        estimator = self.estimator if estimator is None else estimator
+
+        y_matrix = self.get_y_matrix(days_after_alignment=days_after_alignment, dates=dates)
+        y = y_matrix.to_numpy(dtype=float).T
+        if self.prepare_for_log_plot:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                y = np.log(y)
+
+        if estimator == 'ols':
+            result = RegressionEstimators.ols(x=self.x_coordinates, y=y)
+            result['r_squared'] = result['r_value'] ** 2
+        elif estimator == 'theil_sen':
+            result = RegressionEstimators.theil_sen(x=self.x_coordinates, y=y)
+            result['p_value'] = RegressionEstimators.kendall(x=self.x_coordinates, y=y)['p_value']
+        elif estimator == 'spearman':
+            result = RegressionEstimators.spearman(x=self.x_coordinates, y=y)
+        elif estimator == 'kendall':
+            result = RegressionEstimators.kendall(x=self.x_coordinates, y=y)
+        else:
+            raise Exception('estimator can only be ols, theil_sen, spearman or kendall.')
+
+        return pd.DataFrame(result, index=y_matrix.index)
+
+    def run_rolling_windows(self, window_lengths: list, starts: list = None) -> pd.DataFrame:
+        """
+        Fits the regression of the index against the deaths/million accrued within sliding
+        windows, i.e. between day t and day t + k (after alignment, or dates), for every start t
+        and every window length k. The windowed values are differences of the cumulative matrix
+        (so data_type has to be 'cases' or 'deaths'), and the OLS statistics of all starts of a
+        window length are computed at once from the closed-form sums.
+        :param list window_lengths: lengths of the windows (k) in days (rows)
+        :param list starts: if given, only windows starting on these days after alignment
+        (or dates) are returned
+        :return pd.DataFrame: OLS statistics, indices are (window, start) pairs
+        """
+        if self.data_type not in ['cases', 'deaths']:
+            raise Exception(f'Rolling windows need cumulative data, data_type {self.data_type} '
+                            f'is a derived series, it can only be cases or deaths.')
+
+        y_matrix = self.get_y_matrix()
+        cumulative = y_matrix.to_numpy(dtype=float)
+
+        results = []
+        for window in window_lengths:
+            if not 0 < window < len(cumulative):
+                raise Exception(f'Window length {window} is not between 1 and {len(cumulative) - 1}.')
+
+            start_positions = np.arange(len(cumulative) - window)
+            if starts is not None:
+                start_positions = start_positions[y_matrix.index[:-window].isin(starts)]
+
+            accrued = (cumulative[start_positions + window] - cumulative[start_positions]).T
+            if self.prepare_for_log_plot:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    accrued = np.log(accrued)
+
+            result = RegressionEstimators.ols(x=self.x_coordinates, y=accrued)
+            result['r_squared'] = result['r_value'] ** 2
+            results.append(pd.DataFrame(
+                result,
+                index=pd.MultiIndex.from_product(
+                    [[window], y_matrix.index[start_positions]], names=['window', 'start']
+                )
+            ))
+
+        return pd.concat(results)
+
+    def run_jackknife(self, days_after_alignment: list = None, dates: list = None) -> pd.DataFrame:
+        """
+        Gets the leave-one-out OLS fits: for every day after alignment (or date) and every
+        country, the fit without that country (like StringencyIndexCreator's remove_italy, but
+        for all countries). The sums of the fits are the full sample sums minus the terms of the
+        dropped country, so no fit is recomputed.
+        :param list days_after_alignment: days after alignment, used if data is aligned
+        :param list dates: dates, used if data is not aligned
+        :return pd.DataFrame: OLS statistics of the leave-one-out fits and their changes compared
+        to the fit of all countries, indices are (day after alignment or date, dropped country)
+        pairs. Dropping a country without value on that day gives the full sample fit.
+        """
+        y_matrix = self.get_y_matrix(days_after_alignment=days_after_alignment, dates=dates)
+        y = y_matrix.to_numpy(dtype=float).T
+        if self.prepare_for_log_plot:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                y = np.log(y)
+
+        # Terms of every country, shape (countries, days)
+        x, y, mask = RegressionEstimators.get_masked_inputs(x=self.x_coordinates, y=y)
+        terms = {'n': mask.astype(float), 's_x': x, 's_y': y, 's_xx': x ** 2, 's_yy': y ** 2,
+                 's_xy': x * y}
+        sums = {name: term.sum(axis=0) for name, term in terms.items()}
+
+        full = RegressionEstimators.ols_from_sums(**sums)
+        result = RegressionEstimators.ols_from_sums(
+            **{name: sums[name] - term for name, term in terms.items()}
+        )
+        result['r_squared'] = result['r_value'] ** 2
+        result['slope_change'] = result['slope'] - full['slope']
+        result['r_squared_change'] = result['r_squared'] - full['r_value'] ** 2
+        result['p_value_change'] = result['p_value'] - full['p_value']
+
+        index = pd.MultiIndex.from_product(
+            [y_matrix.index, self.country_names],
+            names=['days_after_alignment' if self.do_align_data else 'date', 'country']
+        )
+
+        return pd.DataFrame(
+            {name: np.ravel(np.asarray(values).T) for name, values in result.items()},
+            index=index
+        )
+
+    def get_y_matrix(self, days_after_alignment: list = None,
+                     dates: list = None) -> pd.DataFrame:
+        """
+        Filters (and aligns) data, then gets the deaths/million data of all countries for many
+        days after alignment (or dates). Also sets the x coordinates and the country names.
+        :param list days_after_alignment: days after alignment, used if data is aligned
+        :param list dates: dates, used if data is not aligned
+        :return pd.DataFrame: indices are the days after alignment (or dates), columns are
+        countries in the same order as self.x_coordinates
+        """
+        deaths_df_filtered = self.filter_data()
+        self.x_coordinates = np.array(list(self.index.values()))
+        self.country_names = list(self.index.keys())
+
+        if self.do_align_data:
+            if days_after_alignment is None or self.save_aligned:
+                aligned_data = self.align_data(data=deaths_df_filtered)
+                if days_after_alignment is None:
+                    return aligned_data
+                return aligned_data.reindex(days_after_alignment)
+
+            # Only the requested days are gathered, the dense aligned dataframe is not built
+            aligned_data = DataAligner.align_data_ragged(data=deaths_df_filtered,
+                                                         threshold=self.alignment_threshold)
+            return aligned_data.take(offsets=days_after_alignment)
+
+        if dates is None:
+            return deaths_df_filtered
+        return deaths_df_filtered.loc[dates]
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+from src.analysis.data_aligner import DataAligner
+from src.data_handling.country_catalog import CountryCatalog
+from src.data_handling.data_interface import DataInterface
+
+
+class MultivariateRegression:
+    """
+    This class regresses deaths/million on several indices (e.g. BCG, vodka, stringency) and
+    metadata covariates (e.g. income, population) at once. The least-squares problems of all
+    dates (or days after alignment) are solved with one batched QR decomposition.
+    """
+    def __init__(self, data_if: DataInterface, index_dicts: dict, covariates: list = None,
+                 meta_data: pd.DataFrame = None, do_align_data: bool = False,
+                 prepare_for_log_plot: bool = False, population_weighted: bool = False,
+                 data_type: str = 'deaths'):
+        """
+        Constructor.
+        :param DataInterface data_if: a DataInterface instance
+        :param dict index_dicts: dictionary mapping index names to index dictionaries
+        (e.g. {'BCG': data_if.index_all_countries_dict, 'vodka': ...})
+        :param list covariates: columns of the metadata used as covariates (e.g. ['income'])
+        :param pd.DataFrame meta_data: metadata indexed by countries, if None, data_if.meta_data
+        is used
+        :param bool do_align_data: whether to align data or not
+        :param bool prepare_for_log_plot: True if the logarithm of deaths/million is regressed
+        :param bool population_weighted: True if countries should be weighted by their population
+        :param str data_type: 'deaths', 'cases' or a series derived from them,
+        see DataInterface.get_series()
+        """
+        self.deaths_df = data_if.get_series(data_type=data_type)
+        self.index_dicts = index_dicts
+        self.covariates = covariates if covariates is not None else []
+        self.meta_data = meta_data if meta_data is not None else data_if.meta_data
+        self.do_align_data = do_align_data
+        self.prepare_for_log_plot = prepare_for_log_plot
+        self.population_weighted = population_weighted
+
+        self.country_names = []
+        self.design_matrix = pd.DataFrame()
+        self.coefficients = pd.DataFrame()
+        self.std_errors = pd.DataFrame()
+        self.p_values = pd.DataFrame()
+        self.r_squared = pd.Series(dtype=float)
+        self.n = pd.Series(dtype=float)
+
+    def run(self, days_after_alignment: list = None, dates: list = None) -> None:
+        """
+        Run function. Builds the design matrix, gets deaths/million for all given days after
+        alignment (or dates) and solves all least-squares problems at once.
+        :param list days_after_alignment: days after alignment, used if data is aligned
+        :param list dates: dates, used if data is not aligned
+        """
+        self.design_matrix = self.get_design_matrix()
+        self.country_names = list(self.design_matrix.index)
+
+        y_matrix = self.get_y_matrix(days_after_alignment=days_after_alignment, dates=dates)
+        y = y_matrix.to_numpy(dtype=float).T
+        if self.prepare_for_log_plot:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                y = np.log(y)
+
+        weights = self.get_weights()
+
+        self.solve(
+            x=self.design_matrix.to_numpy(dtype=float),
+            y=y,
+            weights=weights,
+            labels=y_matrix.index
+        )
+
+    def get_design_matrix(self) -> pd.DataFrame:
+        """
+        Builds the design matrix for the countries for which all indices, covariates and
+        deaths data are available. The first column is the intercept.
+        :return pd.DataFrame: the design matrix, indices are countries
+        """
+        name_collections = [self.deaths_df.columns] + [d.keys() for d in self.index_dicts.values()]
+        if self.covariates or self.population_weighted:
+            name_collections.append(self.meta_data.index)
+        countries = CountryCatalog.shared().intersect(*name_collections)
+
+        columns = {'intercept': np.ones(len(countries))}
+        for name, index_dict in self.index_dicts.items():
+            columns[name] = [index_dict[country] for country in countries]
+        for covariate in self.covariates:
+            columns[covariate] = pd.to_numeric(
+                self.meta_data.loc[countries, covariate].astype(str).str.replace(',', ''),
+                errors='coerce'
+            ).values
+
+        design_matrix = pd.DataFrame(columns, index=countries).astype(float)
+
+        return design_matrix.dropna()
+
+    def get_y_matrix(self, days_after_alignment: list = None, dates: list = None) -> pd.DataFrame:
+        """
+        Gets deaths/million data of the design matrix countries.
+        :param list days_after_alignment: days after alignment, used if data is aligned
+        :param list dates: dates, used if data is not aligned
+        :return pd.DataFrame: indices are days after alignment (or dates), columns are countries
+        """
+        data = self.deaths_df[self.country_names]
+
+        if self.do_align_data:
+            aligned_data = DataAligner.align_data(data=data)
+            if days_after_alignment is None:
+                return aligned_data
+            return aligned_data.reindex(days_after_alignment)
+
+        if dates is None:
+            return data
+        return data.loc[dates]
+
+    def get_weights(self) -> np.ndarray:
+        """
+        Gets the weights of the countries (population or uniform), normalized to mean 1.
+        :return np.ndarray: weights in the same order as self.country_names
+        """
+        if not self.population_weighted:
+            return np.ones(len(self.country_names))
+
+        population = pd.to_numeric(
+            self.meta_data.loc[self.country_names, 'Population'].astype(str).str.replace(',', ''),
+            errors='coerce'
+        ).to_numpy(dtype=float)
+
+        return population / np.nanmean(population)
+
+    def solve(self, x: np.ndarray, y: np.ndarray, weights: np.ndarray, labels: pd.Index) -> None:
+        """
+        Solves the weighted least-squares problems of all columns of y with one batched QR
+        decomposition. Rows with missing y values are zeroed out separately for each column.
+        :param np.ndarray x: design matrix of shape (n, p)
+        :param np.ndarray y: array of shape (n, columns)
+        :param np.ndarray weights: weights of shape (n,)
+        :param pd.Index labels: labels of the columns of y (days after alignment or dates)
+        """
+        from scipy import stats
+
+        mask = np.isfinite(y) & np.isfinite(weights)[:, None]
+        sqrt_w = np.sqrt(np.where(mask, weights[:, None], 0.)).T
+        y_w = np.where(mask, y, 0.).T * sqrt_w
+        x_w = x[None, :, :] * sqrt_w[:, :, None]
+
+        n_parameters = x.shape[1]
+        if x.shape[0] < n_parameters:
+            raise Exception('There are fewer countries than parameters in the model.')
+        q, r = np.linalg.qr(x_w)
+
+        diagonal = np.abs(np.diagonal(r, axis1=1, axis2=2))
+        singular = (diagonal <= 1e-10 * np.maximum(diagonal.max(axis=1, keepdims=True), 1e-300)).any(axis=1)
+        r[singular] = np.eye(n_parameters)
+
+        beta = np.linalg.solve(r, np.einsum('dnp,dn->dp', q, y_w)[..., None])[..., 0]
+        residuals = y_w - np.einsum('dnp,dp->dn', x_w, beta)
+        rss = (residuals ** 2).sum(axis=1)
+
+        n = mask.sum(axis=0).astype(float)
+        dof = n - n_parameters
+        w_sum = (sqrt_w ** 2).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y_mean = (y_w * sqrt_w).sum(axis=1) / w_sum
+            tss = ((y_w - sqrt_w * y_mean[:, None]) ** 2).sum(axis=1)
+            r_squared = 1 - rss / tss
+
+            r_inverse = np.linalg.solve(r, np.broadcast_to(np.eye(n_parameters), r.shape))
+            sigma_squared = rss / dof
+            std_errors = np.sqrt(sigma_squared[:, None] * (r_inverse ** 2).sum(axis=2))
+            t_values = beta / std_errors
+        p_values = 2 * stats.t.sf(np.abs(t_values), np.maximum(dof, 1)[:, None])
+
+        invalid = singular | (dof < 1)
+        beta[singular] = np.nan
+        std_errors[invalid] = np.nan
+        p_values[invalid] = np.nan
+        r_squared[singular] = np.nan
+
+        columns = self.design_matrix.columns
+        self.coefficients = pd.DataFrame(beta, index=labels, columns=columns)
+        self.std_errors = pd.DataFrame(std_errors, index=labels, columns=columns)
+        self.p_values = pd.DataFrame(p_values, index=labels, columns=columns)
+        self.r_squared = pd.Series(r_squared, index=labels)
+        self.n = pd.Series(n, index=labels)
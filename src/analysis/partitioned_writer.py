@@ -0,0 +1,208 @@
+import hashlib
+import importlib.util
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+
+class PartitionedWriter:
+    """
+    Class for saving dataframes (aligned data, sweep results) in compressed files at full
+    precision. Files are partitioned by dataset, index and parameters:
+    root/dataset=<dataset>/index=<index>/params=<key=value,...>/part-<sequence>-<fingerprint>.<format>
+    The sequence number orders the parts by writing, the fingerprint is a hash of the content,
+    so writing unchanged data again is skipped.
+    Parquet and Feather need pyarrow, npz (numpy) is always available and stores the values as
+    floats.
+    """
+    file_formats = ['npz', 'parquet', 'feather']
+    part_pattern = re.compile(r'part-(\d+)-([0-9a-f]+)\.')
+    # Prefix of the index columns in feather files, feather cannot store the index itself
+    index_prefix = '__index__'
+
+    def __init__(self, root_path: str, file_format: str = None):
+        """
+        Constructor.
+        :param str root_path: root folder of the partitions
+        :param str file_format: 'npz', 'parquet' or 'feather', if None, parquet is used if
+        pyarrow is installed, npz otherwise
+        """
+        if file_format is None:
+            file_format = 'parquet' if self.has_pyarrow() else 'npz'
+        if file_format not in self.file_formats:
+            raise Exception(f'file_format can only be one of {", ".join(self.file_formats)}.')
+        if file_format != 'npz' and not self.has_pyarrow():
+            raise Exception(f'pyarrow is needed for writing {file_format} files.')
+
+        self.root_path = root_path
+        self.file_format = file_format
+
+    @staticmethod
+    def has_pyarrow() -> bool:
+        """
+        Checks whether pyarrow is installed.
+        :return bool: True if pyarrow can be imported
+        """
+        return importlib.util.find_spec('pyarrow') is not None
+
+    def get_partition_path(self, dataset: str, index: str, params: dict = None) -> str:
+        """
+        Gets the folder of a partition.
+        :param str dataset: name of the dataset (e.g. 'johns_hopkins')
+        :param str index: name of the index (e.g. 'BCG')
+        :param dict params: further parameters (e.g. {'countries_type': 'all'})
+        :return str: path of the partition folder
+        """
+        params = params if params is not None else {}
+        params_key = ','.join(f'{key}={params[key]}' for key in sorted(params)) or 'none'
+
+        parts = [f'dataset={dataset}', f'index={index}', f'params={params_key}']
+
+        return os.path.join(self.root_path, *[part.replace(os.sep, '-') for part in parts])
+
+    @staticmethod
+    def get_fingerprint(df: pd.DataFrame) -> str:
+        """
+        Hashes the values, the indices and the column names of a dataframe.
+        :param pd.DataFrame df: the dataframe
+        :return str: the fingerprint
+        """
+        hashed = pd.util.hash_pandas_object(df, index=True).to_numpy()
+        digest = hashlib.sha1(hashed.tobytes())
+        digest.update(','.join(map(str, df.columns)).encode())
+
+        return digest.hexdigest()[:16]
+
+    def write(self, df: pd.DataFrame, dataset: str, index: str, params: dict = None,
+              mode: str = 'append') -> str:
+        """
+        Writes a dataframe into its partition. If a part with the same content already exists,
+        nothing is written.
+        :param pd.DataFrame df: the dataframe
+        :param str dataset: name of the dataset
+        :param str index: name of the index
+        :param dict params: further parameters
+        :param str mode: 'append' adds a new part next to the existing ones, 'overwrite' removes
+        the other parts of the partition
+        :return str: path of the written file, None if the write was skipped
+        """
+        if mode not in ['append', 'overwrite']:
+            raise Exception('mode can only be append or overwrite.')
+
+        partition_path = self.get_partition_path(dataset=dataset, index=index, params=params)
+        os.makedirs(partition_path, exist_ok=True)
+
+        fingerprint = self.get_fingerprint(df=df)
+        existing = self.get_part_files(partition_path=partition_path)
+        same_content = [name for name in existing
+                        if self.part_pattern.match(name).group(2) == fingerprint
+                        and name.endswith(f'.{self.file_format}')]
+        if mode == 'overwrite':
+            for old_file in existing:
+                if old_file not in same_content:
+                    os.remove(os.path.join(partition_path, old_file))
+        if same_content:
+            return None
+
+        sequence = max([self.get_sequence(name=name) for name in existing], default=-1) + 1
+        file_name = f'part-{sequence:06d}-{fingerprint}.{self.file_format}'
+        file_path = os.path.join(partition_path, file_name)
+        temp_path = os.path.join(partition_path, f'.tmp-{file_name}')
+        self.write_file(df=df, file_path=temp_path)
+        os.replace(temp_path, file_path)
+
+        return file_path
+
+    def read(self, dataset: str, index: str, params: dict = None) -> pd.DataFrame:
+        """
+        Reads all parts of a partition.
+        :param str dataset: name of the dataset
+        :param str index: name of the index
+        :param dict params: further parameters
+        :return pd.DataFrame: the parts concatenated in the order they were written
+        """
+        partition_path = self.get_partition_path(dataset=dataset, index=index, params=params)
+        if not os.path.exists(partition_path):
+            return pd.DataFrame()
+
+        part_files = sorted(self.get_part_files(partition_path=partition_path),
+                            key=lambda name: self.get_sequence(name=name))
+        parts = [self.read_file(file_path=os.path.join(partition_path, name)) for name in part_files]
+
+        return pd.concat(parts) if parts else pd.DataFrame()
+
+    def get_part_files(self, partition_path: str) -> list:
+        """
+        Gets the names of the part files in a partition folder.
+        :param str partition_path: path of the partition folder
+        :return list: names of the part files
+        """
+        return [name for name in os.listdir(partition_path) if self.part_pattern.match(name)]
+
+    def get_sequence(self, name: str) -> int:
+        """
+        Gets the sequence number of a part file, parts are numbered in the order they are written.
+        :param str name: name of the part file
+        :return int: the sequence number
+        """
+        return int(self.part_pattern.match(name).group(1))
+
+    def write_file(self, df: pd.DataFrame, file_path: str) -> None:
+        """
+        Writes one part file.
+        :param pd.DataFrame df: the dataframe
+        :param str file_path: path of the file
+        """
+        if self.file_format == 'npz':
+            levels = {}
+            for i in range(df.index.nlevels):
+                level = df.index.get_level_values(i).to_numpy()
+                levels[f'index_{i}'] = level if level.dtype != object else level.astype(str)
+            with open(file_path, 'wb') as f:
+                np.savez_compressed(
+                    f,
+                    values=df.to_numpy(dtype=float),
+                    index_names=np.array([str(name) if name is not None else ''
+                                          for name in df.index.names]),
+                    columns=np.array([str(column) for column in df.columns]),
+                    **levels
+                )
+            return
+
+        df = df.set_axis(df.columns.astype(str), axis=1)
+        if self.file_format == 'parquet':
+            df.to_parquet(file_path, compression='zstd')
+        else:
+            index_columns = [f'{self.index_prefix}{i}_{name if name is not None else ""}'
+                             for i, name in enumerate(df.index.names)]
+            df.set_axis(df.index.set_names(index_columns), axis=0).reset_index() \
+                .to_feather(file_path, compression='zstd')
+
+    def read_file(self, file_path: str) -> pd.DataFrame:
+        """
+        Reads one part file.
+        :param str file_path: path of the file
+        :return pd.DataFrame: the dataframe
+        """
+        if file_path.endswith('.npz'):
+            with np.load(file_path, allow_pickle=False) as data:
+                names = [str(name) or None for name in data['index_names']]
+                levels = [data[f'index_{i}'] for i in range(len(names))]
+                index = pd.MultiIndex.from_arrays(levels, names=names) if len(levels) > 1 \
+                    else pd.Index(levels[0], name=names[0])
+                return pd.DataFrame(data['values'], index=index, columns=data['columns'])
+
+        if file_path.endswith('.parquet'):
+            return pd.read_parquet(file_path)
+
+        df = pd.read_feather(file_path)
+        index_columns = [column for column in df.columns if column.startswith(self.index_prefix)]
+        df = df.set_index(index_columns)
+
+        # Index columns are named <prefix><level>_<name>, the name is empty for unnamed levels
+        names = [column[len(self.index_prefix):].split('_', 1)[1] or None
+                 for column in index_columns]
+
+        return df.rename_axis(names)
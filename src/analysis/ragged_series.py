@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+
+class RaggedSeries:
+    """
+    Ragged storage of aligned series. The values of all columns are stored in one flat buffer,
+    column c occupies values[offsets[c]:offsets[c] + lengths[c]]. Unlike the dense aligned
+    dataframe, no NaN padding is stored for columns starting late.
+    """
+    def __init__(self, values: np.ndarray, offsets: np.ndarray, lengths: np.ndarray,
+                 columns: pd.Index):
+        """
+        Constructor.
+        :param np.ndarray values: flat buffer of the values of all columns
+        :param np.ndarray offsets: start of every column in the buffer
+        :param np.ndarray lengths: length of every column
+        :param pd.Index columns: names of the columns (e.g. countries)
+        """
+        self.values = values
+        self.offsets = offsets
+        self.lengths = lengths
+        self.columns = pd.Index(columns)
+
+    @staticmethod
+    def from_start_positions(data: pd.DataFrame, start_positions: np.ndarray) -> 'RaggedSeries':
+        """
+        Creates the ragged series from a dataframe and the row where every column starts
+        (e.g. its first nonzero row). Only the values from the start positions on are copied,
+        column by column into the preallocated buffer.
+        :param pd.DataFrame data: the dataframe, indices are dates and columns are countries
+        :param np.ndarray start_positions: start row of every column, -1 if the column is empty
+        :return RaggedSeries: the ragged series
+        """
+        n_rows = len(data)
+        start_positions = np.asarray(start_positions)
+        lengths = np.where(start_positions >= 0, n_rows - start_positions, 0)
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(int)
+
+        values = np.empty(int(lengths.sum()))
+        for j, (start, offset, length) in enumerate(zip(start_positions, offsets, lengths)):
+            if length > 0:
+                values[offset:offset + length] = data.iloc[start:, j].to_numpy(dtype=float)
+
+        return RaggedSeries(values=values, offsets=offsets, lengths=lengths, columns=data.columns)
+
+    @property
+    def max_length(self) -> int:
+        """
+        Length of the longest column.
+        :return int: the maximal length
+        """
+        return int(self.lengths.max()) if len(self.lengths) else 0
+
+    def at(self, offset: int) -> pd.Series:
+        """
+        Gets the value at the given offset (e.g. days after alignment) of every column.
+        :param int offset: the offset
+        :return pd.Series: values indexed by the columns, NaN where a column is shorter or the
+        offset is negative
+        """
+        has_value = (offset >= 0) & (offset < self.lengths)
+        values = np.full(len(self.columns), np.nan)
+        values[has_value] = self.values[self.offsets[has_value] + offset]
+
+        return pd.Series(values, index=self.columns)
+
+    def take(self, offsets: list) -> pd.DataFrame:
+        """
+        Gets the values at several offsets of every column, like to_frame().reindex(offsets), but
+        only the requested rows are gathered from the buffer.
+        :param list offsets: the offsets (e.g. days after alignment)
+        :return pd.DataFrame: indices are the offsets, columns are the columns, NaN where a
+        column is shorter
+        """
+        rows = np.asarray(offsets, dtype=int)[:, None]
+        has_value = (rows >= 0) & (rows < self.lengths[None, :])
+        values = np.full(has_value.shape, np.nan)
+        values[has_value] = self.values[(self.offsets[None, :] + rows)[has_value]]
+
+        return pd.DataFrame(values, index=pd.Index(offsets), columns=self.columns)
+
+    def get_column(self, column) -> np.ndarray:
+        """
+        Gets the values of a column without copying them.
+        :param column: name of the column
+        :return np.ndarray: view of the buffer
+        """
+        position = self.columns.get_loc(column)
+        start = self.offsets[position]
+
+        return self.values[start:start + self.lengths[position]]
+
+    def to_frame(self, n_rows: int = None) -> pd.DataFrame:
+        """
+        Converts the ragged series to the dense aligned dataframe padded with NaN.
+        :param int n_rows: number of rows, if None, the length of the longest column
+        :return pd.DataFrame: indices are offsets, columns are the columns
+        """
+        n_rows = self.max_length if n_rows is None else n_rows
+        dense = np.full((n_rows, len(self.columns)), np.nan)
+
+        kept = np.arange(n_rows)[:, None] < self.lengths[None, :]
+        source = (self.offsets[None, :] + np.arange(n_rows)[:, None])[kept]
+        dense[kept] = self.values[source]
+
+        return pd.DataFrame(dense, columns=self.columns)
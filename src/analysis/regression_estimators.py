@@ -0,0 +1,248 @@
+import numpy as np
+
+
+class RegressionEstimators:
+    """
+    Vectorized regression and correlation estimators. Every estimator fits the same x against
+    many y columns (e.g. a whole date sweep) at once. Missing y values (NaN) are left out
+    column by column.
+    """
+    # Maximal number of elements of the (pairs x columns) arrays created at once
+    max_chunk_elements = 20_000_000
+
+    @staticmethod
+    def get_masked_inputs(x: np.ndarray, y: np.ndarray) -> tuple:
+        """
+        Broadcasts x to the shape of y and sets missing values to 0.
+        :param np.ndarray x: array of shape (n,) or (n, columns)
+        :param np.ndarray y: array of shape (n, columns)
+        :return tuple: masked x, masked y and the mask of valid values
+        """
+        y = np.asarray(y, dtype=float)
+        x = np.broadcast_to(np.asarray(x, dtype=float).reshape(len(y), -1), y.shape)
+        mask = np.isfinite(x) & np.isfinite(y)
+
+        return np.where(mask, x, 0.), np.where(mask, y, 0.), mask
+
+    @staticmethod
+    def ols(x: np.ndarray, y: np.ndarray) -> dict:
+        """
+        Ordinary least squares fit of every column of y against x.
+        :param np.ndarray x: array of shape (n,) or (n, columns)
+        :param np.ndarray y: array of shape (n, columns)
+        :return dict: arrays 'slope', 'intercept', 'r_value', 'p_value', 'std_err' and 'n'
+        """
+        x, y, mask = RegressionEstimators.get_masked_inputs(x=x, y=y)
+
+        return RegressionEstimators.ols_from_sums(
+            n=mask.sum(axis=0),
+            s_x=x.sum(axis=0),
+            s_y=y.sum(axis=0),
+            s_xx=(x ** 2).sum(axis=0),
+            s_yy=(y ** 2).sum(axis=0),
+            s_xy=(x * y).sum(axis=0)
+        )
+
+    @staticmethod
+    def ols_from_sums(n: np.ndarray, s_x: np.ndarray, s_y: np.ndarray, s_xx: np.ndarray,
+                      s_yy: np.ndarray, s_xy: np.ndarray) -> dict:
+        """
+        Closed-form OLS statistics from the sums of x, y, x^2, y^2 and xy. The arrays can have
+        any (matching) shape, the statistics are computed elementwise.
+        :param np.ndarray n: number of points
+        :param np.ndarray s_x: sum of x
+        :param np.ndarray s_y: sum of y
+        :param np.ndarray s_xx: sum of x^2
+        :param np.ndarray s_yy: sum of y^2
+        :param np.ndarray s_xy: sum of xy
+        :return dict: arrays 'slope', 'intercept', 'r_value', 'p_value', 'std_err' and 'n'
+        """
+        from scipy import stats
+
+        n = np.asarray(n, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ss_xx = s_xx - s_x ** 2 / n
+            ss_yy = s_yy - s_y ** 2 / n
+            ss_xy = s_xy - s_x * s_y / n
+
+            slope = ss_xy / ss_xx
+            intercept = (s_y - slope * s_x) / n
+            r_value = np.clip(ss_xy / np.sqrt(ss_xx * ss_yy), -1., 1.)
+
+            df = n - 2
+            residual_variance = np.maximum(ss_yy - slope * ss_xy, 0.) / df
+            std_err = np.sqrt(residual_variance / ss_xx)
+            t_value = r_value * np.sqrt(df / np.maximum(1 - r_value ** 2, 1e-300))
+            p_value = 2 * stats.t.sf(np.abs(t_value), np.maximum(df, 1))
+
+        invalid = n < 3
+        p_value = np.where(invalid, np.nan, p_value)
+        std_err = np.where(invalid, np.nan, std_err)
+
+        return {
+            'slope': slope,
+            'intercept': intercept,
+            'r_value': r_value,
+            'p_value': p_value,
+            'std_err': std_err,
+            'n': n
+        }
+
+    @staticmethod
+    def get_column_chunks(n_pairs: int, n_columns: int) -> list:
+        """
+        Splits the columns into chunks, so that the (pairs x columns) arrays of one chunk fit into
+        RegressionEstimators.max_chunk_elements.
+        :param int n_pairs: number of pairs of points
+        :param int n_columns: number of columns
+        :return list: list of slices
+        """
+        chunk_size = max(1, RegressionEstimators.max_chunk_elements // max(n_pairs, 1))
+
+        return [slice(start, start + chunk_size) for start in range(0, n_columns, chunk_size)]
+
+    @staticmethod
+    def theil_sen(x: np.ndarray, y: np.ndarray) -> dict:
+        """
+        Theil-Sen fit of every column of y against x. The slope is the median of the slopes
+        between all pairs of points, the intercept is the median of y - slope * x. All pairs of
+        all columns are computed with one array operation (per chunk of columns).
+        :param np.ndarray x: array of shape (n,)
+        :param np.ndarray y: array of shape (n, columns)
+        :return dict: arrays 'slope', 'intercept' and 'n'
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.where(np.isfinite(y), y, np.nan).astype(float)
+
+        i, j = np.triu_indices(len(x), k=1)
+        dx = x[j] - x[i]
+        i, j, dx = i[dx != 0], j[dx != 0], dx[dx != 0]
+
+        slope = np.full(y.shape[1], np.nan)
+        for chunk in RegressionEstimators.get_column_chunks(n_pairs=len(dx), n_columns=y.shape[1]):
+            pair_slopes = (y[j, chunk] - y[i, chunk]) / dx[:, None]
+            if len(pair_slopes):
+                slope[chunk] = RegressionEstimators.nanmedian(pair_slopes)
+
+        intercept = RegressionEstimators.nanmedian(y - slope * x[:, None])
+
+        return {
+            'slope': slope,
+            'intercept': intercept,
+            'n': np.isfinite(y).sum(axis=0).astype(float)
+        }
+
+    @staticmethod
+    def spearman(x: np.ndarray, y: np.ndarray) -> dict:
+        """
+        Spearman rank correlation of x and every column of y. Ranks are recomputed for each
+        column on its valid points, then the Pearson correlation of the ranks is computed for all
+        columns at once.
+        :param np.ndarray x: array of shape (n,)
+        :param np.ndarray y: array of shape (n, columns)
+        :return dict: arrays 'rho', 'p_value' and 'n'
+        """
+        from scipy import stats
+
+        y = np.where(np.isfinite(y), y, np.nan).astype(float)
+        x = np.where(np.isnan(y), np.nan, np.asarray(x, dtype=float)[:, None])
+
+        x_ranks = stats.rankdata(x, axis=0, nan_policy='omit')
+        y_ranks = stats.rankdata(y, axis=0, nan_policy='omit')
+
+        result = RegressionEstimators.ols(x=x_ranks, y=y_ranks)
+
+        return {
+            'rho': result['r_value'],
+            'p_value': result['p_value'],
+            'n': result['n']
+        }
+
+    @staticmethod
+    def kendall(x: np.ndarray, y: np.ndarray) -> dict:
+        """
+        Kendall's tau-b of x and every column of y, computed from the signs of all pairwise
+        differences at once. The p-value uses the normal approximation, its variance is corrected
+        for ties in x and y as in scipy.stats.kendalltau.
+        :param np.ndarray x: array of shape (n,)
+        :param np.ndarray y: array of shape (n, columns)
+        :return dict: arrays 'tau', 'p_value' and 'n'
+        """
+        from scipy import stats
+
+        x = np.asarray(x, dtype=float)
+        y = np.where(np.isfinite(y), y, np.nan).astype(float)
+
+        i, j = np.triu_indices(len(x), k=1)
+        sign_x = np.sign(x[j] - x[i])[:, None]
+
+        tau = np.full(y.shape[1], np.nan)
+        s = np.full(y.shape[1], np.nan)
+        for chunk in RegressionEstimators.get_column_chunks(n_pairs=len(i), n_columns=y.shape[1]):
+            sign_y = np.sign(y[j, chunk] - y[i, chunk])
+            valid = ~np.isnan(sign_y)
+            sign_y = np.where(valid, sign_y, 0.)
+
+            n_pairs = valid.sum(axis=0)
+            ties_x = (valid & (sign_x == 0)).sum(axis=0)
+            ties_y = (valid & (sign_y == 0)).sum(axis=0)
+
+            s[chunk] = (sign_x * sign_y).sum(axis=0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                tau[chunk] = s[chunk] / np.sqrt((n_pairs - ties_x) * (n_pairs - ties_y))
+
+        n = np.isfinite(y).sum(axis=0).astype(float)
+        tied_pairs_x, tied_triples_x = RegressionEstimators.get_tie_sums(
+            values=np.where(np.isnan(y), np.nan, x[:, None])
+        )
+        tied_pairs_y, tied_triples_y = RegressionEstimators.get_tie_sums(values=y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            m = n * (n - 1)
+            variance = (m * (2 * n + 5) - 2 * (tied_triples_x + tied_triples_y)
+                        - 18 * (tied_pairs_x + tied_pairs_y)) / 18 \
+                + 2 * tied_pairs_x * tied_pairs_y / m \
+                + tied_triples_x * tied_triples_y / (9 * m * (n - 2))
+            z_value = s / np.sqrt(variance)
+        p_value = np.where(n < 3, np.nan, 2 * stats.norm.sf(np.abs(z_value)))
+
+        return {
+            'tau': tau,
+            'p_value': p_value,
+            'n': n
+        }
+
+    @staticmethod
+    def get_tie_sums(values: np.ndarray) -> tuple:
+        """
+        Sums over the groups of tied values of every column, missing values (NaN) are left out.
+        For a group of t tied values, t(t-1)/2 is the number of tied pairs and t(t-1)(t-2) is
+        used by the variance of Kendall's tau.
+        :param np.ndarray values: array of shape (n, columns)
+        :return tuple: arrays of the sums of t(t-1)/2 and of t(t-1)(t-2) of every column
+        """
+        n_rows, n_columns = values.shape
+        values = np.sort(values, axis=0)
+
+        # Runs of equal values of the sorted columns, numbered column by column
+        starts = np.ones(values.shape, dtype=bool)
+        starts[1:] = values[1:] != values[:-1]
+        groups = np.cumsum(starts, axis=0) - 1 + n_rows * np.arange(n_columns)[None, :]
+        valid = ~np.isnan(values)
+        t = np.bincount(groups[valid], minlength=n_rows * n_columns) \
+            .reshape(n_columns, n_rows).astype(float)
+
+        return (t * (t - 1) / 2).sum(axis=1), (t * (t - 1) * (t - 2)).sum(axis=1)
+
+    @staticmethod
+    def nanmedian(values: np.ndarray) -> np.ndarray:
+        """
+        Median along the first axis ignoring NaN values, columns without any value are NaN.
+        :param np.ndarray values: 2D array
+        :return np.ndarray: medians of the columns
+        """
+        medians = np.full(values.shape[1], np.nan)
+        has_values = ~np.isnan(values).all(axis=0)
+        if has_values.any():
+            medians[has_values] = np.nanmedian(values[:, has_values], axis=0)
+
+        return medians
@@ -0,0 +1,199 @@
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+
+class ResultsStore:
+    """
+    Class for persisting outputs of the preparers in a local SQLite database. A scenario is a
+    preparer type, a dataset and the parameters of the preparer; results of every date (or week,
+    or day after alignment) are stored in tables indexed by scenario and date. Rows are inserted
+    in bulk inside one transaction per call, queries return dataframes.
+    """
+    schema = """
+        CREATE TABLE IF NOT EXISTS scenarios (
+            scenario_id INTEGER PRIMARY KEY,
+            preparer_type TEXT NOT NULL,
+            dataset TEXT NOT NULL,
+            params TEXT NOT NULL,
+            UNIQUE (preparer_type, dataset, params)
+        );
+        CREATE TABLE IF NOT EXISTS regression_results (
+            scenario_id INTEGER NOT NULL REFERENCES scenarios (scenario_id),
+            date TEXT NOT NULL,
+            slope REAL,
+            intercept REAL,
+            r_squared REAL,
+            p_value REAL,
+            n REAL,
+            PRIMARY KEY (scenario_id, date)
+        );
+        CREATE TABLE IF NOT EXISTS coordinates (
+            scenario_id INTEGER NOT NULL REFERENCES scenarios (scenario_id),
+            date TEXT NOT NULL,
+            country TEXT NOT NULL,
+            x REAL,
+            y REAL,
+            PRIMARY KEY (scenario_id, date, country)
+        );
+        CREATE TABLE IF NOT EXISTS group_results (
+            scenario_id INTEGER NOT NULL REFERENCES scenarios (scenario_id),
+            date TEXT NOT NULL,
+            group_label TEXT NOT NULL,
+            statistic TEXT NOT NULL,
+            value REAL,
+            PRIMARY KEY (scenario_id, date, group_label, statistic)
+        );
+        CREATE INDEX IF NOT EXISTS scenarios_dataset ON scenarios (dataset, preparer_type);
+        CREATE INDEX IF NOT EXISTS regression_results_date ON regression_results (date);
+        CREATE INDEX IF NOT EXISTS coordinates_date ON coordinates (date);
+        CREATE INDEX IF NOT EXISTS group_results_date ON group_results (date);
+    """
+    regression_columns = ['slope', 'intercept', 'r_squared', 'p_value', 'n']
+
+    def __init__(self, db_path: str):
+        """
+        Constructor.
+        :param str db_path: path of the database file (':memory:' for an in-memory database)
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(self.schema)
+
+    def close(self) -> None:
+        """
+        Closes the connection.
+        """
+        self.connection.close()
+
+    def add_scenario(self, preparer_type: str, dataset: str, params: dict = None) -> int:
+        """
+        Adds a scenario if it does not exist yet.
+        :param str preparer_type: type of the preparer (e.g. 'linear_regression')
+        :param str dataset: name of the dataset
+        :param dict params: parameters of the preparer (JSON serializable)
+        :return int: id of the scenario
+        """
+        params_json = json.dumps(params if params is not None else {}, sort_keys=True)
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR IGNORE INTO scenarios (preparer_type, dataset, params) VALUES (?, ?, ?)',
+                (preparer_type, dataset, params_json)
+            )
+        row = self.connection.execute(
+            'SELECT scenario_id FROM scenarios WHERE preparer_type = ? AND dataset = ? AND params = ?',
+            (preparer_type, dataset, params_json)
+        ).fetchone()
+
+        return row[0]
+
+    def save_regression_sweep(self, scenario_id: int, sweep: pd.DataFrame) -> None:
+        """
+        Saves regression statistics of many dates at once
+        (e.g. the output of LinearRegressionPlotPreparer.run_sweep()).
+        :param int scenario_id: id of the scenario
+        :param pd.DataFrame sweep: indices are dates (or days after alignment), columns are
+        statistics, missing statistics are stored as NULL
+        """
+        columns = sweep.reindex(columns=self.regression_columns).astype(float)
+        values = columns.to_numpy(dtype=object)
+        values[columns.isna().to_numpy()] = None
+
+        rows = [(scenario_id, str(date), *row) for date, row in zip(sweep.index, values.tolist())]
+        self.insert_rows(table='regression_results', n_columns=7, rows=rows)
+
+    def save_regression_runs(self, scenario_id: int, runs: list) -> None:
+        """
+        Saves outputs of single LinearRegressionPlotPreparer runs (see BatchRunner.get_outputs()):
+        the regression statistics and the coordinates of every country.
+        :param int scenario_id: id of the scenario
+        :param list runs: list of dictionaries with keys 'label', 'slope', 'intercept',
+        'r_squared', 'p_value', 'country_names', 'x_coordinates' and 'y_coordinates'
+        """
+        sweep = pd.DataFrame(
+            [{**{column: run.get(column) for column in self.regression_columns},
+              'n': len(run['country_names'])} for run in runs],
+            index=[run['label'] for run in runs]
+        )
+        coordinate_rows = [
+            (scenario_id, str(run['label']), country, float(x), float(y))
+            for run in runs
+            for country, x, y in zip(run['country_names'], run['x_coordinates'], run['y_coordinates'])
+        ]
+
+        self.save_regression_sweep(scenario_id=scenario_id, sweep=sweep)
+        self.insert_rows(table='coordinates', n_columns=5, rows=coordinate_rows)
+
+    def save_group_runs(self, scenario_id: int, runs: list, statistic: str) -> None:
+        """
+        Saves group statistics of group preparer runs (see BatchRunner.get_outputs()).
+        :param int scenario_id: id of the scenario
+        :param list runs: list of dictionaries with keys 'label' and 'y_medians' or 'y_means'
+        (values of groups 1, 2, ...)
+        :param str statistic: 'median' or 'mean'
+        """
+        attribute = 'y_medians' if statistic == 'median' else 'y_means'
+        rows = [
+            (scenario_id, str(run['label']), str(group), statistic,
+             None if value is None or np.isnan(value) else float(value))
+            for run in runs
+            for group, value in enumerate(run[attribute], start=1)
+        ]
+
+        self.insert_rows(table='group_results', n_columns=5, rows=rows)
+
+    def insert_rows(self, table: str, n_columns: int, rows: list) -> None:
+        """
+        Inserts (or replaces) many rows with one executemany call inside a transaction.
+        :param str table: name of the table
+        :param int n_columns: number of columns of the table
+        :param list rows: list of tuples
+        """
+        placeholders = ', '.join(['?'] * n_columns)
+        with self.connection:
+            self.connection.executemany(f'INSERT OR REPLACE INTO {table} VALUES ({placeholders})', rows)
+
+    def get_scenarios(self) -> pd.DataFrame:
+        """
+        Gets all scenarios.
+        :return pd.DataFrame: indices are scenario ids
+        """
+        return pd.read_sql_query('SELECT * FROM scenarios', self.connection, index_col='scenario_id')
+
+    def query(self, table: str, preparer_type: str = None, dataset: str = None,
+              params: dict = None, dates: list = None) -> pd.DataFrame:
+        """
+        Queries a result table joined with the scenarios.
+        :param str table: 'regression_results', 'coordinates' or 'group_results'
+        :param str preparer_type: if given, only scenarios of this preparer type are returned
+        :param str dataset: if given, only scenarios of this dataset are returned
+        :param dict params: if given, only scenarios with these parameter values are returned
+        :param list dates: if given, only these dates (or weeks, days after alignment) are returned
+        :return pd.DataFrame: the results with the scenario columns
+        """
+        if table not in ['regression_results', 'coordinates', 'group_results']:
+            raise Exception('table can only be regression_results, coordinates or group_results.')
+
+        conditions, arguments = [], []
+        if preparer_type is not None:
+            conditions.append('s.preparer_type = ?')
+            arguments.append(preparer_type)
+        if dataset is not None:
+            conditions.append('s.dataset = ?')
+            arguments.append(dataset)
+        for key, value in (params or {}).items():
+            conditions.append('json_extract(s.params, ?) = ?')
+            arguments.extend([f'$.{key}', value])
+        if dates is not None:
+            conditions.append(f'r.date IN ({", ".join(["?"] * len(dates))})')
+            arguments.extend(str(date) for date in dates)
+
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        sql = (f'SELECT s.preparer_type, s.dataset, s.params, r.* FROM {table} r '
+               f'JOIN scenarios s ON s.scenario_id = r.scenario_id {where}')
+
+        return pd.read_sql_query(sql, self.connection, params=arguments)
@@ -0,0 +1,335 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.excess_deaths_plot_preparer import ExcessDeathsPlotPreparer
+from src.analysis.germany_states_plot_preparer import GermanyStatesPlotPreparer
+from src.analysis.group_plot_preparer import GroupPlotPreparer
+from src.analysis.linear_regression_plot_preparer import LinearRegressionPlotPreparer
+from src.analysis.partitioned_writer import PartitionedWriter
+from src.analysis.results_store import ResultsStore
+from src.data_handling.pipeline_orchestrator import PipelineOrchestrator
+
+
+class BatchRunner:
+    """
+    Class for running the whole pipeline without plotting. The datasets and the preparers are
+    described by a config dictionary, outputs of the preparers are written to a results directory.
+    Outputs of the 'regression_sweep' and 'rolling_windows' preparers (see
+    LinearRegressionPlotPreparer.run_sweep() and run_rolling_windows()) are dataframes, they are
+    written at full precision with a PartitionedWriter into the partitions folder of the results
+    directory, in the format given by the optional "file_format" key of the config.
+
+    Example config:
+    {
+        "data_folder_path": "data",
+        "backend": "pandas",
+        "datasets": [
+            {"name": "who_bcg", "origin": "who", "index_type": "BCG"},
+            {"name": "jh_vodka", "origin": "johns_hopkins", "index_type": "vodka",
+             "options": {"take_log_of_vodka": true}}
+        ],
+        "preparers": [
+            {"type": "linear_regression", "dataset": "jh_vodka", "countries_type": "similar",
+             "do_align_data": true, "prepare_for_log_plot": false, "days_after_alignment": [100, 200]},
+            {"type": "group", "dataset": "who_bcg", "data_type": "deaths", "dates": ["2021-03-01"]},
+            {"type": "regression_sweep", "dataset": "jh_vodka", "countries_type": "all",
+             "do_align_data": true, "estimator": "theil_sen"},
+            {"type": "rolling_windows", "dataset": "jh_vodka", "countries_type": "all",
+             "do_align_data": true, "window_lengths": [14, 28]}
+        ]
+    }
+    """
+    # Keys of a preparer config listing the dates of the runs, they are not scenario parameters
+    label_keys = ['dates', 'weeks', 'days_after_alignment']
+    # Preparers whose outputs are dataframes written by a PartitionedWriter
+    sweep_types = ['regression_sweep', 'rolling_windows']
+
+    def __init__(self, config: dict, results_dir: str,
+                 max_workers: int = None, use_processes: bool = True, db_path: str = None):
+        """
+        Constructor.
+        :param dict config: dictionary describing the datasets and the preparers (see above)
+        :param str results_dir: directory where the outputs are written
+        :param int max_workers: maximal number of workers used for building the datasets
+        :param bool use_processes: True if the handlers should run in worker processes,
+        False if they should run on threads
+        :param str db_path: if given, outputs are also saved in this SQLite database
+        (see ResultsStore)
+        """
+        self.config = config
+        self.results_dir = results_dir
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.db_path = db_path
+
+        self.data_folder_path = config['data_folder_path']
+        self.backend = config.get('backend', 'pandas')
+        self.data_ifs = {}
+
+    @staticmethod
+    def load_config(config_path: str) -> dict:
+        """
+        Reads a JSON config file.
+        :param str config_path: path of the config file
+        :return dict: the config dictionary
+        """
+        with open(config_path, 'r') as f:
+            return json.load(f)
+
+    def run(self) -> None:
+        """
+        Run function. Builds all datasets concurrently, then runs every preparer and saves its
+        outputs.
+        """
+        self.build_datasets()
+
+        if not os.path.exists(self.results_dir):
+            os.makedirs(self.results_dir)
+
+        store = ResultsStore(db_path=self.db_path) if self.db_path is not None else None
+        writer = PartitionedWriter(root_path=os.path.join(self.results_dir, 'partitions'),
+                                   file_format=self.config.get('file_format'))
+
+        for i, preparer_config in enumerate(self.config.get('preparers', [])):
+            file_name = f"{i:03d}_{preparer_config['type']}_{preparer_config['dataset']}.json"
+
+            if preparer_config['type'] in self.sweep_types:
+                sweep = self.run_sweep_preparer(preparer_config=preparer_config)
+                partition = self.get_partition(preparer_config=preparer_config)
+                writer.write(df=sweep, mode='overwrite', **partition)
+                self.save_results(
+                    results={'config': preparer_config,
+                             'partition': writer.get_partition_path(**partition)},
+                    file_name=file_name
+                )
+                if store is not None and preparer_config['type'] == 'regression_sweep':
+                    self.store_results(store=store, preparer_config=preparer_config, results=sweep)
+                continue
+
+            results = self.run_preparer(preparer_config=preparer_config)
+
+            self.save_results(
+                results={'config': preparer_config, 'runs': results},
+                file_name=file_name
+            )
+            if store is not None:
+                self.store_results(store=store, preparer_config=preparer_config, results=results)
+
+        if store is not None:
+            store.close()
+
+    def build_datasets(self) -> None:
+        """
+        Builds all datasets of the config concurrently, see PipelineOrchestrator.
+        """
+        specs = [
+            (dataset['origin'], dataset.get('index_type'), dataset.get('options', {}), dataset['name'])
+            for dataset in self.config['datasets']
+        ]
+        orchestrator = PipelineOrchestrator(
+            data_folder_path=self.data_folder_path,
+            specs=specs,
+            max_workers=self.max_workers,
+            use_processes=self.use_processes,
+            backend=self.backend
+        )
+        self.data_ifs = orchestrator.run()
+
+    def run_preparer(self, preparer_config: dict) -> list:
+        """
+        Runs a preparer for every date (or week or day after alignment) given in its config.
+        :param dict preparer_config: config of the preparer
+        :return list: outputs of the runs
+        """
+        preparer_type = preparer_config['type']
+        data_if = self.data_ifs[preparer_config['dataset']]
+
+        if preparer_type == 'linear_regression':
+            return self.run_linear_regression(preparer_config=preparer_config, data_if=data_if)
+        elif preparer_type == 'group':
+            return [
+                self.get_outputs(
+                    preparer=GroupPlotPreparer(
+                        data_handler=data_if,
+                        date=date,
+                        data_type=preparer_config.get('data_type', 'deaths'),
+                        data_folder_path=self.data_folder_path
+                    ),
+                    label=date,
+                    attributes=['x_coordinates', 'y_coordinates', 'y_medians']
+                )
+                for date in preparer_config['dates']
+            ]
+        elif preparer_type == 'excess_deaths':
+            return [
+                self.get_outputs(
+                    preparer=ExcessDeathsPlotPreparer(
+                        data_if=data_if,
+                        year=preparer_config['year'],
+                        week=week,
+                        data_folder_path=self.data_folder_path
+                    ),
+                    label=week,
+                    attributes=['x_coordinates', 'y_coordinates', 'y_medians', 'country_names']
+                )
+                for week in preparer_config['weeks']
+            ]
+        elif preparer_type == 'germany_states':
+            return [
+                self.get_outputs(
+                    preparer=GermanyStatesPlotPreparer(
+                        data_if=data_if,
+                        year=preparer_config['year'],
+                        week=week,
+                        data_folder_path=self.data_folder_path
+                    ),
+                    label=week,
+                    attributes=['x_coordinates', 'y_coordinates', 'y_means', 'state_names']
+                )
+                for week in preparer_config['weeks']
+            ]
+        else:
+            raise Exception('Type of preparer can only be linear_regression, group, '
+                            'excess_deaths or germany_states.')
+
+    def run_linear_regression(self, preparer_config: dict, data_if) -> list:
+        """
+        Runs a LinearRegressionPlotPreparer for every date or day after alignment in the config.
+        :param dict preparer_config: config of the preparer
+        :param DataInterface data_if: the DataInterface of the dataset
+        :return list: outputs of the runs
+        """
+        attributes = ['x_coordinates', 'y_coordinates', 'country_names', 'slope', 'intercept',
+                      'r_squared', 'p_value']
+
+        results = []
+        if preparer_config['do_align_data']:
+            run_kwargs = [{'days_after_alignment': days}
+                          for days in preparer_config['days_after_alignment']]
+        else:
+            run_kwargs = [{'date': date} for date in preparer_config['dates']]
+
+        for kwargs in run_kwargs:
+            preparer = LinearRegressionPlotPreparer(
+                data_if=data_if,
+                countries_type=preparer_config['countries_type'],
+                do_align_data=preparer_config['do_align_data'],
+                prepare_for_log_plot=preparer_config.get('prepare_for_log_plot', False),
+                data_type=preparer_config.get('data_type', 'deaths'),
+                alignment_threshold=preparer_config.get('alignment_threshold'),
+                index_name=preparer_config.get('index_name')
+            )
+            results.append(
+                self.get_outputs(preparer=preparer, label=list(kwargs.values())[0],
+                                 attributes=attributes, run_kwargs=kwargs)
+            )
+
+        return results
+
+    def run_sweep_preparer(self, preparer_config: dict) -> pd.DataFrame:
+        """
+        Runs a regression sweep (for the dates or days after alignment in the config, all of them
+        if they are not given) or the rolling window regressions of the config.
+        :param dict preparer_config: config of the preparer
+        :return pd.DataFrame: statistics of the fits
+        """
+        preparer = LinearRegressionPlotPreparer(
+            data_if=self.data_ifs[preparer_config['dataset']],
+            countries_type=preparer_config['countries_type'],
+            do_align_data=preparer_config['do_align_data'],
+            prepare_for_log_plot=preparer_config.get('prepare_for_log_plot', False),
+            data_type=preparer_config.get('data_type', 'deaths'),
+            estimator=preparer_config.get('estimator', 'ols'),
+            alignment_threshold=preparer_config.get('alignment_threshold'),
+            index_name=preparer_config.get('index_name')
+        )
+
+        if preparer_config['type'] == 'regression_sweep':
+            return preparer.run_sweep(
+                days_after_alignment=preparer_config.get('days_after_alignment'),
+                dates=preparer_config.get('dates')
+            )
+        elif preparer_config['type'] == 'rolling_windows':
+            return preparer.run_rolling_windows(
+                window_lengths=preparer_config['window_lengths'],
+                starts=preparer_config.get('starts')
+            )
+        else:
+            raise Exception('Type of sweep can only be regression_sweep or rolling_windows.')
+
+    def get_partition(self, preparer_config: dict) -> dict:
+        """
+        Gets the partition of a sweep: the dataset, its index (or the index family of the
+        preparer) and the parameters of the preparer.
+        :param dict preparer_config: config of the preparer
+        :return dict: keyword arguments of PartitionedWriter.write()
+        """
+        dataset = next(dataset for dataset in self.config['datasets']
+                       if dataset['name'] == preparer_config['dataset'])
+        index = preparer_config.get('index_name') or dataset.get('index_type')
+        if isinstance(index, list):
+            index = '+'.join(index)
+        params = {key: value for key, value in preparer_config.items()
+                  if key not in ['dataset', 'index_name']}
+
+        return {'dataset': preparer_config['dataset'], 'index': str(index), 'params': params}
+
+    @staticmethod
+    def get_outputs(preparer, label, attributes: list, run_kwargs: dict = None) -> dict:
+        """
+        Runs a preparer and collects the given attributes in a JSON serializable dictionary.
+        :param preparer: a preparer instance
+        :param label: date, week or day after alignment of the run
+        :param list attributes: names of the attributes to collect
+        :param dict run_kwargs: keyword arguments of the preparer's run function
+        :return dict: the outputs
+        """
+        preparer.run(**(run_kwargs or {}))
+
+        outputs = {'label': label}
+        for attribute in attributes:
+            value = getattr(preparer, attribute)
+            if isinstance(value, np.ndarray):
+                value = value.tolist()
+            elif isinstance(value, list):
+                value = [v.item() if isinstance(v, np.generic) else v for v in value]
+            elif isinstance(value, np.generic):
+                value = value.item()
+            outputs[attribute] = value
+
+        return outputs
+
+    def store_results(self, store: ResultsStore, preparer_config: dict, results) -> None:
+        """
+        Saves results of a preparer in the results database.
+        :param ResultsStore store: the results store
+        :param dict preparer_config: config of the preparer
+        :param results: outputs of the runs (list), or the dataframe of a regression sweep
+        """
+        params = {key: value for key, value in preparer_config.items()
+                  if key not in ['type', 'dataset'] + self.label_keys}
+        scenario_id = store.add_scenario(
+            preparer_type=preparer_config['type'],
+            dataset=preparer_config['dataset'],
+            params=params
+        )
+
+        if preparer_config['type'] == 'regression_sweep':
+            store.save_regression_sweep(scenario_id=scenario_id, sweep=results)
+        elif preparer_config['type'] == 'linear_regression':
+            store.save_regression_runs(scenario_id=scenario_id, runs=results)
+        else:
+            statistic = 'mean' if preparer_config['type'] == 'germany_states' else 'median'
+            store.save_group_runs(scenario_id=scenario_id, runs=results, statistic=statistic)
+
+    def save_results(self, results: dict, file_name: str) -> None:
+        """
+        Saves results of a preparer as JSON in the results directory.
+        :param dict results: results of the preparer
+        :param str file_name: name of the file
+        """
+        with open(os.path.join(self.results_dir, file_name), 'w') as f:
+            json.dump(results, f, indent=2)
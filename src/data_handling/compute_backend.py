@@ -0,0 +1,142 @@
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+
+class ComputeBackend:
+    """
+    Class performing the loading and reshaping steps of the pipeline (parsing csv files, group
+    sums, membership filters) with pandas, or with the multithreaded pyarrow or Polars engines
+    if they are installed. Results are always converted back to pandas and NumPy objects, so the
+    handlers and the DataInterface do not depend on the chosen backend.
+    """
+    backends = ['pandas', 'pyarrow', 'polars']
+
+    def __init__(self, name: str = 'pandas'):
+        """
+        Constructor.
+        :param str name: 'pandas', 'pyarrow', 'polars' or 'auto' (the first installed one of
+        'polars' and 'pyarrow', or 'pandas' if none of them is installed)
+        """
+        if name == 'auto':
+            name = next((backend for backend in ['polars', 'pyarrow'] if self.is_available(backend)),
+                        'pandas')
+        if name not in self.backends:
+            raise Exception(f'Backend can only be {", ".join(self.backends)} or auto.')
+        if not self.is_available(name):
+            raise Exception(f'The {name} backend is not installed.')
+
+        self.name = name
+
+    @staticmethod
+    def is_available(name: str) -> bool:
+        """
+        Checks whether a backend can be used.
+        :param str name: name of the backend
+        :return bool: True if the backend is installed
+        """
+        return name == 'pandas' or importlib.util.find_spec(name) is not None
+
+    def read_csv(self, path: str, index_col=None, usecols=None, sep: str = ',') -> pd.DataFrame:
+        """
+        Reads a csv file, the arguments work as in pd.read_csv. Values are not parsed as dates.
+        :param str path: path of the file
+        :param index_col: position (or list of positions) of the index columns among the read
+        columns
+        :param usecols: list of columns to read or a function deciding for every column name
+        :param str sep: delimiter
+        :return pd.DataFrame: the dataframe
+        """
+        if self.name == 'pandas':
+            return pd.read_csv(path, index_col=index_col, usecols=usecols, sep=sep)
+
+        columns = pd.read_csv(path, sep=sep, nrows=0).columns
+        if usecols is not None:
+            columns = [column for column in columns
+                       if (usecols(column) if callable(usecols) else column in usecols)]
+        columns = list(columns)
+
+        if self.name == 'pyarrow':
+            import pyarrow
+            from pyarrow import csv
+
+            table = csv.read_csv(
+                path,
+                parse_options=csv.ParseOptions(delimiter=sep),
+                convert_options=csv.ConvertOptions(include_columns=columns, timestamp_parsers=[])
+            )
+            # ISO dates are still inferred as date32, they are turned back into their text
+            for i, field in enumerate(table.schema):
+                if pyarrow.types.is_date(field.type):
+                    table = table.set_column(i, field.name, table.column(i).cast(pyarrow.string()))
+            df = table.to_pandas()
+        else:
+            import polars
+
+            table = polars.read_csv(path, separator=sep, columns=columns)
+            df = pd.DataFrame({column: table[column].to_numpy() for column in table.columns})
+
+        if index_col is None:
+            return df
+        positions = index_col if isinstance(index_col, list) else [index_col]
+
+        return df.set_index([df.columns[position] for position in positions])
+
+    def sum_by_index(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Sums the rows having the same index (e.g. provinces of a country), like
+        df.groupby(df.index).sum(). Missing values are summed as 0.
+        :param pd.DataFrame df: dataframe with numeric columns
+        :return pd.DataFrame: the sums, indices are the sorted unique indices of df
+        """
+        if self.name == 'pandas':
+            return df.groupby(df.index).sum()
+
+        key = '__index__'
+        data = df.fillna(0).set_axis(df.columns.astype(str), axis=1)
+        data.insert(0, key, df.index)
+
+        if self.name == 'pyarrow':
+            import pyarrow
+
+            table = pyarrow.Table.from_pandas(data, preserve_index=False)
+            summed = table.group_by(key).aggregate([(column, 'sum') for column in data.columns[1:]])
+            summed = summed.sort_by(key)
+            index = summed[key].to_numpy()
+            values = np.column_stack([summed[f'{column}_sum'].to_numpy()
+                                      for column in data.columns[1:]])
+        else:
+            import polars
+
+            table = polars.DataFrame({column: data[column].to_numpy() for column in data.columns})
+            summed = table.group_by(key).agg(polars.all().sum()).sort(key)
+            index = summed[key].to_numpy()
+            values = summed.select(list(data.columns[1:])).to_numpy()
+
+        return pd.DataFrame(values.reshape(len(index), len(df.columns)),
+                            index=pd.Index(index, name=df.index.name), columns=df.columns)
+
+    def isin(self, values, test_values) -> np.ndarray:
+        """
+        Checks which values are contained in test_values, like np.isin().
+        :param values: array of values (e.g. country IDs)
+        :param test_values: array of the accepted values
+        :return np.ndarray: boolean array
+        """
+        if self.name == 'pandas':
+            return np.isin(values, test_values)
+
+        if self.name == 'pyarrow':
+            import pyarrow
+            from pyarrow import compute
+
+            return compute.is_in(
+                pyarrow.array(np.asarray(values)), value_set=pyarrow.array(np.asarray(test_values))
+            ).to_numpy(zero_copy_only=False)
+
+        import polars
+
+        return polars.Series(np.asarray(values)).is_in(
+            polars.Series(np.asarray(test_values))
+        ).to_numpy()
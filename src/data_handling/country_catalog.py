@@ -0,0 +1,179 @@
+import threading
+from functools import reduce
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+class CountryCatalog:
+    """
+    Canonical catalog of countries shared by all data sources. Every known spelling of a country
+    name (alias) is mapped to a single integer ID, so that joins and intersections between the
+    sources can be done on integer arrays instead of string sets.
+    """
+    default_aliases = {
+        'Russian Federation': 'Russia',
+        'Türkiye': 'Turkey'
+    }
+
+    _shared = None
+
+    def __init__(self, aliases: dict = None):
+        """
+        Constructor.
+        :param dict aliases: dictionary mapping alternative country names to canonical names,
+        if None, CountryCatalog.default_aliases is used
+        """
+        self.names = []
+        self.alias_to_id = {}
+        self.meta_data = pd.DataFrame()
+        self.lock = threading.Lock()
+
+        if aliases is None:
+            aliases = self.default_aliases
+
+        for alias, name in aliases.items():
+            self.add_alias(alias=alias, name=name)
+
+    def __getstate__(self) -> dict:
+        """
+        Drops the lock, so that the catalog can be sent to worker processes.
+        :return dict: state of the catalog
+        """
+        state = self.__dict__.copy()
+        del state['lock']
+
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restores the catalog with a new lock.
+        :param dict state: state of the catalog
+        """
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'CountryCatalog':
+        """
+        Returns the catalog instance shared by all data sources.
+        :return CountryCatalog: the shared catalog
+        """
+        if cls._shared is None:
+            cls._shared = cls()
+
+        return cls._shared
+
+    def add_alias(self, alias: str, name: str) -> int:
+        """
+        Registers an alternative name of a country.
+        :param str alias: the alternative name
+        :param str name: the canonical name
+        :return int: ID of the country
+        """
+        with self.lock:
+            country_id = self.get_or_create_id(name=name)
+            self.alias_to_id[alias] = country_id
+
+        return country_id
+
+    def get_or_create_id(self, name: str) -> int:
+        """
+        Gets the ID of a name, registers it as a new canonical name if it is unknown.
+        The caller has to hold self.lock.
+        :param str name: country name or alias
+        :return int: ID of the country
+        """
+        country_id = self.alias_to_id.get(name)
+        if country_id is None:
+            country_id = len(self.names)
+            self.names.append(name)
+            self.alias_to_id[name] = country_id
+
+        return country_id
+
+    def encode(self, names: Iterable) -> np.ndarray:
+        """
+        Dictionary-encodes country names. Only the unique names are looked up, every other
+        operation is done on integer arrays. Missing names are encoded as -1.
+        :param Iterable names: country names or aliases
+        :return np.ndarray: IDs of the countries
+        """
+        codes, uniques = pd.factorize(np.asarray(list(names), dtype=object))
+
+        with self.lock:
+            unique_ids = np.array(
+                [self.get_or_create_id(name=name) for name in uniques], dtype=np.int64
+            )
+
+        if len(unique_ids) == 0:
+            return np.full(len(codes), -1, dtype=np.int64)
+
+        return np.where(codes >= 0, unique_ids[codes], -1)
+
+    def decode(self, ids: Iterable) -> list:
+        """
+        Gets the canonical names belonging to the given IDs.
+        :param Iterable ids: IDs of the countries
+        :return list: canonical names
+        """
+        names = np.asarray(self.names, dtype=object)
+
+        return list(names[np.asarray(ids, dtype=np.int64)])
+
+    def canonicalize(self, names: Iterable) -> pd.Index:
+        """
+        Replaces every alias with the canonical name of the country.
+        :param Iterable names: country names or aliases
+        :return pd.Index: canonical names
+        """
+        ids = self.encode(names=names)
+        names = np.asarray(self.names, dtype=object)
+
+        return pd.Index(np.where(ids >= 0, names[ids], None), dtype=object)
+
+    @staticmethod
+    def intersect_ids(*id_arrays: np.ndarray) -> np.ndarray:
+        """
+        Intersects arrays of country IDs.
+        :param np.ndarray id_arrays: arrays of country IDs
+        :return np.ndarray: sorted array of the common IDs (missing names are left out)
+        """
+        common_ids = reduce(np.intersect1d, id_arrays)
+
+        return common_ids[common_ids >= 0]
+
+    def intersect(self, *name_collections: Iterable) -> list:
+        """
+        Gets the countries contained in all given collections of names.
+        :param Iterable name_collections: collections of country names or aliases
+        :return list: canonical names of the common countries
+        """
+        id_arrays = [self.encode(names=names) for names in name_collections]
+
+        return self.decode(self.intersect_ids(*id_arrays))
+
+    def update_meta_data(self, meta_data: pd.DataFrame) -> None:
+        """
+        Stores metadata (e.g. population) of countries in the catalog. Already stored values
+        are overwritten by the new ones.
+        :param pd.DataFrame meta_data: dataframe indexed by country names
+        """
+        ids = self.encode(names=meta_data.index)
+        new_meta_data = meta_data.set_axis(ids, axis=0)
+        new_meta_data = new_meta_data[~new_meta_data.index.duplicated(keep='first')]
+
+        with self.lock:
+            self.meta_data = new_meta_data.combine_first(self.meta_data)
+
+    def get_meta_data(self, names: Iterable) -> pd.DataFrame:
+        """
+        Gets the stored metadata of the given countries.
+        :param Iterable names: country names or aliases
+        :return pd.DataFrame: metadata indexed by canonical names
+        """
+        names = list(names)
+        meta_data = self.meta_data.reindex(self.encode(names=names))
+
+        return meta_data.set_axis(self.canonicalize(names=names), axis=0)
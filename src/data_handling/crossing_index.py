@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+class CrossingIndex:
+    """
+    Precomputed index answering "first date when entity c reaches threshold t" for many (c, t)
+    pairs at once. The running maximum of every column is monotone, so the first crossing of a
+    threshold is found with a binary search on the column. The searches of all queries are done
+    simultaneously, one vectorized step per halving.
+    """
+    def __init__(self, data: pd.DataFrame):
+        """
+        Constructor.
+        :param pd.DataFrame data: dataframe, indices are (sorted) dates and columns are entities
+        (e.g. cumulative deaths/million or stringency). Missing values are ignored.
+        """
+        self.dates = data.index
+        self.columns = data.columns
+        values = data.to_numpy(dtype=float)
+        self.running_max = np.fmax.accumulate(np.where(np.isnan(values), -np.inf, values), axis=0)
+
+    def get_positions(self, thresholds, columns=None) -> np.ndarray:
+        """
+        Gets the first row positions where the columns reach the thresholds (value >= threshold).
+        :param thresholds: a scalar or an array with one threshold per queried column
+        :param columns: names of the queried columns, if None, all columns are queried
+        :return np.ndarray: positions of the first crossings, -1 if a column never reaches its
+        threshold
+        """
+        column_positions = (np.arange(len(self.columns)) if columns is None
+                            else self.columns.get_indexer(columns))
+        if (column_positions < 0).any():
+            raise Exception('Some of the queried columns are missing from the crossing index.')
+        thresholds = np.broadcast_to(np.asarray(thresholds, dtype=float), column_positions.shape)
+
+        n_rows = len(self.dates)
+        low = np.zeros(len(column_positions), dtype=int)
+        high = np.full(len(column_positions), n_rows)
+        while (low < high).any():
+            active = low < high
+            middle = (low + high) // 2
+            reached = np.zeros(len(column_positions), dtype=bool)
+            reached[active] = (self.running_max[middle[active], column_positions[active]] >=
+                               thresholds[active])
+            high = np.where(active & reached, middle, high)
+            low = np.where(active & ~reached, middle + 1, low)
+
+        return np.where(low < n_rows, low, -1)
+
+    def get_dates(self, thresholds, columns=None) -> pd.Series:
+        """
+        Gets the first dates when the columns reach the thresholds.
+        :param thresholds: a scalar or an array with one threshold per queried column
+        :param columns: names of the queried columns, if None, all columns are queried
+        :return pd.Series: first crossing dates indexed by the columns, NaT (or NaN) if a column
+        never reaches its threshold
+        """
+        positions = self.get_positions(thresholds=thresholds, columns=columns)
+        dates = pd.Series(self.dates[np.maximum(positions, 0)],
+                          index=self.columns if columns is None else pd.Index(columns))
+
+        return dates.where(positions >= 0)
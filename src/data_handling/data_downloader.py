@@ -1,7 +1,5 @@
 import os
 
-import gdown
-
 from src import PROJECT_PATH
 
 
@@ -30,6 +28,8 @@ class DataDownloader:
         """
         Downloads all data from Google Drive.
         """
+        import gdown
+
         gdown.download_folder(url=self.folder_link, output=self.data_folder_path)
 
     @staticmethod
@@ -1,9 +1,16 @@
+import threading
+
 import pandas as pd
 
+from src.data_handling.derived_series_calculator import DerivedSeriesCalculator
+from src.data_handling.week_resampler import WeekResampler
+
 
 class DataInterface:
     """
-    Class for storing data created in a data handler class.
+    Class for storing data created in a data handler class. Derived and weekly series are
+    cached, cache misses are computed once per key even if several threads (see QueryService)
+    ask for the same series.
     """
     def __init__(self, data: dict = None):
         """
@@ -13,12 +20,112 @@ class DataInterface:
         - 'deaths_df'
         - 'index_all_countries_dict'
         - 'index_similar_countries_dict'
+        - 'index_dicts' (index dictionaries of several index families, see JohnsHopkinsDataHandler)
+        - 'meta_data'
+        - 'level_dfs' (dataframes of the levels of a regional hierarchy, see RegionalDataHandler)
         """
         self.cases_df = pd.DataFrame()
         self.deaths_df = pd.DataFrame()
         self.index_all_countries_dict = {}
         self.index_similar_countries_dict = {}
+        self.index_dicts = {}
+        self.meta_data = pd.DataFrame()
+        self.level_dfs = {}
+
+        self.weekly_dfs = {}
+        self.derived_dfs = {}
+        self.lock = threading.Lock()
+        self.key_locks = {}
 
         if data is not None:
             for key, value in data.items():
                 setattr(self, key, value)
+
+    def __getstate__(self) -> dict:
+        """
+        Drops the locks, so that the DataInterface can be sent to worker processes and deep
+        copied (see StageGraph).
+        :return dict: state of the DataInterface
+        """
+        state = self.__dict__.copy()
+        del state['lock'], state['key_locks']
+
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restores the DataInterface with new locks.
+        :param dict state: state of the DataInterface
+        """
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+        self.key_locks = {}
+
+    def get_cached(self, cache: dict, key, function) -> pd.DataFrame:
+        """
+        Gets an item of a cache, computing it if it is missing. Only one thread computes a missing
+        item, the others wait for it.
+        :param dict cache: the cache (derived_dfs or weekly_dfs)
+        :param key: key of the item
+        :param function: function without arguments computing the item
+        :return pd.DataFrame: the item
+        """
+        if key in cache:
+            return cache[key]
+
+        with self.lock:
+            key_lock = self.key_locks.setdefault((id(cache), key), threading.Lock())
+        with key_lock:
+            if key not in cache:
+                cache[key] = function()
+
+        return cache[key]
+
+    def get_series(self, data_type: str) -> pd.DataFrame:
+        """
+        Gets a cases or deaths dataframe by name. Derived series are named as
+        '<cases or deaths>_<kind>' (e.g. 'deaths_new', 'cases_rolling_7'), see
+        DerivedSeriesCalculator.calculate() for the possible kinds. Derived series are computed
+        lazily and cached.
+        :param str data_type: 'cases', 'deaths' or the name of a derived series
+        :return pd.DataFrame: the desired dataframe
+        """
+        base, _, kind = data_type.partition('_')
+        if base not in ['cases', 'deaths']:
+            raise Exception('data_type can only be cases or deaths or a series derived from them')
+
+        if not kind:
+            return getattr(self, f'{base}_df')
+
+        return self.get_cached(
+            cache=self.derived_dfs,
+            key=data_type,
+            function=lambda: DerivedSeriesCalculator.calculate(
+                data=getattr(self, f'{base}_df'),
+                kind=kind
+            )
+        )
+
+    def get_weekly_df(self, data_type: str = 'deaths', how: str = 'last',
+                      week_format: str = 'euromomo') -> pd.DataFrame:
+        """
+        Gets the daily cases or deaths dataframe resampled to ISO weeks. Results are cached, so
+        the resampling is done only once for each combination of parameters.
+        :param str data_type: either 'cases' or 'deaths'
+        :param str how: 'sum', 'last' or 'mean'
+        :param str week_format: 'euromomo' for weeks in the form YYYY-WW,
+        'rki' for weeks in the form YYYY-Www
+        :return pd.DataFrame: the weekly dataframe
+        """
+        if data_type not in ['cases', 'deaths']:
+            raise Exception('data_type can only be cases or deaths')
+
+        return self.get_cached(
+            cache=self.weekly_dfs,
+            key=(data_type, how, week_format),
+            function=lambda: WeekResampler.resample(
+                data=getattr(self, f'{data_type}_df'),
+                how=how,
+                week_format=week_format
+            )
+        )
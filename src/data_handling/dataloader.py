@@ -1,31 +1,69 @@
 import os
+from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
+from src.data_handling.compute_backend import ComputeBackend
+from src.data_handling.country_catalog import CountryCatalog
+from src.data_handling.memory_tracker import MemoryTracker, tracked_stage
+from src.data_handling.schema_validator import SchemaValidator
+
 
 class DataLoader:
     """
     Class for loading downloaded data.
     """
+    # Number of rows parsed at once when long format data is filtered while reading
+    chunk_size = 100_000
+
     def __init__(self, data_folder_path: str,
-                 dataset_origin: str, index_type: str = None):
+                 dataset_origin: str, index_type: str = None,
+                 catalog: CountryCatalog = None, fill_method: str = None,
+                 countries: list = None, date_range: tuple = None,
+                 memory_tracker: MemoryTracker = None, backend: str = 'pandas'):
         """
         Constructor.
         :param str data_folder_path: path of the data folder
         :param str dataset_origin: origin of the mortality data,
         can be 'who', 'johns_hopkins', 'euromomo' or 'rki'
-        :param str index_type: 'BCG', 'vodka' or 'stringency'
+        :param str index_type: 'BCG', 'vodka' or 'stringency', or a list of them if several index
+        families are loaded at once (their tables are stored in index_tables)
+        :param CountryCatalog catalog: catalog used for encoding country names,
+        if None, the shared catalog is used
+        :param str fill_method: how the handlers fill missing dates, see SchemaValidator, if None,
+        cumulative series are forward filled and the EUROMOMO z-scores are left missing
+        :param list countries: if given, only these countries are read from the time series,
+        the metadata and the stringency data (index tables are always read fully)
+        :param tuple date_range: if given, (start, end) dates (inclusive), only this window is
+        read from the time series (weekly data is kept for weeks overlapping the window)
+        :param MemoryTracker memory_tracker: if given, the memory of the loading stages and of
+        the handler stages using this DataLoader is measured
+        :param str backend: engine used for reading csv files and for the reshaping steps of the
+        handlers, 'pandas', 'pyarrow', 'polars' or 'auto', see ComputeBackend
         """
         self.data_folder_path = data_folder_path
         self.dataset_origin = dataset_origin
         self.index_type = index_type
+        self.catalog = catalog if catalog is not None else CountryCatalog.shared()
+        self.fill_method = fill_method
+        self.validator = SchemaValidator(fill_method=fill_method)
+        self.countries = countries
+        self.country_ids = None if countries is None else self.catalog.encode(names=countries)
+        self.date_range = None if date_range is None else tuple(pd.to_datetime(list(date_range)))
+        self.memory_tracker = memory_tracker
+        self.backend = ComputeBackend(name=backend)
 
         self.meta_data = pd.DataFrame()
         self.time_series_data = pd.DataFrame()
         self.index_all_countries = pd.DataFrame()
         self.index_similar_countries = pd.DataFrame()
+        self.index_tables = {}
         self.load_data()
+        self.validate_data()
+        self.encode_countries()
 
+    @tracked_stage
     def load_data(self) -> None:
         """
         Reads downloaded data from the data folder and saves them in member variables.
@@ -35,27 +73,29 @@ class DataLoader:
         johns_hopkins_cases_name = 'johns_hopkins_cases.csv'
         johns_hopkins_deaths_name = 'johns_hopkins_deaths.csv'
         bcg_index_name = 'bcg_index_article_data.xlsx'
-        vodka_consumption_name = 'vodka_consumption.csv'
-        vodka_consumption_all_name = 'vodka_consumption_all.csv'
         excess_deaths_name = 'excess_deaths.csv'
         germany_data_name = 'deaths_by_german_states.csv'
-        stringency_name = 'OxCGRT_stringency.csv'
 
         if self.dataset_origin == 'who':
-            self.time_series_data = pd.read_csv(
-                os.path.join(self.data_folder_path, who_cases_and_deaths_name),
+            self.time_series_data = self.read_long_csv(
+                file_name=who_cases_and_deaths_name,
+                country_column='Country',
                 index_col=[0]
             )
-            self.meta_data = pd.read_csv(
+            self.meta_data = self.filter_country_rows(df=self.backend.read_csv(
                 os.path.join(self.data_folder_path, meta_name),
                 index_col=[0]
-            )
+            ))
         elif self.dataset_origin == 'johns_hopkins':
             self.time_series_data = {
-                'cases': pd.read_csv(os.path.join(self.data_folder_path, johns_hopkins_cases_name),
-                                     index_col=[1]),
-                'deaths': pd.read_csv(os.path.join(self.data_folder_path, johns_hopkins_deaths_name),
-                                      index_col=[1])
+                'cases': self.filter_country_rows(df=self.backend.read_csv(
+                    os.path.join(self.data_folder_path, johns_hopkins_cases_name),
+                    index_col=[1], usecols=self.is_column_in_date_range
+                )),
+                'deaths': self.filter_country_rows(df=self.backend.read_csv(
+                    os.path.join(self.data_folder_path, johns_hopkins_deaths_name),
+                    index_col=[1], usecols=self.is_column_in_date_range
+                ))
             }
             self.index_all_countries = pd.read_excel(
                 os.path.join(self.data_folder_path, bcg_index_name),
@@ -63,11 +103,16 @@ class DataLoader:
                 index_col=[1]
             )
             population_meta = self.index_all_countries[['population_2018']]
-            self.meta_data = population_meta[~population_meta.index.duplicated(keep='first')]
+            self.meta_data = self.filter_country_rows(
+                df=population_meta[~population_meta.index.duplicated(keep='first')]
+            )
             self.meta_data.columns = ['Population']
         elif self.dataset_origin == 'euromomo':
-            self.time_series_data = pd.read_csv(
-                os.path.join(self.data_folder_path, excess_deaths_name),
+            self.time_series_data = self.read_long_csv(
+                file_name=excess_deaths_name,
+                country_column='country',
+                date_column='week',
+                freq='W',
                 sep=';'
             )
         elif self.dataset_origin == 'rki':
@@ -77,39 +122,232 @@ class DataLoader:
                 index_col=[0]
             )
             self.meta_data = meta[['East-West', 'Population']]
-            self.time_series_data = pd.read_csv(
-                os.path.join(self.data_folder_path, germany_data_name),
+            self.time_series_data = self.read_long_csv(
+                file_name=germany_data_name,
+                freq='W',
                 index_col=[0]
             )
         else:
             raise Exception('Dataset origin is not valid.')
 
-        if self.index_type == 'BCG':
-            self.index_all_countries = pd.read_excel(
+        if isinstance(self.index_type, list):
+            self.index_tables = {
+                index_type: self.load_index(index_type=index_type)
+                for index_type in dict.fromkeys(self.index_type)
+            }
+        elif self.index_type is not None:
+            self.index_all_countries, self.index_similar_countries = self.load_index(
+                index_type=self.index_type
+            )
+
+    def load_index(self, index_type: str) -> tuple:
+        """
+        Reads the index tables of an index type.
+        :param str index_type: 'BCG', 'vodka' or 'stringency'
+        :return tuple: the table of all countries and the table of similar countries
+        (an empty dataframe if there is none)
+        """
+        bcg_index_name = 'bcg_index_article_data.xlsx'
+        vodka_consumption_name = 'vodka_consumption.csv'
+        vodka_consumption_all_name = 'vodka_consumption_all.csv'
+        stringency_name = 'OxCGRT_stringency.csv'
+
+        if index_type == 'BCG':
+            index_all_countries = pd.read_excel(
                 os.path.join(self.data_folder_path, bcg_index_name),
                 sheet_name='BCG Index',
                 index_col=[0]
             )
-            self.index_similar_countries = pd.read_excel(
+            index_similar_countries = pd.read_excel(
                 os.path.join(self.data_folder_path, bcg_index_name),
                 sheet_name='BCG Index Similar Countries',
                 index_col=[0]
             )
-        elif self.index_type == 'vodka':
-            self.index_similar_countries = pd.read_csv(
+        elif index_type == 'vodka':
+            index_similar_countries = self.backend.read_csv(
                 os.path.join(self.data_folder_path, vodka_consumption_name),
                 index_col=[0]
             )
-            self.index_all_countries = pd.read_csv(
+            index_all_countries = self.backend.read_csv(
                 os.path.join(self.data_folder_path, vodka_consumption_all_name),
                 index_col=[0]
             )
-        elif self.index_type == 'stringency':
-            self.index_all_countries = pd.read_csv(
+        elif index_type == 'stringency':
+            index_all_countries = self.filter_country_rows(df=self.backend.read_csv(
                 os.path.join(self.data_folder_path, stringency_name),
                 index_col=[1]
-            )
-        elif self.index_type is None:
-            pass
+            ))
+            index_similar_countries = pd.DataFrame()
         else:
             raise Exception('Type of index can only be BCG, vodka or stringency.')
+
+        return index_all_countries, index_similar_countries
+
+    def read_long_csv(self, file_name: str, country_column: str = None, date_column: str = None,
+                      freq: str = 'D', **kwargs) -> pd.DataFrame:
+        """
+        Reads long format data (one row per date and entity). If countries or a date range are
+        given, only the matching rows are kept. With the pandas backend the file is parsed in
+        chunks, so memory scales with the requested slice.
+        :param str file_name: name of the file in the data folder
+        :param str country_column: column containing country names, None if there is none
+        :param str date_column: column containing the dates, None if dates are the indices
+        :param str freq: 'D' for daily dates, 'W' for ISO week keys
+        :param kwargs: further keyword arguments of ComputeBackend.read_csv()
+        :return pd.DataFrame: the (filtered) dataframe
+        """
+        path = os.path.join(self.data_folder_path, file_name)
+        filter_countries = self.country_ids is not None and country_column is not None
+        if not filter_countries and self.date_range is None:
+            return self.backend.read_csv(path, **kwargs)
+
+        # pyarrow and Polars parse the whole file on several threads, pandas parses it in chunks
+        if self.backend.name == 'pandas':
+            chunks_read = pd.read_csv(path, chunksize=self.chunk_size, **kwargs)
+        else:
+            chunks_read = [self.backend.read_csv(path, **kwargs)]
+
+        chunks = []
+        for chunk in chunks_read:
+            mask = np.ones(len(chunk), dtype=bool)
+            if filter_countries:
+                mask &= self.backend.isin(
+                    self.catalog.encode(names=chunk[country_column].values), self.country_ids
+                )
+            if self.date_range is not None:
+                dates = chunk.index if date_column is None else chunk[date_column].values
+                mask &= self.is_in_date_range(
+                    dates=self.validator.parse_dates(dates=dates, freq=freq, name=file_name),
+                    freq=freq
+                )
+            chunks.append(chunk[mask])
+
+        return pd.concat(chunks)
+
+    def is_in_date_range(self, dates: pd.DatetimeIndex, freq: str = 'D') -> np.ndarray:
+        """
+        Checks which dates are inside self.date_range. Weeks (represented by their Mondays) are
+        inside if they overlap the range.
+        :param pd.DatetimeIndex dates: parsed dates
+        :param str freq: 'D' or 'W'
+        :return np.ndarray: boolean array
+        """
+        start, end = self.date_range
+        if freq == 'W':
+            start = start - pd.Timedelta(days=6)
+
+        return np.asarray((dates >= start) & (dates <= end))
+
+    def is_column_in_date_range(self, column: str) -> bool:
+        """
+        Column filter used while parsing the wide Johns Hopkins files: non-date columns are
+        always kept, date columns only if they are inside self.date_range.
+        :param str column: name of the column
+        :return bool: True if the column should be read
+        """
+        if self.date_range is None:
+            return True
+
+        try:
+            date = datetime.strptime(column, '%m/%d/%y')
+        except ValueError:
+            return True
+
+        return self.date_range[0] <= date <= self.date_range[1]
+
+    def filter_country_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Keeps only the rows of the requested countries, the indices of df are country names.
+        :param pd.DataFrame df: the dataframe
+        :return pd.DataFrame: the filtered dataframe
+        """
+        if self.country_ids is None:
+            return df
+
+        return df[self.backend.isin(self.catalog.encode(names=df.index), self.country_ids)]
+
+    @tracked_stage
+    def validate_data(self) -> None:
+        """
+        Checks the columns, the dates and the duplicates of the loaded time series, so that bad
+        inputs fail right after reading instead of deep inside a handler.
+        """
+        if self.dataset_origin == 'who':
+            self.validator.check_columns(
+                df=self.time_series_data,
+                required_columns=['Country', 'Cumulative_cases', 'Cumulative_deaths'],
+                name='WHO data'
+            )
+            dates = self.validator.parse_dates(dates=self.time_series_data.index, freq='D', name='WHO data')
+            self.validator.check_duplicates(
+                keys=[dates, self.time_series_data['Country'].values], name='WHO data'
+            )
+        elif self.dataset_origin == 'johns_hopkins':
+            for data_type in ['cases', 'deaths']:
+                df = self.time_series_data[data_type]
+                name = f'Johns Hopkins {data_type} data'
+                self.validator.check_columns(
+                    df=df, required_columns=['Province/State', 'Lat', 'Long'], name=name
+                )
+                date_columns = df.columns.drop(['Province/State', 'Lat', 'Long'])
+                dates = self.validator.parse_dates(
+                    dates=date_columns, freq='D', name=name, date_format='%m/%d/%y'
+                )
+                self.validator.check_duplicates(keys=[dates], name=name)
+        elif self.dataset_origin == 'euromomo':
+            self.validator.check_columns(
+                df=self.time_series_data, required_columns=['country', 'week', 'zscore'],
+                name='EUROMOMO data'
+            )
+            weeks = self.validator.parse_dates(
+                dates=self.time_series_data['week'].values, freq='W', name='EUROMOMO data'
+            )
+            self.validator.check_duplicates(
+                keys=[weeks, self.time_series_data['country'].values], name='EUROMOMO data'
+            )
+        elif self.dataset_origin == 'rki':
+            self.validator.check_columns(
+                df=self.time_series_data, required_columns=['State', 'Deaths_total'], name='RKI data'
+            )
+            weeks = self.validator.parse_dates(dates=self.time_series_data.index, freq='W', name='RKI data')
+            self.validator.check_duplicates(
+                keys=[weeks, self.time_series_data['State'].values], name='RKI data'
+            )
+
+        if self.dataset_origin != 'euromomo':
+            self.validator.check_columns(df=self.meta_data, required_columns=['Population'],
+                                         name='Metadata')
+
+    @tracked_stage
+    def encode_countries(self) -> None:
+        """
+        Replaces country names with their canonical names from the catalog and adds the
+        integer country IDs to the long format time series. RKI data contains German states,
+        so it is left untouched.
+        """
+        if self.dataset_origin == 'rki':
+            return
+
+        if self.dataset_origin == 'who':
+            ids = self.catalog.encode(names=self.time_series_data['Country'].values)
+            self.time_series_data['Country'] = self.catalog.decode(ids=ids)
+            self.time_series_data['country_id'] = ids
+        elif self.dataset_origin == 'johns_hopkins':
+            for data_type in ['cases', 'deaths']:
+                df = self.time_series_data[data_type]
+                df.index = self.catalog.canonicalize(names=df.index)
+        elif self.dataset_origin == 'euromomo':
+            ids = self.catalog.encode(names=self.time_series_data['country'].values)
+            self.time_series_data['country'] = self.catalog.decode(ids=ids)
+            self.time_series_data['country_id'] = ids
+
+        if not self.meta_data.empty:
+            self.meta_data.index = self.catalog.canonicalize(names=self.meta_data.index)
+            self.meta_data = self.meta_data[~self.meta_data.index.duplicated(keep='first')]
+            self.catalog.update_meta_data(meta_data=self.meta_data)
+
+        index_dfs = [self.index_all_countries, self.index_similar_countries]
+        index_dfs += [df for tables in self.index_tables.values() for df in tables]
+        for df in index_dfs:
+            if not df.empty:
+                df.index = self.catalog.canonicalize(names=df.index)
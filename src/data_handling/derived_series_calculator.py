@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+
+class DerivedSeriesCalculator:
+    """
+    Class for computing series derived from cumulative data (e.g. daily new deaths, rolling
+    averages). Every series is computed for all countries at once with whole-matrix operations.
+    """
+    kinds = ['new', 'rolling_7', 'rolling_14', 'growth_rate']
+
+    @staticmethod
+    def calculate(data: pd.DataFrame, kind: str) -> pd.DataFrame:
+        """
+        Computes a derived series from a cumulative dataframe. Indices are dates and columns
+        are countries, rows without enough history are NaN.
+        - 'new': daily new values
+        - 'rolling_7', 'rolling_14': 7 and 14-day rolling averages of daily new values
+        - 'growth_rate': daily relative growth of the cumulative values
+        :param pd.DataFrame data: cumulative dataframe
+        :param str kind: 'new', 'rolling_7', 'rolling_14' or 'growth_rate'
+        :return pd.DataFrame: the derived dataframe
+        """
+        values = data.to_numpy(dtype=float)
+
+        if kind == 'new':
+            derived = DerivedSeriesCalculator.get_window_differences(values=values, window=1)
+        elif kind.startswith('rolling_') and kind in DerivedSeriesCalculator.kinds:
+            window = int(kind.split('_')[1])
+            derived = DerivedSeriesCalculator.get_window_differences(values=values, window=window) / window
+        elif kind == 'growth_rate':
+            previous = np.full_like(values, np.nan)
+            previous[1:] = values[:-1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                derived = values / previous - 1
+            derived[~np.isfinite(derived)] = np.nan
+        else:
+            raise Exception(f'kind can only be one of {", ".join(DerivedSeriesCalculator.kinds)}.')
+
+        return pd.DataFrame(derived, index=data.index, columns=data.columns)
+
+    @staticmethod
+    def get_window_differences(values: np.ndarray, window: int) -> np.ndarray:
+        """
+        Gets the differences of the cumulative values over the given window, i.e. the values
+        accrued within the window ending on each day.
+        :param np.ndarray values: cumulative values, rows are dates
+        :param int window: length of the window in days
+        :return np.ndarray: windowed differences, the first window rows are NaN
+        """
+        differences = np.full_like(values, np.nan)
+        differences[window:] = values[window:] - values[:-window]
+
+        return differences
@@ -1,8 +1,8 @@
-import numpy as np
 import pandas as pd
 
 from src.data_handling.data_interface import DataInterface
 from src.data_handling.dataloader import DataLoader
+from src.data_handling.memory_tracker import tracked_stage
 
 
 class EUROMOMODataHandler:
@@ -22,6 +22,7 @@ class EUROMOMODataHandler:
 
         self.data_if = DataInterface()
 
+    @tracked_stage
     def run(self) -> None:
         """
         Gets excess deaths dataframe.
@@ -32,7 +33,8 @@ class EUROMOMODataHandler:
 
     def get_studied_countries(self) -> list:
         """
-        Only the following countries' excess deaths are studied.
+        Only the following countries' excess deaths are studied. If the DataLoader was restricted
+        to some countries, only those of them are kept.
         :return list: studied countries
         """
         if self.get_only_a_few_countries:
@@ -43,29 +45,31 @@ class EUROMOMODataHandler:
                          'Switzerland', 'Sweden', 'Belgium', 'Finland', 'Portugal',
                          'Ireland', 'Denmark', 'Israel', 'Austria']
 
+        if self.dl.countries is not None:
+            loaded_countries = set(self.dl.catalog.canonicalize(names=self.dl.countries))
+            countries = [country for country in countries if country in loaded_countries]
+
         return countries
 
+    @tracked_stage
     def get_excess_deaths_df(self, studied_countries: list) -> pd.DataFrame:
         """
         Creates the excess deaths dataframe. Indices are weeks and columns are countries.
         Indices are in the form YYYY-WW, which represents the WW-th week of the year YYYY.
-        For example 2020-05 is the fifth week of 2020.
+        For example 2020-05 is the fifth week of 2020. Every country is placed on the full week
+        axis, z-scores are not cumulative, so by default gaps are left missing (see
+        SchemaValidator.get_fill_method()).
         :param list studied_countries: list of studied countries
         :return pd.DataFrame: excess deaths dataframe
         """
-        indices = self.dl.time_series_data[
-            self.dl.time_series_data['country'] == 'Austria'
-        ][['week']].values.tolist()
-        indices = [idx[0] for idx in indices]
-
-        all_values = []
-        for country in studied_countries:
-            country_df = self.dl.time_series_data[self.dl.time_series_data['country'] == country]
-
-            values = np.array(country_df['zscore'].values.tolist())
-
-            all_values.append(values)
-
-        df = pd.DataFrame(np.array(all_values).T, index=indices, columns=studied_countries)
+        df = self.dl.validator.to_matrix(
+            entities=self.dl.time_series_data['country'].values,
+            dates=self.dl.time_series_data['week'].values,
+            values=self.dl.time_series_data['zscore'].values,
+            freq='W',
+            week_format='euromomo',
+            name='EUROMOMO data',
+            cumulative=False
+        )
 
-        return df
+        return df[studied_countries]
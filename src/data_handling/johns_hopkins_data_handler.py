@@ -3,6 +3,7 @@ import pandas as pd
 
 from src.data_handling.data_interface import DataInterface
 from src.data_handling.dataloader import DataLoader
+from src.data_handling.memory_tracker import tracked_stage
 from src.data_handling.stringency_index_creator import StringencyIndexCreator
 
 
@@ -13,7 +14,10 @@ class JohnsHopkinsDataHandler:
     def __init__(self, dl: DataLoader,
                  take_log_of_vodka: bool = False,
                  stringency_similar_only: bool = None,
-                 stringency_remove_italy: bool = False):
+                 stringency_remove_italy: bool = False,
+                 stringency_threshold: float = 50,
+                 stringency_deaths_threshold: float = 10,
+                 index_families: dict = None):
         """
         Constructor.
         :param DataLoader dl: a DataLoader instance
@@ -22,41 +26,76 @@ class JohnsHopkinsDataHandler:
         while creating stringency indices, False otherwise
         :param bool stringency_remove_italy: Italy is an outlier. We wish to disregard it in some
         cases
+        :param float stringency_threshold: stringency level used for the stringency indices
+        :param float stringency_deaths_threshold: number of deaths used for the stringency indices
+        :param dict index_families: if given, several index families are created from the same
+        preprocessed data. Maps names to index types or to (index type, options) pairs, where
+        options override the arguments above, e.g.
+        {'BCG': 'BCG', 'vodka_log': ('vodka', {'take_log_of_vodka': True}),
+         'stringency_similar': ('stringency', {'stringency_similar_only': True})}.
+        The DataLoader has to be created with the list of the needed index types.
         """
         self.dl = dl
         self.take_log_of_vodka = take_log_of_vodka
         self.stringency_similar_only = stringency_similar_only
         self.stringency_remove_italy = stringency_remove_italy
+        self.stringency_threshold = stringency_threshold
+        self.stringency_deaths_threshold = stringency_deaths_threshold
+        self.index_families = index_families
 
+        self.cases_df = pd.DataFrame()
         self.deaths_df = pd.DataFrame()
 
         self.countries_inter = list()
         self.data_if = DataInterface()
         self.index_all_countries_dict = {}
         self.index_similar_countries_dict = {}
+        self.index_dicts = {}
 
+    @tracked_stage
     def run(self) -> None:
         """
         Run function. Selects countries for which we have all the necessary information, gets two
         dataframes: one containing cases data, the other containing deaths data.
         """
+        self.prepare_data()
+
+        self.create_index_dicts()
+
+        self.data_if = self.get_data_interface()
+
+    def prepare_data(self) -> None:
+        """
+        Preprocesses and filters the data, gets the cases and deaths dataframes. The index
+        dictionaries are created separately, so they can be recreated with other options from
+        the same prepared data (see StageGraph).
+        """
         self.preprocess_df()
 
         self.get_common_countries()
 
         self.filter_data(countries_inter=self.countries_inter)
 
-        self.create_index_dicts()
+        self.cases_df = self.get_df(countries_inter=self.countries_inter, data_type='cases')
+        self.deaths_df = self.get_df(countries_inter=self.countries_inter, data_type='deaths')
 
+    def get_data_interface(self) -> DataInterface:
+        """
+        Collects the prepared dataframes and the index dictionaries.
+        :return DataInterface: the DataInterface of the handler
+        """
         data = {
-            'cases_df': self.get_df(countries_inter=self.countries_inter, data_type='cases'),
-            'deaths_df': self.get_df(countries_inter=self.countries_inter, data_type='deaths'),
+            'cases_df': self.cases_df,
+            'deaths_df': self.deaths_df,
             'index_all_countries_dict': self.index_all_countries_dict,
-            'index_similar_countries_dict': self.index_similar_countries_dict
+            'index_similar_countries_dict': self.index_similar_countries_dict,
+            'index_dicts': self.index_dicts,
+            'meta_data': self.dl.meta_data
         }
 
-        self.data_if = DataInterface(data=data)
+        return DataInterface(data=data)
 
+    @tracked_stage
     def preprocess_df(self) -> None:
         """
         Creates two dataframes, one containing cases, the other containing deaths data.
@@ -64,8 +103,7 @@ class JohnsHopkinsDataHandler:
         """
         for data_type in ['cases', 'deaths']:
             df = self.dl.time_series_data[data_type].drop(['Province/State', 'Lat', 'Long'], axis=1)
-            df_summed = df.groupby(df.index).sum()
-            df_transposed = df_summed.T
+            df_transposed = self.dl.backend.sum_by_index(df=df).T
 
             df_transposed.index = pd.to_datetime(
                 df_transposed.index, format='%m/%d/%y'
@@ -77,10 +115,10 @@ class JohnsHopkinsDataHandler:
         """
         Gets countries for which we have all necessary data.
         """
-        countries = set(self.dl.time_series_data['deaths'].columns)
-        countries_2 = set(self.dl.meta_data.index)
-
-        self.countries_inter = list(countries.intersection(countries_2))
+        self.countries_inter = self.dl.catalog.intersect(
+            self.dl.time_series_data['deaths'].columns,
+            self.dl.meta_data.index
+        )
 
     def filter_data(self, countries_inter: list) -> None:
         """
@@ -95,93 +133,177 @@ class JohnsHopkinsDataHandler:
         self.dl.time_series_data['cases'] = self.dl.time_series_data['cases'][countries_inter]
         self.dl.time_series_data['deaths'] = self.dl.time_series_data['deaths'][countries_inter]
 
+    @tracked_stage
     def get_df(self, countries_inter: list, data_type: str) -> pd.DataFrame:
         """
-        Gets the normalized dataframe. Indices are dates and columns are countries.
+        Gets the normalized dataframe. Indices are dates and columns are countries. Missing
+        dates are filled as set in the DataLoader.
         :param list countries_inter: countries for which we have all necessary data
         :param str data_type: either 'cases' or 'deaths'
         :return pd.DataFrame: the desired dataframe
         """
-        date_range = pd.date_range(start='2020-01-22', end='2023-03-09', freq='1D')
-
-        all_values = []
-        for country in countries_inter:
-            country_df = self.dl.time_series_data[data_type][country]
-
-            pop = self.dl.meta_data.loc[country]['Population']
-
-            values = np.array(
-                country_df.values.tolist()
-            ) / pop * 1000000
-
-            all_values.append(values)
+        counts = self.dl.validator.reindex_matrix(
+            df=self.dl.time_series_data[data_type],
+            date_format='%y-%m-%d',
+            name=f'Johns Hopkins {data_type} data'
+        )
 
-        df = pd.DataFrame(np.array(all_values).T, index=date_range, columns=countries_inter)
+        population = self.dl.meta_data.loc[countries_inter, 'Population'].to_numpy(dtype=float)
 
-        return df
+        return counts[countries_inter] / population * 1000000
 
+    @tracked_stage
     def create_index_dicts(self) -> None:
         """
         If the index type is BCG, then this function creates two dictionaries. One containing
         BCG indices for all countries, the other containing BCG indices for similar countries.
         If the index type is vodka, then this function creates one dictionary containing
         vodka consumption indices for similar countries.
+        If index families are given, the dictionaries of every family are created from the same
+        preprocessed data and stored in self.index_dicts, the first family is also stored in
+        self.index_all_countries_dict and self.index_similar_countries_dict. If the DataLoader
+        loaded a list of index types without index families, every type is a family.
         """
-        if self.dl.index_type == 'BCG':
-            self.create_bcg_indices()
-        elif self.dl.index_type == 'vodka':
-            self.create_vodka_indices()
-        elif self.dl.index_type == 'stringency':
-            self.create_stringency_indices()
-        else:
+        index_families = self.index_families
+        if index_families is None and isinstance(self.dl.index_type, list):
+            index_families = {index_type: index_type for index_type in self.dl.index_tables}
+        if index_families is None:
+            if self.dl.index_type is None:
+                return
+            self.index_all_countries_dict, self.index_similar_countries_dict = self.create_indices(
+                index_type=self.dl.index_type,
+                index_all_countries=self.dl.index_all_countries,
+                index_similar_countries=self.dl.index_similar_countries
+            )
             return
 
-    def create_bcg_indices(self) -> None:
+        for name, family in index_families.items():
+            index_type, options = family if isinstance(family, (tuple, list)) else (family, {})
+            if index_type not in self.dl.index_tables:
+                raise Exception(f'The DataLoader has not loaded the {index_type} index of {name}.')
+            index_all_countries, index_similar_countries = self.dl.index_tables[index_type]
+
+            all_dict, similar_dict = self.create_indices(
+                index_type=index_type,
+                index_all_countries=index_all_countries,
+                index_similar_countries=index_similar_countries,
+                **options
+            )
+            self.index_dicts[name] = {'all': all_dict, 'similar': similar_dict}
+
+        first_family = next(iter(self.index_dicts.values()), {'all': {}, 'similar': {}})
+        self.index_all_countries_dict = first_family['all']
+        self.index_similar_countries_dict = first_family['similar']
+
+    def create_indices(self, index_type: str, index_all_countries: pd.DataFrame,
+                       index_similar_countries: pd.DataFrame, **options) -> tuple:
+        """
+        Creates the index dictionaries of an index family. The options default to the ones given
+        in the constructor.
+        :param str index_type: 'BCG', 'vodka' or 'stringency'
+        :param pd.DataFrame index_all_countries: index table of all countries
+        :param pd.DataFrame index_similar_countries: index table of similar countries
+        :param options: keyword arguments of the constructor overriding its values
+        (e.g. take_log_of_vodka=True or stringency_similar_only=True)
+        :return tuple: dictionaries of all countries and of similar countries
+        """
+        options = {
+            'take_log_of_vodka': self.take_log_of_vodka,
+            'stringency_similar_only': self.stringency_similar_only,
+            'stringency_remove_italy': self.stringency_remove_italy,
+            'stringency_threshold': self.stringency_threshold,
+            'stringency_deaths_threshold': self.stringency_deaths_threshold,
+            **options
+        }
+
+        if index_type == 'BCG':
+            return self.create_bcg_indices(
+                index_all_countries=index_all_countries,
+                index_similar_countries=index_similar_countries
+            )
+        elif index_type == 'vodka':
+            return self.create_vodka_indices(
+                index_all_countries=index_all_countries,
+                index_similar_countries=index_similar_countries,
+                take_log_of_vodka=options['take_log_of_vodka']
+            )
+        elif index_type == 'stringency':
+            return self.create_stringency_indices(
+                stringency_data=index_all_countries,
+                similar_only=options['stringency_similar_only'],
+                remove_italy=options['stringency_remove_italy'],
+                stringency_threshold=options['stringency_threshold'],
+                deaths_threshold=options['stringency_deaths_threshold']
+            )
+        else:
+            raise Exception('Type of index can only be BCG, vodka or stringency.')
+
+    @staticmethod
+    def create_bcg_indices(index_all_countries: pd.DataFrame,
+                           index_similar_countries: pd.DataFrame) -> tuple:
         """
         Load BCG indices for both all and similar countries from bcg_index_article_data.xlsx
         and normalize them by dividing with the maximum (the minimum is 0).
+        :param pd.DataFrame index_all_countries: BCG index table of all countries
+        :param pd.DataFrame index_similar_countries: BCG index table of similar countries
+        :return tuple: dictionaries of all countries and of similar countries
         """
         # Remove Uzbekistan, Latvia and Romania with the [:-4]
-        bcg_index_df = self.dl.index_all_countries['Corrected BCG Index'][:-4]
+        bcg_index_df = index_all_countries['Corrected BCG Index'][:-4]
         normalized_bcg_index_df = bcg_index_df / max(bcg_index_df)
-        self.index_all_countries_dict = normalized_bcg_index_df.to_dict()
 
-        similar_bcg_index = self.dl.index_similar_countries['Corrected BCG Index'][:-1]
+        similar_bcg_index = index_similar_countries['Corrected BCG Index'][:-1]
         normalized_similar_bcg_index_df = similar_bcg_index / max(similar_bcg_index)
-        self.index_similar_countries_dict = normalized_similar_bcg_index_df.to_dict()
 
-    def create_vodka_indices(self) -> None:
+        return normalized_bcg_index_df.to_dict(), normalized_similar_bcg_index_df.to_dict()
+
+    @staticmethod
+    def create_vodka_indices(index_all_countries: pd.DataFrame, index_similar_countries: pd.DataFrame,
+                             take_log_of_vodka: bool) -> tuple:
         """
         Create vodka indices by loading data from vodka_consumption.csv and normalizing
-        the values.
+        the values. The given tables are left untouched.
+        :param pd.DataFrame index_all_countries: vodka consumption of all countries
+        :param pd.DataFrame index_similar_countries: vodka consumption of similar countries
+        :param bool take_log_of_vodka: whether to take the logarithm of the vodka indices or not
+        :return tuple: dictionaries of all countries and of similar countries
         """
-        df_similar = self.dl.index_similar_countries
-        if self.take_log_of_vodka:
-            df_similar['vodka_consumption'] = np.log2(df_similar['vodka_consumption'])
-        df_similar_normalized = (df_similar - df_similar.min()) / (df_similar.max() - df_similar.min())
-        self.index_similar_countries_dict = list(df_similar_normalized.to_dict().values())[0]
-
-        df_all = self.dl.index_all_countries
-        if self.take_log_of_vodka:
-            df_all['vodka_consumption'] = np.log2(df_all['vodka_consumption'])
-        df_all_normalized = (df_all - df_all.min()) / (df_all.max() - df_all.min())
-        self.index_all_countries_dict = list(df_all_normalized.to_dict().values())[0]
-
-    def create_stringency_indices(self) -> None:
+        dicts = []
+        for df in [index_all_countries, index_similar_countries]:
+            if take_log_of_vodka:
+                df = df.assign(vodka_consumption=np.log2(df['vodka_consumption']))
+            df_normalized = (df - df.min()) / (df.max() - df.min())
+            dicts.append(list(df_normalized.to_dict().values())[0])
+
+        return dicts[0], dicts[1]
+
+    def create_stringency_indices(self, stringency_data: pd.DataFrame, similar_only: bool,
+                                  remove_italy: bool, stringency_threshold: float,
+                                  deaths_threshold: float) -> tuple:
         """
         Create stringency indices by loading data from OxCGRT_stringency.csv
+        :param pd.DataFrame stringency_data: the stringency table
+        :param bool similar_only: True if only similar countries should be considered
+        :param bool remove_italy: True if Italy should be disregarded
+        :param float stringency_threshold: stringency level used for the indices
+        :param float deaths_threshold: number of deaths used for the indices
+        :return tuple: dictionaries of all countries and of similar countries, only one of them
+        is filled depending on similar_only
         """
-        df = self.dl.index_all_countries
         index_creator = StringencyIndexCreator(
             deaths_data=self.dl.time_series_data['deaths'],
-            stringency_data=df,
+            stringency_data=stringency_data,
             meta_data=self.dl.meta_data,
-            similar_only=self.stringency_similar_only,
-            remove_italy=self.stringency_remove_italy
+            similar_only=similar_only,
+            remove_italy=remove_italy,
+            catalog=self.dl.catalog,
+            stringency_threshold=stringency_threshold,
+            deaths_threshold=deaths_threshold,
+            memory_tracker=self.dl.memory_tracker
         )
         index_creator.run()
 
-        if not self.stringency_similar_only:
-            self.index_all_countries_dict = index_creator.final_indices
-        else:
-            self.index_similar_countries_dict = index_creator.final_indices
+        if not similar_only:
+            return index_creator.final_indices, {}
+
+        return {}, index_creator.final_indices
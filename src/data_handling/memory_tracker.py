@@ -0,0 +1,158 @@
+import functools
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+
+def tracked_stage(function):
+    """
+    Decorator measuring the memory of a method of a DataLoader or a data handler. The tracker is
+    taken from self.memory_tracker or self.dl.memory_tracker, if there is none, the method is
+    simply called. The stage is named as <class name>.<method name>.
+    :param function: the method
+    :return: the decorated method
+    """
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        tracker = getattr(self, 'memory_tracker', None)
+        if tracker is None:
+            tracker = getattr(getattr(self, 'dl', None), 'memory_tracker', None)
+        if tracker is None:
+            return function(self, *args, **kwargs)
+
+        with tracker.track(stage=f'{type(self).__name__}.{function.__name__}'):
+            return function(self, *args, **kwargs)
+
+    return wrapper
+
+
+class MemoryTracker:
+    """
+    Class for measuring the memory used by the stages of the pipeline. The peak of the memory
+    allocated by Python (tracemalloc) is measured for every stage, nested stages are measured
+    separately and are included in the peaks of their parents. The resident set size (RSS) of
+    the process is recorded at the start and at the end of every stage. Stages running
+    concurrently on threads share the process wide counters, so their measurements overlap.
+    """
+    def __init__(self, budgets: dict = None):
+        """
+        Constructor.
+        :param dict budgets: dictionary mapping stage names to their memory budgets in MiB
+        (e.g. {'JohnsHopkinsDataHandler.preprocess_df': 200})
+        """
+        self.budgets = budgets if budgets is not None else {}
+
+        self.records = []
+        self.stack = []
+
+    @contextmanager
+    def track(self, stage: str):
+        """
+        Context manager measuring a stage:
+        with tracker.track(stage='load'):
+            ...
+        :param str stage: name of the stage
+        """
+        self.start_stage(stage=stage)
+        try:
+            yield
+        finally:
+            self.end_stage()
+
+    def start_stage(self, stage: str) -> None:
+        """
+        Starts measuring a stage. tracemalloc is started if it is not running yet.
+        :param str stage: name of the stage
+        """
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+
+        current, peak = tracemalloc.get_traced_memory()
+        if self.stack:
+            self.stack[-1]['max_traced'] = max(self.stack[-1]['max_traced'], peak)
+        tracemalloc.reset_peak()
+
+        self.stack.append({
+            'stage': stage,
+            'start_traced': current,
+            'max_traced': current,
+            'start_rss': self.get_rss(),
+            'start_time': time.perf_counter(),
+            'started_tracing': started_tracing
+        })
+
+    def end_stage(self) -> None:
+        """
+        Ends measuring the innermost stage and saves its record.
+        """
+        _, peak = tracemalloc.get_traced_memory()
+        frame = self.stack.pop()
+        max_traced = max(frame['max_traced'], peak)
+        if self.stack:
+            self.stack[-1]['max_traced'] = max(self.stack[-1]['max_traced'], max_traced)
+
+        self.records.append({
+            'stage': frame['stage'],
+            'parent': self.stack[-1]['stage'] if self.stack else None,
+            'depth': len(self.stack),
+            'peak_mb': (max_traced - frame['start_traced']) / 2 ** 20,
+            'start_rss_mb': frame['start_rss'] / 2 ** 20,
+            'end_rss_mb': self.get_rss() / 2 ** 20,
+            'elapsed_s': time.perf_counter() - frame['start_time']
+        })
+
+        if frame['started_tracing']:
+            tracemalloc.stop()
+
+    @staticmethod
+    def get_rss() -> float:
+        """
+        Gets the resident set size of the process. On Linux the current value is read from
+        /proc, elsewhere the maximal resident set size is used.
+        :return float: RSS in bytes, NaN if it cannot be measured
+        """
+        try:
+            with open('/proc/self/statm', 'r') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            pass
+
+        try:
+            import resource
+        except ImportError:
+            return np.nan
+
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+    def report(self) -> pd.DataFrame:
+        """
+        Gets the measurements of all stages in the order they ended.
+        :return pd.DataFrame: one row per stage with the peak traced memory, the RSS at the start
+        and at the end, the elapsed time and the budget (all in MiB and seconds)
+        """
+        report = pd.DataFrame(
+            self.records,
+            columns=['stage', 'parent', 'depth', 'peak_mb', 'start_rss_mb', 'end_rss_mb', 'elapsed_s']
+        )
+        report['budget_mb'] = report['stage'].map(self.budgets).astype(float)
+        report['over_budget'] = report['peak_mb'] > report['budget_mb']
+
+        return report
+
+    def check_budgets(self) -> None:
+        """
+        Checks whether the peak of every stage is within its budget.
+        """
+        report = self.report()
+        over_budget = report[report['over_budget']]
+        if len(over_budget):
+            details = ', '.join(f"{row.stage}: {row.peak_mb:.1f} MiB > {row.budget_mb:.1f} MiB"
+                                for row in over_budget.itertuples())
+            raise Exception(f'{len(over_budget)} stages exceeded their memory budgets: {details}.')
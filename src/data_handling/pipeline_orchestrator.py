@@ -0,0 +1,134 @@
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from src.data_handling.data_interface import DataInterface
+from src.data_handling.dataloader import DataLoader
+from src.data_handling.euromomo_data_handler import EUROMOMODataHandler
+from src.data_handling.johns_hopkins_data_handler import JohnsHopkinsDataHandler
+from src.data_handling.rki_data_handler import RKIDataHandler
+from src.data_handling.who_data_handler import WHODataHandler
+
+
+def run_handler(dataset_origin: str, dl: DataLoader, handler_options: dict) -> DataInterface:
+    """
+    Creates and runs the data handler belonging to the dataset origin. Defined on module level,
+    so that it can be executed in a worker process.
+    :param str dataset_origin: 'who', 'johns_hopkins', 'euromomo' or 'rki'
+    :param DataLoader dl: a DataLoader instance
+    :param dict handler_options: keyword arguments of the handler's constructor
+    :return DataInterface: the DataInterface created by the handler
+    """
+    handler = PipelineOrchestrator.handler_classes[dataset_origin](dl=dl, **handler_options)
+    handler.run()
+
+    return handler.data_if
+
+
+class PipelineOrchestrator:
+    """
+    Class for building the views of several data sources concurrently. Loading the data (I/O)
+    is done on threads, the CPU-bound preprocessing of the handlers is done on processes.
+    """
+    handler_classes = {
+        'who': WHODataHandler,
+        'johns_hopkins': JohnsHopkinsDataHandler,
+        'euromomo': EUROMOMODataHandler,
+        'rki': RKIDataHandler
+    }
+
+    def __init__(self, data_folder_path: str, specs: list,
+                 max_workers: int = None, use_processes: bool = True, backend: str = 'pandas'):
+        """
+        Constructor.
+        :param str data_folder_path: path of the data folder
+        :param list specs: list of (dataset_origin, index_type, handler_options) tuples,
+        an optional fourth element is the name of the result (see get_spec_name())
+        :param int max_workers: maximal number of threads and processes,
+        if None, one worker is used for each spec
+        :param bool use_processes: True if the handlers should run in worker processes,
+        False if they should run on threads
+        :param str backend: backend of the DataLoaders, see ComputeBackend
+        """
+        self.data_folder_path = data_folder_path
+        self.specs = {self.get_spec_name(spec=spec): spec for spec in specs}
+        if len(self.specs) != len(specs):
+            raise Exception('Names of the specs have to be unique.')
+        for dataset_origin, _, _, *_ in self.specs.values():
+            if dataset_origin not in self.handler_classes:
+                raise Exception('Dataset origin is not valid.')
+        self.max_workers = max_workers if max_workers is not None else max(len(specs), 1)
+        self.use_processes = use_processes
+        self.backend = backend
+
+        self.data_ifs = {}
+        self.elapsed_times = {}
+
+    @staticmethod
+    def get_spec_name(spec: tuple) -> str:
+        """
+        Gets the name of a spec. If the spec has a fourth element, it is the name, otherwise the
+        name is built from the origin, the index type and the handler options,
+        e.g. 'johns_hopkins_vodka_take_log_of_vodka=True'.
+        :param tuple spec: (dataset_origin, index_type, handler_options[, name]) tuple
+        :return str: name of the spec
+        """
+        if len(spec) > 3:
+            return spec[3]
+
+        dataset_origin, index_type, handler_options = spec
+        parts = [dataset_origin]
+        if isinstance(index_type, list):
+            parts += index_type
+        elif index_type is not None:
+            parts.append(index_type)
+        parts += [f'{key}={value}' for key, value in sorted((handler_options or {}).items())]
+
+        return '_'.join(parts)
+
+    def run(self) -> dict:
+        """
+        Run function. Loads the data of every spec on a thread pool, and as soon as a spec's
+        data is loaded, runs its handler on the process (or thread) pool. The total time is close
+        to the time of the slowest spec.
+        :return dict: dictionary mapping spec names to DataInterface instances
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as io_pool, \
+                self.get_cpu_pool() as cpu_pool:
+            start_times = {}
+            load_futures = {}
+            for name, (dataset_origin, index_type, *_) in self.specs.items():
+                start_times[name] = time.perf_counter()
+                future = io_pool.submit(DataLoader, self.data_folder_path, dataset_origin, index_type,
+                                        backend=self.backend)
+                load_futures[future] = name
+
+            run_futures = {}
+            for future in as_completed(load_futures):
+                name = load_futures[future]
+                dataset_origin, _, handler_options, *_ = self.specs[name]
+                run_future = cpu_pool.submit(
+                    run_handler, dataset_origin, future.result(), handler_options or {}
+                )
+                run_futures[run_future] = name
+
+            for future in as_completed(run_futures):
+                name = run_futures[future]
+                self.data_ifs[name] = future.result()
+                self.elapsed_times[name] = time.perf_counter() - start_times[name]
+
+        return self.data_ifs
+
+    def get_cpu_pool(self) -> Executor:
+        """
+        Creates the executor used for running the handlers.
+        :return Executor: a process pool or a thread pool, depending on self.use_processes
+        """
+        if self.use_processes and self.backend != 'pandas':
+            # Forking after the thread pools of pyarrow or Polars are started can deadlock
+            return ProcessPoolExecutor(max_workers=self.max_workers,
+                                       mp_context=multiprocessing.get_context('spawn'))
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+
+        return ThreadPoolExecutor(max_workers=self.max_workers)
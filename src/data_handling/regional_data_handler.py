@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+from src.data_handling.data_interface import DataInterface
+from src.data_handling.dataloader import DataLoader
+from src.data_handling.memory_tracker import tracked_stage
+
+
+class RegionalDataHandler:
+    """
+    Class for processing long format data of subnational regions (e.g. German states, districts,
+    counties) with a region -> ... -> country hierarchy. The regions x weeks matrix is built in
+    one pass, and values are rolled up to the higher levels with sparse aggregation matrices.
+    The hierarchy and the groupings are taken from the metadata.
+    """
+    def __init__(self, dl: DataLoader, levels: list = None, region_column: str = 'State',
+                 value_column: str = 'Deaths_total', freq: str = 'W', week_format: str = 'rki'):
+        """
+        Constructor.
+        :param DataLoader dl: a DataLoader instance, its time_series_data is in long format
+        and its meta_data is indexed by regions and has a 'Population' column
+        :param list levels: columns of the metadata giving the higher levels of the hierarchy
+        (e.g. ['East-West'] or ['State', 'Country']), if None, no higher level is built
+        :param str region_column: column of the time series data containing the regions
+        :param str value_column: column of the time series data containing the (cumulative) values
+        :param str freq: 'W' if the time series data is weekly, 'D' if it is daily
+        :param str week_format: format of the week keys, see SchemaValidator.to_matrix()
+        """
+        self.dl = dl
+        self.levels = levels if levels is not None else []
+        self.region_column = region_column
+        self.value_column = value_column
+        self.freq = freq
+        self.week_format = week_format
+
+        self.regions = []
+        self.population = np.array([])
+        self.counts = pd.DataFrame()
+        self.data_if = DataInterface()
+
+    @tracked_stage
+    def run(self) -> None:
+        """
+        Run function. Gets the per million dataframe of the regions and of every level of the
+        hierarchy.
+        """
+        self.counts = self.get_counts()
+
+        level_dfs = {}
+        for level in self.levels:
+            group_counts, group_population = self.roll_up(counts=self.counts, level=level)
+            level_dfs[level] = self.get_per_million(counts=group_counts, population=group_population)
+
+        data = {
+            'deaths_df': self.get_per_million(counts=self.counts, population=self.population),
+            'meta_data': self.dl.meta_data.loc[self.regions],
+            'level_dfs': level_dfs
+        }
+
+        self.data_if = DataInterface(data=data)
+
+    @tracked_stage
+    def get_counts(self) -> pd.DataFrame:
+        """
+        Builds the date x region matrix of all regions at once. Only regions with population data
+        are kept, rows of the metadata without data (e.g. country totals) are dropped.
+        :return pd.DataFrame: indices are weeks (or dates), columns are regions
+        """
+        time_series_data = self.dl.time_series_data
+        counts = self.dl.validator.to_matrix(
+            entities=time_series_data[self.region_column].values,
+            dates=time_series_data.index,
+            values=time_series_data[self.value_column].values,
+            freq=self.freq,
+            week_format=self.week_format,
+            name='Regional data'
+        )
+
+        population = pd.to_numeric(
+            self.dl.meta_data['Population'].astype(str).str.replace(',', ''), errors='coerce'
+        )
+        self.regions = [region for region in population.dropna().index if region in counts.columns]
+        self.population = population.loc[self.regions].to_numpy(dtype=float)
+
+        return counts[self.regions]
+
+    def get_aggregation_matrix(self, level: str) -> tuple:
+        """
+        Creates the sparse region x group matrix of a level of the hierarchy, an element is 1 if
+        the region belongs to the group. Regions without a group are left out.
+        :param str level: column of the metadata
+        :return tuple: the sparse matrix and the names of the groups
+        """
+        from scipy import sparse
+
+        codes, groups = pd.factorize(self.dl.meta_data.loc[self.regions, level])
+        has_group = codes >= 0
+        matrix = sparse.csr_matrix(
+            (np.ones(has_group.sum()), (np.flatnonzero(has_group), codes[has_group])),
+            shape=(len(self.regions), len(groups))
+        )
+
+        return matrix, groups
+
+    @tracked_stage
+    def roll_up(self, counts: pd.DataFrame, level: str) -> tuple:
+        """
+        Sums the counts and the population of the regions for every group of a level with one
+        sparse matrix product.
+        :param pd.DataFrame counts: date x region dataframe
+        :param str level: column of the metadata
+        :return tuple: date x group counts and the population of the groups
+        """
+        matrix, groups = self.get_aggregation_matrix(level=level)
+
+        group_counts = pd.DataFrame(
+            (matrix.T @ counts.to_numpy(dtype=float).T).T,
+            index=counts.index,
+            columns=groups
+        )
+        group_population = matrix.T @ self.population
+
+        return group_counts, group_population
+
+    @staticmethod
+    def get_per_million(counts: pd.DataFrame, population: np.ndarray) -> pd.DataFrame:
+        """
+        Normalizes the counts with the population.
+        :param pd.DataFrame counts: date x entity dataframe
+        :param np.ndarray population: population of the entities
+        :return pd.DataFrame: values per million
+        """
+        return counts / population * 1000000
+
+    def get_groups(self, level: str) -> dict:
+        """
+        Gets the group of every region on a level of the hierarchy (e.g. for
+        GermanyStatesPlotPreparer).
+        :param str level: column of the metadata
+        :return dict: dictionary mapping regions to groups, regions without a group are left out
+        """
+        return self.dl.meta_data.loc[self.regions, level].dropna().to_dict()
@@ -1,8 +1,8 @@
-import numpy as np
 import pandas as pd
 
 from src.data_handling.data_interface import DataInterface
 from src.data_handling.dataloader import DataLoader
+from src.data_handling.memory_tracker import tracked_stage
 
 
 class RKIDataHandler:
@@ -18,35 +18,36 @@ class RKIDataHandler:
 
         self.data_if = DataInterface()
 
+    @tracked_stage
     def run(self) -> None:
         """
         Run function. Gets the processed dataframe.
         """
         data = {
-            'deaths_df': self.get_df()
+            'deaths_df': self.get_df(),
+            'meta_data': self.dl.meta_data
         }
 
         self.data_if = DataInterface(data=data)
 
+    @tracked_stage
     def get_df(self) -> pd.DataFrame:
         """
         Creates the processed dataframe. Indices are weeks, columns are german states, values are
         deaths per million.
         :return pd.DataFrame: the processed dataframe
         """
-        df_indices = sorted(set(list(self.dl.time_series_data.index)))
         state_names = list(self.dl.meta_data.index)[:-1]
 
-        all_values = []
-        for state in state_names:
-            state_df = self.dl.time_series_data[self.dl.time_series_data['State'] == state]
+        deaths = self.dl.validator.to_matrix(
+            entities=self.dl.time_series_data['State'].values,
+            dates=self.dl.time_series_data.index,
+            values=self.dl.time_series_data['Deaths_total'].values,
+            freq='W',
+            week_format='rki',
+            name='RKI data'
+        )
 
-            pop = self.dl.meta_data.loc[state]['Population']
+        population = self.dl.meta_data.loc[state_names, 'Population'].to_numpy(dtype=float)
 
-            values = np.array(
-                state_df['Deaths_total'].values.tolist()
-            ) / pop * 1000000
-
-            all_values.append(list(values))
-
-        return pd.DataFrame(np.array(all_values).T, index=df_indices, columns=state_names)
+        return deaths[state_names] / population * 1000000
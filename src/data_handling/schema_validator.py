@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+from src.data_handling.week_resampler import WeekResampler
+
+
+class SchemaValidator:
+    """
+    Class for validating raw data before building date x entity matrices. Checks columns,
+    duplicates and date continuity in single vectorized passes, and reindexes every entity onto
+    the full date axis, filling gaps in a configurable way.
+    """
+    fill_methods = ['ffill', 'zero', 'nan', 'interpolate', 'raise']
+
+    def __init__(self, fill_method: str = None):
+        """
+        Constructor.
+        :param str fill_method: how to fill missing dates of an entity:
+        - 'ffill': repeat the last known value (natural for cumulative series)
+        - 'zero': fill with 0
+        - 'nan': leave them missing
+        - 'interpolate': linear interpolation between known values
+        - 'raise': raise an exception
+        If None, cumulative series (cases, deaths) are forward filled and other series (e.g.
+        EUROMOMO z-scores) are left missing, so no values are made up for them.
+        """
+        if fill_method is not None and fill_method not in self.fill_methods:
+            raise Exception(f'fill_method can only be one of {", ".join(self.fill_methods)}.')
+        self.fill_method = fill_method
+
+    @staticmethod
+    def check_columns(df: pd.DataFrame, required_columns: list, name: str) -> None:
+        """
+        Checks that all required columns exist.
+        :param pd.DataFrame df: the dataframe
+        :param list required_columns: names of the required columns
+        :param str name: name of the data used in the error message
+        """
+        missing = [column for column in required_columns if column not in df.columns]
+        if missing:
+            raise Exception(f'{name} is missing the following columns: {", ".join(missing)}.')
+
+    @staticmethod
+    def check_duplicates(keys: list, name: str) -> None:
+        """
+        Checks that the combinations of the key arrays are unique.
+        :param list keys: list of equally long arrays (e.g. dates and country names)
+        :param str name: name of the data used in the error message
+        """
+        duplicated = pd.MultiIndex.from_arrays(keys).duplicated()
+        if duplicated.any():
+            examples = [tuple(key[i] for key in keys) for i in np.flatnonzero(duplicated)[:5]]
+            raise Exception(f'{name} contains {duplicated.sum()} duplicated rows, e.g. {examples}.')
+
+    @staticmethod
+    def parse_dates(dates, freq: str, name: str, date_format: str = None) -> pd.DatetimeIndex:
+        """
+        Parses dates (freq='D') or ISO week keys in the form YYYY-WW or YYYY-Www (freq='W').
+        Weeks are represented by their Mondays.
+        :param dates: array of dates or week keys
+        :param str freq: 'D' or 'W'
+        :param str name: name of the data used in the error message
+        :param str date_format: format of the dates if freq is 'D', if None, it is inferred
+        :return pd.DatetimeIndex: parsed dates
+        """
+        if freq == 'D':
+            parsed = pd.to_datetime(pd.Index(dates), format=date_format, errors='coerce')
+        elif freq == 'W':
+            parts = pd.Index(dates).astype(str).str.replace('-W', '-', regex=False).str.split('-')
+            iso_keys = parts.str[0] + '-W' + parts.str[1].str.zfill(2) + '-1'
+            parsed = pd.to_datetime(iso_keys, format='%G-W%V-%u', errors='coerce')
+        else:
+            raise Exception('freq can only be D or W.')
+
+        if parsed.isna().any():
+            examples = list(pd.Index(dates)[parsed.isna()][:5])
+            raise Exception(f'{name} contains dates that cannot be parsed, e.g. {examples}.')
+
+        return pd.DatetimeIndex(parsed)
+
+    def to_matrix(self, entities, dates, values, freq: str = 'D',
+                  week_format: str = 'euromomo', name: str = 'data',
+                  cumulative: bool = True) -> pd.DataFrame:
+        """
+        Builds a date x entity matrix from long format data in one vectorized pass. Checks
+        duplicates and dates, places every value directly on the full date axis, then fills the
+        gaps.
+        :param entities: array of entity names (e.g. countries)
+        :param dates: array of dates or week keys
+        :param values: array of values
+        :param str freq: 'D' for daily dates, 'W' for ISO week keys
+        :param str week_format: format of the week keys of the result if freq is 'W',
+        'euromomo' for YYYY-WW, 'rki' for YYYY-Www
+        :param str name: name of the data used in error messages
+        :param bool cumulative: False if the values are not cumulative, see fill_gaps()
+        :return pd.DataFrame: indices are dates (or week keys), columns are entities
+        """
+        parsed_dates = self.parse_dates(dates=dates, freq=freq, name=name)
+        entity_codes, entity_names = pd.factorize(np.asarray(entities))
+        self.check_duplicates(keys=[parsed_dates, entity_codes], name=name)
+
+        full_dates = self.get_full_dates(dates=parsed_dates, freq=freq)
+        step = pd.Timedelta(days=7 if freq == 'W' else 1)
+        date_positions = ((parsed_dates - full_dates[0]) // step).to_numpy()
+
+        matrix = np.full((len(full_dates), len(entity_names)), np.nan)
+        present = np.zeros(matrix.shape, dtype=bool)
+        matrix[date_positions, entity_codes] = np.asarray(values, dtype=float)
+        present[date_positions, entity_codes] = True
+
+        df = pd.DataFrame(matrix, index=full_dates, columns=entity_names)
+        df = self.fill_gaps(df=df, present=present, name=name, cumulative=cumulative)
+
+        if freq == 'W':
+            df.index = WeekResampler.get_week_keys(dates=full_dates, week_format=week_format)
+
+        return df
+
+    def reindex_matrix(self, df: pd.DataFrame, freq: str = 'D', name: str = 'data',
+                       date_format: str = None) -> pd.DataFrame:
+        """
+        Validates the date indices of a date x entity matrix and reindexes it onto the full
+        date axis, filling the gaps.
+        :param pd.DataFrame df: dataframe, indices are dates
+        :param str freq: 'D' for daily dates, 'W' for ISO week keys
+        :param str name: name of the data used in error messages
+        :param str date_format: format of the dates if freq is 'D', if None, it is inferred
+        :return pd.DataFrame: the reindexed dataframe, indices are dates
+        """
+        parsed_dates = self.parse_dates(dates=df.index, freq=freq, name=name, date_format=date_format)
+        self.check_duplicates(keys=[parsed_dates], name=name)
+
+        full_dates = self.get_full_dates(dates=parsed_dates, freq=freq)
+        df = df.set_axis(parsed_dates, axis=0)
+        present = np.broadcast_to(full_dates.isin(parsed_dates)[:, None], (len(full_dates), df.shape[1]))
+
+        return self.fill_gaps(df=df.reindex(full_dates), present=present, name=name)
+
+    @staticmethod
+    def get_full_dates(dates: pd.DatetimeIndex, freq: str) -> pd.DatetimeIndex:
+        """
+        Gets every date (or Monday of every week) between the first and the last date.
+        :param pd.DatetimeIndex dates: parsed dates
+        :param str freq: 'D' or 'W'
+        :return pd.DatetimeIndex: the full date axis
+        """
+        return pd.date_range(start=dates.min(), end=dates.max(), freq='W-MON' if freq == 'W' else 'D')
+
+    def get_fill_method(self, cumulative: bool = True) -> str:
+        """
+        Gets the fill method of a series.
+        :param bool cumulative: False if the values are not cumulative (e.g. z-scores)
+        :return str: the fill method given in the constructor, if it is None, 'ffill' for
+        cumulative series and 'nan' for other series
+        """
+        if self.fill_method is not None:
+            return self.fill_method
+
+        return 'ffill' if cumulative else 'nan'
+
+    def fill_gaps(self, df: pd.DataFrame, present: np.ndarray, name: str,
+                  cumulative: bool = True) -> pd.DataFrame:
+        """
+        Fills the cells for which the raw data had no row.
+        :param pd.DataFrame df: dataframe on the full date axis
+        :param np.ndarray present: boolean array, True where the raw data had a row
+        :param str name: name of the data used in error messages
+        :param bool cumulative: False if the values are not cumulative, see get_fill_method()
+        :return pd.DataFrame: the filled dataframe
+        """
+        fill_method = self.get_fill_method(cumulative=cumulative)
+        missing = ~present
+        if not missing.any() or fill_method == 'nan':
+            return df
+
+        if fill_method == 'raise':
+            gaps = pd.Series(missing.sum(axis=0), index=df.columns)
+            gaps = gaps[gaps > 0]
+            raise Exception(f'{name} has missing dates for {len(gaps)} entities, '
+                            f'e.g. {gaps.head(5).to_dict()}.')
+
+        if fill_method == 'zero':
+            filled = df.fillna(0)
+        elif fill_method == 'ffill':
+            filled = df.ffill()
+        else:
+            filled = df.interpolate(method='linear', limit_area='inside')
+
+        return df.mask(missing, filled)
@@ -1,13 +1,20 @@
-import numpy as np
+from contextlib import nullcontext
+
 import pandas as pd
 
+from src.data_handling.country_catalog import CountryCatalog
+from src.data_handling.crossing_index import CrossingIndex
+from src.data_handling.memory_tracker import MemoryTracker, tracked_stage
+
 
 class StringencyIndexCreator:
     """
     Class for creating the intervention speed indices (indices based on stringency).
     """
     def __init__(self, deaths_data: pd.DataFrame, stringency_data: pd.DataFrame,
-                 meta_data: pd.DataFrame, similar_only: bool, remove_italy: bool = False):
+                 meta_data: pd.DataFrame, similar_only: bool, remove_italy: bool = False,
+                 catalog: CountryCatalog = None, stringency_threshold: float = 50,
+                 deaths_threshold: float = 10, memory_tracker: MemoryTracker = None):
         """
         Constructor.
         :param pd.DataFrame deaths_data: dataframe containing mortality data
@@ -17,15 +24,30 @@ class StringencyIndexCreator:
         while creating stringency indices, False otherwise
         :param bool remove_italy: Italy is an outlier. We wish to disregard it in some
         cases
+        :param CountryCatalog catalog: catalog used for intersecting country names,
+        if None, the shared catalog is used
+        :param float stringency_threshold: stringency level whose first date is used
+        :param float deaths_threshold: mortality level whose first date is used
+        :param MemoryTracker memory_tracker: if given, the memory of the preprocessing and of
+        run() is measured
         """
+        self.memory_tracker = memory_tracker
         self.deaths_data = self.preprocess_deaths_data(deaths_data=deaths_data)
-        self.stringency_data = self.preprocess_stringency_dataframe(stringency_data=stringency_data)
+        with (nullcontext() if memory_tracker is None else
+              memory_tracker.track(stage='StringencyIndexCreator.preprocess_stringency_dataframe')):
+            self.stringency_data = self.preprocess_stringency_dataframe(
+                stringency_data=stringency_data
+            )
         self.meta_data = meta_data
         self.similar_only = similar_only
         self.remove_italy = remove_italy
+        self.catalog = catalog if catalog is not None else CountryCatalog.shared()
+        self.stringency_threshold = stringency_threshold
+        self.deaths_threshold = deaths_threshold
 
         self.final_indices = dict()
 
+    @tracked_stage
     def run(self) -> None:
         """
         Run function. Filters the dataframes for the common (or "similar") countries, then gets
@@ -41,14 +63,12 @@ class StringencyIndexCreator:
     @staticmethod
     def preprocess_deaths_data(deaths_data: pd.DataFrame) -> pd.DataFrame:
         """
-        Replaces the indices of deaths_data for dates in 'YYYY-MM-DD' format.
+        Replaces the indices of deaths_data ('YY-MM-DD' strings) with dates. The original
+        dataframe is left untouched.
         :param pd.DataFrame deaths_data: dataframe containing mortality data
         :return pd.DataFrame: dataframe with new indices
         """
-        deaths_data.index = (
-            pd.date_range('2020-01-22', periods=len(deaths_data), freq='D'))
-
-        return deaths_data
+        return deaths_data.set_axis(pd.to_datetime(deaths_data.index, format='%y-%m-%d'), axis=0)
 
     @staticmethod
     def preprocess_stringency_dataframe(stringency_data: pd.DataFrame) -> pd.DataFrame:
@@ -73,13 +93,11 @@ class StringencyIndexCreator:
         :return list: the desired list described above
         """
         if not self.similar_only:
-            countries = set(self.deaths_data.columns)
-            countries_2 = set(self.stringency_data.columns)
-            countries_3 = set(self.meta_data.index)
-            countries_3.remove('Eritrea')
-
-            countries_inter_1 = countries.intersection(countries_2)
-            countries_inter = list(countries_inter_1.intersection(countries_3))
+            countries_inter = self.catalog.intersect(
+                self.deaths_data.columns,
+                self.stringency_data.columns,
+                self.meta_data.index.drop('Eritrea', errors='ignore')
+            )
         else:
             countries_inter = [
                 'Italy', 'Netherlands', 'Switzerland', 'Sweden', 'Germany',
@@ -94,21 +112,19 @@ class StringencyIndexCreator:
     def get_date_differences(self) -> None:
         """
         Gets the indices. For each country c, let dm(c) be the first date when c's mortality
-        reached at least 10, and ds(c) be the first date when c's stringency reached at least 50.
-        Then, the index of c is ds(c) - dm(c).
+        reached at least deaths_threshold (10 by default), and ds(c) be the first date when c's
+        stringency reached at least stringency_threshold (50 by default). Then, the index of c is
+        ds(c) - dm(c). The first dates of all countries are looked up at once in crossing indices.
+        Countries that never reach one of the thresholds get no index.
         """
-        for country in self.stringency_data.columns:
-            country_stringency = self.stringency_data[country]
-            stringency_threshold_date = country_stringency[country_stringency >= 50].index.min()
-
-            country_deaths = self.deaths_data[country]
-            deaths_threshold_date = country_deaths[country_deaths >= 10].index.min()
-
-            day_diff = (
-                (pd.to_datetime(stringency_threshold_date) - pd.to_datetime(deaths_threshold_date)).days
-            )
+        countries = self.stringency_data.columns
+        stringency_dates = CrossingIndex(data=self.stringency_data).get_dates(
+            thresholds=self.stringency_threshold, columns=countries
+        )
+        deaths_dates = CrossingIndex(data=self.deaths_data).get_dates(
+            thresholds=self.deaths_threshold, columns=countries
+        )
 
-            if day_diff is np.nan:
-                continue
+        day_diffs = (pd.to_datetime(stringency_dates) - pd.to_datetime(deaths_dates)).dt.days
 
-            self.final_indices[country] = day_diff
+        self.final_indices = day_diffs.dropna().astype(int).to_dict()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+
+class WeekResampler:
+    """
+    Class for resampling daily date x country matrices to ISO weeks, keyed the same way as
+    the weekly data sources.
+    """
+    week_formats = {
+        'euromomo': '{year}-{week}',
+        'rki': '{year}-W{week}'
+    }
+    aggregations = ['sum', 'last', 'mean']
+
+    @staticmethod
+    def get_week_keys(dates: pd.DatetimeIndex, week_format: str) -> np.ndarray:
+        """
+        Creates the ISO week keys of the given dates.
+        :param pd.DatetimeIndex dates: daily dates
+        :param str week_format: 'euromomo' for keys in the form YYYY-WW,
+        'rki' for keys in the form YYYY-Www
+        :return np.ndarray: week keys in the same order as dates
+        """
+        if week_format not in WeekResampler.week_formats:
+            raise Exception('week_format can only be euromomo or rki.')
+
+        iso_calendar = dates.isocalendar()
+        years = iso_calendar['year'].values.astype(str).astype(object)
+        weeks = np.char.zfill(iso_calendar['week'].values.astype(str), 2).astype(object)
+
+        if week_format == 'euromomo':
+            return years + '-' + weeks
+
+        return years + '-W' + weeks
+
+    @staticmethod
+    def resample(data: pd.DataFrame, how: str = 'last',
+                 week_format: str = 'euromomo') -> pd.DataFrame:
+        """
+        Resamples a daily dataframe to ISO weeks in one vectorized groupby pass over the whole
+        matrix. Indices of the new dataframe are weeks, columns are the same as before.
+        :param pd.DataFrame data: dataframe with daily dates as indices
+        :param str how: 'sum', 'last' or 'mean' (for cumulative series 'last' is the natural choice)
+        :param str week_format: 'euromomo' for keys in the form YYYY-WW,
+        'rki' for keys in the form YYYY-Www
+        :return pd.DataFrame: the weekly dataframe
+        """
+        if how not in WeekResampler.aggregations:
+            raise Exception('how can only be sum, last or mean.')
+
+        dates = pd.DatetimeIndex(pd.to_datetime(data.index))
+        week_keys = WeekResampler.get_week_keys(dates=dates, week_format=week_format)
+
+        weekly = data.set_axis(dates, axis=0).groupby(week_keys, sort=True).agg(how)
+
+        return weekly
@@ -1,8 +1,8 @@
-import numpy as np
 import pandas as pd
 
 from src.data_handling.data_interface import DataInterface
 from src.data_handling.dataloader import DataLoader
+from src.data_handling.memory_tracker import tracked_stage
 
 
 class WHODataHandler:
@@ -16,43 +16,65 @@ class WHODataHandler:
         """
         self.dl = dl
 
+        self.countries_inter = []
+        self.cases_df = pd.DataFrame()
+        self.deaths_df = pd.DataFrame()
         self.data_if = DataInterface()
         self.index_all_countries_dict = {}
         self.index_similar_countries_dict = {}
+        self.index_dicts = {}
 
+    @tracked_stage
     def run(self) -> None:
         """
         Run function. Selects countries for which we have all necessary information, gets two
         dataframes: one containing cases data, the other containing deaths data.
         """
-        self.dl.meta_data.rename(index={'Russia': 'Russian Federation', 'Turkey': 'Türkiye'}, inplace=True)
+        self.prepare_data()
 
-        countries_inter = self.get_common_countries()
+        self.create_index_dicts()
 
-        self.filter_data(countries_inter=countries_inter)
+        self.data_if = self.get_data_interface()
 
-        self.create_index_dicts()
+    def prepare_data(self) -> None:
+        """
+        Filters the data, gets the cases and deaths dataframes. The index dictionaries are
+        created separately, see JohnsHopkinsDataHandler.prepare_data().
+        """
+        self.countries_inter = self.get_common_countries()
+
+        self.filter_data(countries_inter=self.countries_inter)
 
+        self.cases_df = self.get_df(countries_inter=self.countries_inter, data_type='cases')
+        self.deaths_df = self.get_df(countries_inter=self.countries_inter, data_type='deaths')
+
+    def get_data_interface(self) -> DataInterface:
+        """
+        Collects the prepared dataframes and the index dictionaries.
+        :return DataInterface: the DataInterface of the handler
+        """
         data = {
-            'cases_df': self.get_df(countries_inter=countries_inter, data_type='cases'),
-            'deaths_df': self.get_df(countries_inter=countries_inter, data_type='deaths'),
+            'cases_df': self.cases_df,
+            'deaths_df': self.deaths_df,
             'index_all_countries_dict': self.index_all_countries_dict,
-            'index_similar_countries_dict': self.index_similar_countries_dict
+            'index_similar_countries_dict': self.index_similar_countries_dict,
+            'index_dicts': self.index_dicts,
+            'meta_data': self.dl.meta_data
         }
 
-        self.dl.meta_data.rename(index={'Russian Federation': 'Russia', 'Türkiye': 'Turkey'}, inplace=True)
-
-        self.data_if = DataInterface(data=data)
+        return DataInterface(data=data)
 
     def get_common_countries(self) -> list:
         """
         Gets countries for which we have all necessary data.
         :return list: list of countries we can work with
         """
-        countries = set(self.dl.time_series_data['Country'].values)
-        countries_2 = set(self.dl.meta_data.index)
+        common_ids = self.dl.catalog.intersect_ids(
+            self.dl.time_series_data['country_id'].unique(),
+            self.dl.catalog.encode(names=self.dl.meta_data.index)
+        )
 
-        return list(countries.intersection(countries_2))
+        return self.dl.catalog.decode(ids=common_ids)
 
     def filter_data(self, countries_inter: list) -> None:
         """
@@ -64,34 +86,29 @@ class WHODataHandler:
             lambda x: float(str(x).replace(',', ''))
         )
         self.dl.time_series_data = self.dl.time_series_data[
-            self.dl.time_series_data['Country'].isin(countries_inter)
+            self.dl.backend.isin(self.dl.time_series_data['country_id'].values,
+                                 self.dl.catalog.encode(names=countries_inter))
         ]
 
+    @tracked_stage
     def get_df(self, countries_inter: list, data_type: str) -> pd.DataFrame:
         """
-        Creates the normalized dataframe. Indices are dates and columns are countries.
+        Creates the normalized dataframe. Indices are dates and columns are countries. Every
+        country is placed on the full date axis, gaps are filled as set in the DataLoader.
         :param list countries_inter: countries for which we have all necessary data
         :param str data_type: either 'cases' or 'deaths'
         :return pd.DataFrame: the desired dataframe
         """
-        date_range = pd.date_range(start='2020-01-04', end='2025-01-12', freq='1D')
-
-        all_values = []
-        for country in countries_inter:
-            country_df = self.dl.time_series_data[self.dl.time_series_data['Country'] == country]
-
-            pop = self.dl.meta_data.loc[country]['Population']
-
-            values = np.array(
-                country_df[f'Cumulative_{data_type}'].values.tolist()
-            ) / pop * 1000000
-
-            all_values.append(values)
+        counts = self.dl.validator.to_matrix(
+            entities=self.dl.time_series_data['Country'].values,
+            dates=self.dl.time_series_data.index,
+            values=self.dl.time_series_data[f'Cumulative_{data_type}'].values,
+            name='WHO data'
+        )
 
-        df = pd.DataFrame(np.array(all_values).T, index=date_range, columns=countries_inter)
-        df.rename(columns={'Russian Federation': 'Russia', 'Türkiye': 'Turkey'}, inplace=True)
+        population = self.dl.meta_data.loc[countries_inter, 'Population'].to_numpy(dtype=float)
 
-        return df
+        return counts[countries_inter] / population * 1000000
 
     def create_index_dicts(self) -> None:
         """
@@ -99,14 +116,51 @@ class WHODataHandler:
         BCG indices for all countries, the other containing BCG indices for similar countries.
         If the index type is vodka, then this function creates one dictionary containing
         vodka consumption indices for similar countries.
+        If the DataLoader loaded a list of index types, the dictionaries of every type are stored
+        in self.index_dicts, the first type is also stored in self.index_all_countries_dict and
+        self.index_similar_countries_dict.
         """
-        if self.dl.index_type == 'BCG':
-            self.index_all_countries_dict = self.dl.index_all_countries['BCG Index.  0 to 1'][:-1].to_dict()
-            self.index_all_countries_dict.pop('Uzbekistan')
+        if not isinstance(self.dl.index_type, list):
+            self.index_all_countries_dict, self.index_similar_countries_dict = self.create_indices(
+                index_type=self.dl.index_type,
+                index_all_countries=self.dl.index_all_countries,
+                index_similar_countries=self.dl.index_similar_countries
+            )
+            return
+
+        for index_type, (index_all_countries, index_similar) in self.dl.index_tables.items():
+            all_dict, similar_dict = self.create_indices(
+                index_type=index_type,
+                index_all_countries=index_all_countries,
+                index_similar_countries=index_similar
+            )
+            self.index_dicts[index_type] = {'all': all_dict, 'similar': similar_dict}
+
+        first_type = next(iter(self.index_dicts.values()), {'all': {}, 'similar': {}})
+        self.index_all_countries_dict = first_type['all']
+        self.index_similar_countries_dict = first_type['similar']
+
+    @staticmethod
+    def create_indices(index_type: str, index_all_countries: pd.DataFrame,
+                       index_similar_countries: pd.DataFrame) -> tuple:
+        """
+        Creates the index dictionaries of an index type.
+        :param str index_type: 'BCG' or 'vodka'
+        :param pd.DataFrame index_all_countries: table of the index of all countries
+        :param pd.DataFrame index_similar_countries: table of the index of similar countries
+        :return tuple: dictionary of all countries and dictionary of similar countries
+        (empty for vodka)
+        """
+        if index_type == 'BCG':
+            index_all_countries_dict = index_all_countries['BCG Index.  0 to 1'][:-1].to_dict()
+            index_all_countries_dict.pop('Uzbekistan')
+
+            index_similar_countries_dict = (
+                index_similar_countries['Corrected BCG Index'][:-1].to_dict())
+
+            return index_all_countries_dict, index_similar_countries_dict
+
+        df = index_similar_countries
+        df_normalized = (df - df.min()) / (df.max() - df.min())
 
-            self.index_similar_countries_dict = (
-                self.dl.index_similar_countries['Corrected BCG Index'][:-1].to_dict())
-        else:
-            df = self.dl.index_similar_countries
-            df_normalized = (df - df.min()) / (df.max() - df.min())
-            self.index_similar_countries_dict = list(df_normalized.to_dict().values())[0]
+        return {}, list(df_normalized.to_dict().values())[0]
@@ -0,0 +1,148 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+from src.batch_runner import BatchRunner
+from src.stage_graph import LRUCache
+
+
+class QueryService:
+    """
+    Local HTTP service keeping the datasets of a BatchRunner config in memory and answering
+    preparer queries from an LRU cache. A query is a preparer config (see BatchRunner) with one
+    date, week or day after alignment, given as the query string of a GET request, e.g.
+    /linear_regression?dataset=jh_vodka&countries_type=similar&do_align_data=true&days_after_alignment=100
+    /group?dataset=who_bcg&data_type=deaths&dates=2021-03-01
+    The response is the JSON output of BatchRunner.run_preparer(). /datasets lists the datasets.
+    Requests are handled on threads, cached answers are returned concurrently, but preparers are
+    run one at a time: they share the dataframes of the datasets, and pandas builds the lookup
+    tables of an index lazily, which is not thread-safe. Concurrent requests of the same query
+    run the preparer only once.
+    """
+    preparer_types = ['linear_regression', 'group', 'excess_deaths', 'germany_states']
+
+    def __init__(self, runner: BatchRunner, max_cache_size: int = 256):
+        """
+        Constructor.
+        :param BatchRunner runner: the runner, its datasets are built by run() if they are not
+        built yet
+        :param int max_cache_size: maximal number of query results kept in memory
+        """
+        self.runner = runner
+        self.cache = LRUCache(max_size=max_cache_size)
+        self.lock = threading.Lock()
+
+    def run(self) -> None:
+        """
+        Run function. Builds the datasets of the runner if needed.
+        """
+        if not self.runner.data_ifs:
+            self.runner.build_datasets()
+
+    def query(self, preparer_type: str, params: dict) -> dict:
+        """
+        Gets the outputs of a preparer, from the cache if the same query was answered before.
+        :param str preparer_type: 'linear_regression', 'group', 'excess_deaths' or
+        'germany_states'
+        :param dict params: the rest of the preparer config, including the dataset
+        :return dict: the preparer config, the outputs of the runs, whether they were cached and
+        the elapsed time in milliseconds
+        """
+        start_time = time.perf_counter()
+        if preparer_type not in self.preparer_types:
+            raise Exception(f'Type of preparer can only be {", ".join(self.preparer_types)}.')
+        if params.get('dataset') not in self.runner.data_ifs:
+            raise Exception(f"Dataset is not valid, it can be {', '.join(self.runner.data_ifs)}.")
+
+        preparer_config = {'type': preparer_type, **params}
+        key = json.dumps(preparer_config, sort_keys=True)
+
+        runs = self.cache.get(key)
+        cached = runs is not None
+        if not cached:
+            with self.lock:
+                # the query may have been answered while this thread was waiting
+                if key in self.cache:
+                    runs, cached = self.cache.get(key), True
+                else:
+                    try:
+                        runs = self.runner.run_preparer(preparer_config=preparer_config)
+                    except KeyError as error:
+                        raise Exception(f'Missing parameter or value: {error}.')
+                    self.cache.put(key, runs)
+
+        return {
+            'config': preparer_config,
+            'runs': runs,
+            'cached': cached,
+            'elapsed_ms': (time.perf_counter() - start_time) * 1000
+        }
+
+    @staticmethod
+    def parse_params(query: str) -> dict:
+        """
+        Parses a query string into preparer config values. Values are read as JSON if possible
+        (e.g. 100, true), otherwise they are kept as strings. Dates, weeks and days after
+        alignment are put into lists.
+        :param str query: the query string
+        :return dict: the config values
+        """
+        params = {}
+        for key, value in parse_qsl(query):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+            if key in BatchRunner.label_keys and not isinstance(value, list):
+                value = [value]
+            params[key] = value
+
+        return params
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> None:
+        """
+        Serves queries until the process is interrupted. Requests are handled on threads.
+        :param int port: port of the server
+        :param str host: host of the server, by default only local requests are accepted
+        """
+        self.run()
+
+        server = ThreadingHTTPServer((host, port), self.get_request_handler())
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    def get_request_handler(self) -> type:
+        """
+        Creates the request handler class of the HTTP server answering queries with this service.
+        :return type: subclass of BaseHTTPRequestHandler
+        """
+        service = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                try:
+                    if url.path == '/datasets':
+                        status, body = 200, {'datasets': list(service.runner.data_ifs)}
+                    else:
+                        status, body = 200, service.query(
+                            preparer_type=url.path.strip('/'),
+                            params=service.parse_params(query=url.query)
+                        )
+                except Exception as error:
+                    status, body = 400, {'error': str(error)}
+
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+        return RequestHandler
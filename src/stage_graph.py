@@ -0,0 +1,421 @@
+import copy
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from src.analysis.data_aligner import DataAligner
+from src.analysis.linear_regression_plot_preparer import LinearRegressionPlotPreparer
+from src.data_handling.data_interface import DataInterface
+from src.data_handling.dataloader import DataLoader
+from src.data_handling.pipeline_orchestrator import PipelineOrchestrator
+
+
+class LRUCache:
+    """
+    Thread-safe dictionary keeping at most max_size items, the least recently used item is
+    dropped first.
+    """
+    def __init__(self, max_size: int = 32):
+        """
+        Constructor.
+        :param int max_size: maximal number of items
+        """
+        self.max_size = max_size
+
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key) -> bool:
+        with self.lock:
+            return key in self.items
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.items)
+
+    def get(self, key, default=None):
+        """
+        Gets an item and marks it as the most recently used one.
+        :param key: key of the item
+        :param default: returned if the key is missing
+        :return: the item or default
+        """
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def put(self, key, value) -> None:
+        """
+        Adds an item, drops the least recently used items if the cache is full.
+        :param key: key of the item
+        :param value: the item
+        """
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Removes all items.
+        """
+        with self.lock:
+            self.items.clear()
+
+
+class StageGraph:
+    """
+    Class for running the pipeline as a dependency graph of stages. Every node is fingerprinted
+    by its function (including its source code and the code of the package), its parameters and
+    the fingerprints of its inputs, so after changing a parameter only the nodes downstream of
+    the change are recomputed, and results of edited code are not read from the disk cache.
+    Results are kept in an in-memory LRU cache and optionally pickled into a cache folder.
+    """
+    def __init__(self, max_cache_size: int = 32, cache_dir: str = None):
+        """
+        Constructor.
+        :param int max_cache_size: maximal number of results kept in memory
+        :param str cache_dir: if given, results are also pickled into this folder and read back
+        from there when they are not in memory
+        """
+        self.cache = LRUCache(max_size=max_cache_size)
+        self.cache_dir = cache_dir
+
+        self.code_version = self.get_code_version()
+        self.nodes = {}
+        self.computed = []
+
+    @staticmethod
+    def get_code_version() -> str:
+        """
+        Hashes the source files of the package, the stages depend on the code of the handlers
+        and preparers as well, not only on the code of their own functions.
+        :return str: hash of the .py files under the src folder
+        """
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        sha = hashlib.sha1()
+        for dir_path, dir_names, file_names in sorted(os.walk(package_dir)):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if file_name.endswith('.py'):
+                    path = os.path.join(dir_path, file_name)
+                    sha.update(os.path.relpath(path, package_dir).encode())
+                    with open(path, 'rb') as f:
+                        sha.update(f.read())
+
+        return sha.hexdigest()[:16]
+
+    @staticmethod
+    def get_function_hash(function) -> str:
+        """
+        Hashes the source code of a function, or its bytecode if the source is not available.
+        :param function: the function
+        :return str: the hash
+        """
+        try:
+            code = inspect.getsource(function).encode()
+        except (OSError, TypeError):
+            code = function.__code__.co_code
+
+        return hashlib.sha1(code).hexdigest()[:16]
+
+    def add_node(self, name: str, function, inputs: list = None, params: dict = None,
+                 copy_inputs: bool = False) -> None:
+        """
+        Adds a stage. The stage is computed as function(*input results, **params).
+        :param str name: name of the node
+        :param function: module level function computing the stage
+        :param list inputs: names of the nodes whose results are the inputs
+        :param dict params: keyword arguments of the function (JSON serializable)
+        :param bool copy_inputs: True if the function modifies its inputs (e.g. a data handler
+        modifying its DataLoader), then deep copies of the cached inputs are passed
+        """
+        inputs = inputs if inputs is not None else []
+        missing = [node for node in inputs if node not in self.nodes]
+        if missing:
+            raise Exception(f'Inputs of {name} are not in the graph: {", ".join(missing)}.')
+
+        self.nodes[name] = {
+            'function': function,
+            'inputs': inputs,
+            'params': params if params is not None else {},
+            'copy_inputs': copy_inputs
+        }
+
+    def set_params(self, name: str, **params) -> None:
+        """
+        Changes parameters of a node, the node and its descendants get new fingerprints.
+        :param str name: name of the node
+        :param params: the new parameter values
+        """
+        self.nodes[name]['params'] = {**self.nodes[name]['params'], **params}
+
+    def get_fingerprint(self, name: str) -> str:
+        """
+        Hashes the function (name and source), the code version and the parameters of a node
+        together with the fingerprints of its inputs.
+        :param str name: name of the node
+        :return str: the fingerprint
+        """
+        node = self.nodes[name]
+        description = json.dumps({
+            'function': f"{node['function'].__module__}.{node['function'].__qualname__}",
+            'code': self.get_function_hash(function=node['function']),
+            'code_version': self.code_version,
+            'params': node['params'],
+            'inputs': [self.get_fingerprint(name=input_name) for input_name in node['inputs']]
+        }, sort_keys=True, default=repr)
+
+        return hashlib.sha1(description.encode()).hexdigest()[:16]
+
+    def run(self, name: str):
+        """
+        Gets the result of a node, computing it and its missing inputs if needed.
+        :param str name: name of the node
+        :return: the result of the node
+        """
+        self.computed = []
+
+        return self.get_result(name=name)
+
+    def get_result(self, name: str):
+        """
+        Gets the result of a node from the memory cache, the disk cache or by computing it.
+        :param str name: name of the node
+        :return: the result of the node
+        """
+        fingerprint = self.get_fingerprint(name=name)
+        key = (name, fingerprint)
+
+        result = self.cache.get(key, default=None)
+        if result is not None:
+            return result
+
+        cache_path = None
+        if self.cache_dir is not None:
+            cache_path = os.path.join(self.cache_dir, f'{name}-{fingerprint}.pkl')
+            if os.path.exists(cache_path):
+                with open(cache_path, 'rb') as f:
+                    result = pickle.load(f)
+                self.cache.put(key, result)
+                return result
+
+        node = self.nodes[name]
+        inputs = [self.get_result(name=input_name) for input_name in node['inputs']]
+        if node['copy_inputs']:
+            inputs = copy.deepcopy(inputs)
+        result = node['function'](*inputs, **node['params'])
+        self.computed.append(name)
+
+        self.cache.put(key, result)
+        if cache_path is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(cache_path, 'wb') as f:
+                pickle.dump(result, f)
+
+        return result
+
+
+def get_data_files(data_folder_path: str) -> dict:
+    """
+    Gets the size and the modification time of the files of the data folder, they are parameters
+    of the loader stage, so re-downloaded data is not read from the cache. The x coordinate files
+    written by the preparers are left out.
+    :param str data_folder_path: path of the data folder
+    :return dict: [size, modification time in ns] of every file name
+    """
+    data_files = {}
+    for entry in sorted(os.scandir(data_folder_path), key=lambda entry: entry.name):
+        if entry.is_file() and not entry.name.startswith('x_coordinates'):
+            stat = entry.stat()
+            data_files[entry.name] = [stat.st_size, stat.st_mtime_ns]
+
+    return data_files
+
+
+def load_data(data_folder_path: str, dataset_origin: str, index_type: str = None,
+              data_files: dict = None) -> DataLoader:
+    """
+    Loader stage of the regression graph.
+    :param str data_folder_path: path of the data folder
+    :param str dataset_origin: origin of the mortality data
+    :param str index_type: 'BCG', 'vodka' or 'stringency'
+    :param dict data_files: output of get_data_files(), only used for the fingerprint
+    :return DataLoader: the DataLoader
+    """
+    return DataLoader(data_folder_path=data_folder_path, dataset_origin=dataset_origin,
+                      index_type=index_type)
+
+
+def prepare_data(dl: DataLoader, dataset_origin: str):
+    """
+    Handler stage of the regression graph. Preprocesses and filters the data without creating
+    the index dictionaries, so it does not depend on the handler options. Handlers without a
+    separate index step are run completely.
+    :param DataLoader dl: the DataLoader (it is modified by the handler)
+    :param str dataset_origin: origin of the mortality data
+    :return: the data handler
+    """
+    handler = PipelineOrchestrator.handler_classes[dataset_origin](dl=dl)
+    if hasattr(handler, 'prepare_data'):
+        handler.prepare_data()
+    else:
+        handler.run()
+
+    return handler
+
+
+def create_indices(handler, handler_options: dict = None) -> DataInterface:
+    """
+    Index stage of the regression graph. Creates the index dictionaries from the prepared data.
+    :param handler: output of the handler stage (it is modified)
+    :param dict handler_options: keyword arguments of the handler's constructor
+    :return DataInterface: the DataInterface of the handler
+    """
+    handler_options = handler_options or {}
+    for name, value in handler_options.items():
+        if not hasattr(handler, name) or name == 'dl':
+            raise Exception(f'{type(handler).__name__} has no option {name}.')
+        setattr(handler, name, value)
+
+    if not hasattr(handler, 'prepare_data'):
+        return handler.data_if
+
+    handler.create_index_dicts()
+
+    return handler.get_data_interface()
+
+
+def align_data(data_if: DataInterface, data_type: str = 'deaths', do_align_data: bool = True,
+               threshold: float = None) -> DataInterface:
+    """
+    Alignment stage of the regression graph. Aligns the selected series of all countries, the
+    result carries it as deaths_df, so the regression stage does not align again.
+    :param DataInterface data_if: the DataInterface of the handler
+    :param str data_type: 'deaths', 'cases' or a series derived from them
+    :param bool do_align_data: whether to align data or not
+    :param float threshold: alignment threshold, see DataAligner.align_data()
+    :return DataInterface: DataInterface with the (aligned) series as deaths_df
+    """
+    series = data_if.get_series(data_type=data_type)
+    if do_align_data:
+        series = DataAligner.align_data(data=series, threshold=threshold)
+
+    return DataInterface(data={
+        'deaths_df': series,
+        'index_all_countries_dict': data_if.index_all_countries_dict,
+        'index_similar_countries_dict': data_if.index_similar_countries_dict,
+        'index_dicts': data_if.index_dicts,
+        'meta_data': data_if.meta_data
+    })
+
+
+def run_regression(data_if: DataInterface, countries_type: str, labels: list = None,
+                   prepare_for_log_plot: bool = False, estimator: str = 'ols',
+                   index_name: str = None) -> pd.DataFrame:
+    """
+    Regression stage of the regression graph.
+    :param DataInterface data_if: output of the alignment stage
+    :param str countries_type: either 'all' or 'similar'
+    :param list labels: days after alignment (or dates) of the fits, if None, all of them
+    :param bool prepare_for_log_plot: True if the logarithm of the values is regressed
+    :param str estimator: 'ols', 'theil_sen', 'spearman' or 'kendall'
+    :param str index_name: name of an index family in data_if.index_dicts
+    :return pd.DataFrame: statistics of the fits, see LinearRegressionPlotPreparer.run_sweep()
+    """
+    preparer = LinearRegressionPlotPreparer(
+        data_if=data_if,
+        countries_type=countries_type,
+        do_align_data=False,
+        prepare_for_log_plot=prepare_for_log_plot,
+        index_name=index_name
+    )
+
+    return preparer.run_sweep(dates=labels, estimator=estimator)
+
+
+def build_regression_graph(data_folder_path: str, dataset_origin: str, index_type: str = None,
+                           handler_options: dict = None, data_type: str = 'deaths',
+                           do_align_data: bool = True, alignment_threshold: float = None,
+                           countries_type: str = 'all', labels: list = None,
+                           prepare_for_log_plot: bool = False, estimator: str = 'ols',
+                           index_name: str = None, max_cache_size: int = 32,
+                           cache_dir: str = None) -> StageGraph:
+    """
+    Builds the loader -> handler -> indices -> alignment -> regression graph. The result of the
+    'regression' node is the output of LinearRegressionPlotPreparer.run_sweep(). Parameters can
+    be changed later with StageGraph.set_params(), e.g.
+    graph.set_params('regression', prepare_for_log_plot=True) only recomputes the regression,
+    graph.set_params('indices', handler_options={'take_log_of_vodka': True}) does not rerun the
+    preprocessing of the handler. The sizes and modification times of the data files are
+    parameters of the loader, after changing the data while the graph is kept in memory they can
+    be updated with graph.set_params('loader', data_files=get_data_files(data_folder_path)).
+    :param str data_folder_path: path of the data folder
+    :param str dataset_origin: origin of the mortality data
+    :param str index_type: 'BCG', 'vodka' or 'stringency'
+    :param dict handler_options: keyword arguments of the handler's constructor
+    :param str data_type: 'deaths', 'cases' or a series derived from them
+    :param bool do_align_data: whether to align data or not
+    :param float alignment_threshold: alignment threshold, see DataAligner.align_data()
+    :param str countries_type: either 'all' or 'similar'
+    :param list labels: days after alignment (or dates) of the fits, if None, all of them
+    :param bool prepare_for_log_plot: True if the logarithm of the values is regressed
+    :param str estimator: 'ols', 'theil_sen', 'spearman' or 'kendall'
+    :param str index_name: name of an index family in DataInterface.index_dicts
+    :param int max_cache_size: maximal number of results kept in memory
+    :param str cache_dir: folder of the disk cache, if None, results are only kept in memory
+    :return StageGraph: the graph
+    """
+    graph = StageGraph(max_cache_size=max_cache_size, cache_dir=cache_dir)
+
+    graph.add_node(
+        name='loader',
+        function=load_data,
+        params={'data_folder_path': data_folder_path, 'dataset_origin': dataset_origin,
+                'index_type': index_type,
+                'data_files': get_data_files(data_folder_path=data_folder_path)}
+    )
+    graph.add_node(
+        name='handler',
+        function=prepare_data,
+        inputs=['loader'],
+        params={'dataset_origin': dataset_origin},
+        copy_inputs=True
+    )
+    graph.add_node(
+        name='indices',
+        function=create_indices,
+        inputs=['handler'],
+        params={'handler_options': handler_options or {}},
+        copy_inputs=True
+    )
+    graph.add_node(
+        name='alignment',
+        function=align_data,
+        inputs=['indices'],
+        params={'data_type': data_type, 'do_align_data': do_align_data,
+                'threshold': alignment_threshold}
+    )
+    graph.add_node(
+        name='regression',
+        function=run_regression,
+        inputs=['alignment'],
+        params={'countries_type': countries_type, 'labels': labels,
+                'prepare_for_log_plot': prepare_for_log_plot, 'estimator': estimator,
+                'index_name': index_name}
+    )
+
+    return graph
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+COUNTRIES = ['Italy', 'Netherlands', 'Switzerland', 'Sweden', 'Germany', 'Portugal', 'Denmark',
+             'Poland', 'Norway', 'Hungary', 'Bulgaria', 'Finland', 'Ukraine', 'Lithuania', 'Greece',
+             'Estonia', 'Ireland', 'Belgium', 'Russia', 'Turkey', 'Japan', 'Brazil', 'India',
+             'Austria']
+STATES = ['Bayern', 'Nordrhein-Westfalen', 'Baden-Württemberg', 'Niedersachsen', 'Hessen',
+          'Rheinland-Pfalz', 'Saarland', 'Schleswig-Holstein', 'Brandenburg', 'Thüringen',
+          'Sachsen-Anhalt', 'Mecklenburg-Vorpommern', 'Sachsen', 'Berlin', 'Hamburg', 'Bremen']
+
+
+def get_cumulative(rng: np.random.Generator, n_days: int) -> np.ndarray:
+    start = rng.integers(0, n_days // 4)
+    daily = np.zeros(n_days)
+    daily[start:] = rng.poisson(rng.uniform(1, 50), n_days - start)
+
+    return np.cumsum(daily)
+
+
+@pytest.fixture(scope='session')
+def data_folder(tmp_path_factory) -> str:
+    """
+    Synthetic data folder with the files read by DataLoader.
+    """
+    rng = np.random.default_rng(0)
+    folder = tmp_path_factory.mktemp('data')
+    n = len(COUNTRIES)
+    population = rng.integers(500_000, 100_000_000, n)
+
+    pd.DataFrame(
+        {'Population': [f'{p:,}' for p in population], 'income': rng.integers(1, 5, n),
+         'bcg_policy': rng.choice([1, 2, 3], n)},
+        index=pd.Index(COUNTRIES, name='Country')
+    ).to_csv(folder / 'meta.csv')
+
+    who_dates = pd.date_range('2020-01-04', '2021-06-30')
+    pd.concat([
+        pd.DataFrame({'Date_reported': who_dates.strftime('%Y-%m-%d'),
+                      'Country': {'Russia': 'Russian Federation'}.get(country, country),
+                      'Cumulative_cases': get_cumulative(rng, len(who_dates)) * 10,
+                      'Cumulative_deaths': get_cumulative(rng, len(who_dates))})
+        for country in COUNTRIES
+    ]).set_index('Date_reported').to_csv(folder / 'who_cases_and_deaths.csv')
+
+    jh_dates = pd.date_range('2020-01-22', '2021-06-30')
+    for data_type, multiplier in [('cases', 10), ('deaths', 1)]:
+        rows = [
+            [province, country, 1.0, 2.0] + list(get_cumulative(rng, len(jh_dates)) * multiplier)
+            for country in COUNTRIES
+            for province in ([np.nan, 'X'] if country == 'Denmark' else [np.nan])
+        ]
+        columns = ['Province/State', 'Country/Region', 'Lat', 'Long'] + \
+            [f'{d.month}/{d.day}/{d.strftime("%y")}' for d in jh_dates]
+        pd.DataFrame(rows, columns=columns).to_csv(folder / f'johns_hopkins_{data_type}.csv',
+                                                   index=False)
+
+    with pd.ExcelWriter(folder / 'bcg_index_article_data.xlsx') as writer:
+        pd.DataFrame({'code': range(n), 'country': COUNTRIES, 'population_2018': population}) \
+            .to_excel(writer, sheet_name='Coarse', index=False)
+        bcg_index = pd.DataFrame(
+            {'BCG Index.  0 to 1': rng.uniform(0, 1, n + 1),
+             'Corrected BCG Index': rng.uniform(0, 50, n + 1)},
+            index=pd.Index(COUNTRIES[:-1] + ['Uzbekistan', 'Latvia'], name='Country')
+        )
+        bcg_index.to_excel(writer, sheet_name='BCG Index')
+        bcg_index.iloc[:15].to_excel(writer, sheet_name='BCG Index Similar Countries')
+        pd.DataFrame(
+            {'East-West': ['West'] * 8 + ['East'] * 6 + ['West', 'West'],
+             'Population': rng.integers(600_000, 13_000_000, len(STATES))},
+            index=pd.Index(STATES, name='State')
+        ).to_excel(writer, sheet_name='Germany')
+
+    pd.DataFrame({'vodka_consumption': rng.uniform(0.1, 10, 14)},
+                 index=pd.Index(COUNTRIES[:14], name='Country')).to_csv(folder / 'vodka_consumption.csv')
+    pd.DataFrame({'vodka_consumption': rng.uniform(0.1, 10, 20)},
+                 index=pd.Index(COUNTRIES[:20], name='Country')).to_csv(folder / 'vodka_consumption_all.csv')
+
+    weeks = [f'{year}-{week:02d}' for year in (2020, 2021) for week in range(1, 53)]
+    pd.concat([
+        pd.DataFrame({'country': country, 'week': weeks, 'zscore': rng.normal(0, 3, len(weeks))})
+        for country in COUNTRIES
+    ]).to_csv(folder / 'excess_deaths.csv', sep=';', index=False)
+
+    rki_weeks = [f'{year}-W{week:02d}' for year in (2020, 2021) for week in range(1, 53)]
+    pd.concat([
+        pd.DataFrame({'State': state, 'Deaths_total': np.cumsum(rng.poisson(20, len(rki_weeks)))},
+                     index=pd.Index(rki_weeks, name='Week'))
+        for state in STATES
+    ]).to_csv(folder / 'deaths_by_german_states.csv')
+
+    stringency_dates = pd.date_range('2020-01-01', '2021-06-30')
+    stringency = pd.DataFrame(
+        rng.uniform(0, 100, (n, len(stringency_dates))).cumsum(axis=1)
+        / np.arange(1, len(stringency_dates) + 1),
+        columns=stringency_dates.strftime('%Y%m%d')
+    )
+    for column in ['Jurisdiction', 'RegionCode', 'RegionName', 'Extra2', 'Extra1']:
+        stringency.insert(0, column, 'x')
+    stringency.insert(0, 'CountryName', COUNTRIES)
+    stringency.insert(0, 'CountryCode', [country[:3].upper() for country in COUNTRIES])
+    stringency.to_csv(folder / 'OxCGRT_stringency.csv', index=False)
+
+    return str(folder)
@@ -0,0 +1,33 @@
+import pandas as pd
+
+from src.analysis.linear_regression_plot_preparer import LinearRegressionPlotPreparer
+from src.analysis.partitioned_writer import PartitionedWriter
+from src.batch_runner import BatchRunner
+
+
+def test_sweep_outputs_are_written_to_partitions(data_folder, tmp_path):
+    config = {
+        'data_folder_path': data_folder,
+        'file_format': 'npz',
+        'datasets': [{'name': 'jh_bcg', 'origin': 'johns_hopkins', 'index_type': 'BCG'}],
+        'preparers': [
+            {'type': 'regression_sweep', 'dataset': 'jh_bcg', 'countries_type': 'all',
+             'do_align_data': True, 'days_after_alignment': [50, 100, 150]},
+            {'type': 'rolling_windows', 'dataset': 'jh_bcg', 'countries_type': 'all',
+             'do_align_data': True, 'window_lengths': [14, 28]}
+        ]
+    }
+    runner = BatchRunner(config=config, results_dir=str(tmp_path), use_processes=False)
+    runner.run()
+
+    writer = PartitionedWriter(root_path=str(tmp_path / 'partitions'), file_format='npz')
+    preparer = LinearRegressionPlotPreparer(data_if=runner.data_ifs['jh_bcg'], countries_type='all',
+                                            do_align_data=True, prepare_for_log_plot=False)
+    expected = {
+        'regression_sweep': preparer.run_sweep(days_after_alignment=[50, 100, 150]),
+        'rolling_windows': preparer.run_rolling_windows(window_lengths=[14, 28])
+    }
+    for preparer_config in config['preparers']:
+        saved = writer.read(**runner.get_partition(preparer_config=preparer_config))
+        pd.testing.assert_frame_equal(saved, expected[preparer_config['type']].astype(float),
+                                      check_index_type=False, check_names=False)
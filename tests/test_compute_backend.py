@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_handling.compute_backend import ComputeBackend
+from src.data_handling.dataloader import DataLoader
+from src.data_handling.johns_hopkins_data_handler import JohnsHopkinsDataHandler
+from src.data_handling.who_data_handler import WHODataHandler
+
+
+@pytest.fixture(params=['pyarrow', 'polars'])
+def backend(request) -> str:
+    pytest.importorskip(request.param)
+
+    return request.param
+
+
+@pytest.mark.parametrize('file_name, kwargs', [
+    ('who_cases_and_deaths.csv', {'index_col': [0]}),
+    ('vodka_consumption_all.csv', {'index_col': [0]}),
+    ('excess_deaths.csv', {'sep': ';'}),
+    ('johns_hopkins_deaths.csv',
+     {'index_col': [1], 'usecols': lambda column: column != 'Province/State'})
+])
+def test_read_csv(data_folder, backend, file_name, kwargs):
+    path = os.path.join(data_folder, file_name)
+
+    pd.testing.assert_frame_equal(ComputeBackend(name=backend).read_csv(path, **kwargs),
+                                  ComputeBackend().read_csv(path, **kwargs))
+
+
+def test_sum_by_index(backend):
+    df = pd.DataFrame(np.arange(20, dtype=float).reshape(5, 4), columns=['a', 'b', 'c', 'd'],
+                      index=pd.Index(['y', 'x', 'y', 'z', 'x'], name='Country/Region'))
+    df.iloc[1, 2] = np.nan
+
+    pd.testing.assert_frame_equal(ComputeBackend(name=backend).sum_by_index(df=df),
+                                  ComputeBackend().sum_by_index(df=df))
+
+
+def test_isin(backend):
+    values = np.array([3, 1, 4, 1, 5, 9, 2, 6])
+    test_values = np.array([1, 2, 3])
+
+    np.testing.assert_array_equal(ComputeBackend(name=backend).isin(values, test_values),
+                                  ComputeBackend().isin(values, test_values))
+
+
+@pytest.mark.parametrize('handler_class, dataset_origin, index_type, kwargs', [
+    (JohnsHopkinsDataHandler, 'johns_hopkins', 'vodka', {}),
+    (JohnsHopkinsDataHandler, 'johns_hopkins', 'stringency',
+     {'date_range': ('2020-03-01', '2021-01-01')}),
+    (WHODataHandler, 'who', 'BCG', {}),
+    (WHODataHandler, 'who', 'BCG', {'countries': ['Italy', 'Germany', 'Russia']})
+])
+def test_handlers(data_folder, backend, handler_class, dataset_origin, index_type, kwargs):
+    data_ifs = []
+    for name in ['pandas', backend]:
+        dl = DataLoader(data_folder, dataset_origin, index_type, backend=name, **kwargs)
+        handler = handler_class(dl=dl)
+        handler.run()
+        data_ifs.append(handler.data_if)
+
+    pandas_if, backend_if = data_ifs
+    pd.testing.assert_frame_equal(backend_if.deaths_df, pandas_if.deaths_df)
+    pd.testing.assert_frame_equal(backend_if.cases_df, pandas_if.cases_df)
+    for name in ['index_all_countries_dict', 'index_similar_countries_dict']:
+        pd.testing.assert_series_equal(pd.Series(getattr(backend_if, name), dtype=float),
+                                       pd.Series(getattr(pandas_if, name), dtype=float))
+
+
+def test_unknown_or_missing_backend():
+    with pytest.raises(Exception):
+        ComputeBackend(name='spark')
+    assert ComputeBackend(name='auto').name in ComputeBackend.backends
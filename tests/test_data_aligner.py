@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from src.analysis.data_aligner import DataAligner
+from src.data_handling.data_interface import DataInterface
+
+
+def test_align_data_skips_missing_rows_of_derived_series():
+    dates = pd.date_range('2020-03-01', periods=30)
+    deaths = np.zeros((30, 2))
+    deaths[10:, 0] = np.arange(1, 21)
+    deaths[20:, 1] = np.arange(1, 11)
+    data_if = DataInterface(data={'deaths_df': pd.DataFrame(deaths, index=dates, columns=['A', 'B'])})
+
+    rolling = data_if.get_series(data_type='deaths_rolling_7')
+    assert rolling.iloc[0].isna().all()
+
+    start_positions = DataAligner.get_start_positions(data=rolling)
+    expected = [np.flatnonzero(np.isfinite(rolling[c]) & (rolling[c] != 0))[0] for c in rolling]
+    np.testing.assert_array_equal(start_positions, expected)
+
+    aligned = DataAligner.align_data(data=rolling)
+    assert aligned.iloc[0].notna().all()
+    assert (aligned.iloc[0] > 0).all()
+
+
+def test_align_data_all_zero_column_starts_at_first_row():
+    data = pd.DataFrame({'A': [0., 0., 1., 2.], 'B': [0., 0., 0., 0.]})
+
+    np.testing.assert_array_equal(DataAligner.get_start_positions(data=data), [2, 0])
+
+
+def test_save_aligned_keeps_full_precision(tmp_path):
+    aligned = pd.DataFrame({'A': [1 / 3, 2 / 3], 'B': [np.pi, np.e]})
+
+    DataAligner.save_aligned(aligned_data=aligned, data_folder_path=str(tmp_path))
+    saved = pd.read_csv(tmp_path / 'generated' / 'aligned_values.csv', index_col=0)
+    np.testing.assert_array_equal(saved.to_numpy(), aligned.T.to_numpy())
+
+    DataAligner.save_aligned(aligned_data=aligned, data_folder_path=str(tmp_path), decimals=2)
+    saved = pd.read_csv(tmp_path / 'generated' / 'aligned_values.csv', index_col=0)
+    np.testing.assert_array_equal(saved.to_numpy(), aligned.T.round(2).to_numpy())
@@ -0,0 +1,31 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.data_handling.dataloader import DataLoader
+from src.data_handling.euromomo_data_handler import EUROMOMODataHandler
+
+
+def get_excess_deaths(data_folder: str, **loader_options) -> pd.DataFrame:
+    handler = EUROMOMODataHandler(dl=DataLoader(data_folder, 'euromomo', **loader_options))
+    handler.run()
+
+    return handler.data_if.deaths_df
+
+
+def test_gaps_of_z_scores_are_not_forward_filled(data_folder, tmp_path):
+    folder = shutil.copytree(data_folder, tmp_path / 'data')
+    excess_deaths = pd.read_csv(folder / 'excess_deaths.csv', sep=';')
+    dropped = (excess_deaths['country'] == 'Italy') & excess_deaths['week'].isin(['2020-20', '2020-21'])
+    excess_deaths[~dropped].to_csv(folder / 'excess_deaths.csv', sep=';', index=False)
+
+    df = get_excess_deaths(data_folder=str(folder))
+    assert df.loc[['2020-20', '2020-21'], 'Italy'].isna().all()
+    # the data has no week 2020-53, it is missing for every country
+    assert df.loc['2020-53'].isna().all()
+    assert df.drop(index=['2020-20', '2020-21', '2020-53']).notna().all().all()
+
+    filled = get_excess_deaths(data_folder=str(folder), fill_method='ffill')
+    np.testing.assert_array_equal(filled.loc[['2020-20', '2020-21'], 'Italy'],
+                                  [df.loc['2020-19', 'Italy']] * 2)
@@ -0,0 +1,51 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.germany_states_plot_preparer import GermanyStatesPlotPreparer
+from src.data_handling.data_interface import DataInterface
+
+
+def get_preparer(regions: list, groups: dict, data_folder_path: str) -> GermanyStatesPlotPreparer:
+    deaths_df = pd.DataFrame(np.arange(2 * len(regions), dtype=float).reshape(2, -1),
+                             index=['2021-W01', '2021-W02'], columns=regions)
+
+    return GermanyStatesPlotPreparer(data_if=DataInterface(data={'deaths_df': deaths_df}),
+                                     year='2021', week=2, data_folder_path=data_folder_path,
+                                     groups=groups)
+
+
+def test_many_groups_get_separate_bands(tmp_path):
+    regions = [f'region {i}' for i in range(40)]
+    groups = {region: f'group {i % 8}' for i, region in enumerate(regions)}
+
+    preparer = get_preparer(regions=regions, groups=groups, data_folder_path=str(tmp_path))
+    preparer.run()
+
+    assert len(preparer.x_coordinates) == len(regions)
+    assert len(preparer.y_means) == 8
+    labels = np.array([preparer.group_labels[region] for region in preparer.state_names])
+    x_coordinates = preparer.x_coordinates
+    for label in range(1, 8):
+        assert x_coordinates[labels == label].max() < x_coordinates[labels == label + 1].min()
+
+
+def test_saved_coordinates_of_other_groups_are_not_reused(tmp_path):
+    with open(tmp_path / 'x_coordinates_germany_states.json', 'w') as f:
+        json.dump({'coordinates': [1.0, 4.0]}, f)
+
+    regions = ['a', 'b', 'c']
+    preparer = get_preparer(regions=regions, groups={'a': 1, 'b': 1, 'c': 2},
+                            data_folder_path=str(tmp_path))
+    preparer.run()
+
+    assert len(preparer.x_coordinates) == 3
+
+    with open(tmp_path / 'x_coordinates_germany_states.json', 'w') as f:
+        json.dump({'coordinates': [1.0, 4.0]}, f)
+    preparer = get_preparer(regions=regions, groups=None, data_folder_path=str(tmp_path))
+    preparer.state_names = regions
+    x_coordinates = preparer.get_x_coordinates(groups=[['a', 'b'], ['c']])
+
+    assert len(x_coordinates) == 3
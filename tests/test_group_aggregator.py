@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analysis.group_aggregator import GroupAggregator
+from src.data_handling.data_interface import DataInterface
+from src.data_handling.dataloader import DataLoader
+from src.data_handling.pipeline_orchestrator import run_handler
+
+
+def get_data_if(data_folder: str, dataset_origin: str) -> DataInterface:
+    return run_handler(dataset_origin=dataset_origin,
+                       dl=DataLoader(data_folder_path=data_folder, dataset_origin=dataset_origin,
+                                     index_type='BCG'),
+                       handler_options={})
+
+
+def test_aggregates_match_brute_force(data_folder):
+    data_if = get_data_if(data_folder=data_folder, dataset_origin='who')
+    deaths = data_if.deaths_df.copy()
+    deaths.iloc[100:200, :3] = np.nan
+    deaths.iloc[:, 5] = np.nan
+    data_if = DataInterface(data={'deaths_df': deaths, 'meta_data': data_if.meta_data})
+
+    groupings = {
+        'income': 'income',
+        'paper': GroupAggregator.paper_groups,
+        'overlapping': {'all': 'income > 0', 'high': 'income >= 3'}
+    }
+    aggregator = GroupAggregator(data_if=data_if, groupings=groupings)
+    aggregator.run()
+
+    meta_data = data_if.meta_data.loc[aggregator.countries]
+    population = pd.to_numeric(meta_data['Population'].astype(str).str.replace(',', ''))
+    members = {('income', value): meta_data.index[meta_data['income'] == value]
+               for value in meta_data['income'].unique()}
+    for grouping, definition in list(groupings.items())[1:]:
+        members.update({(grouping, name): meta_data.index[meta_data.eval(query)]
+                        for name, query in definition.items()})
+
+    assert len(aggregator.aggregates.columns) == len(members)
+    for column, countries in members.items():
+        d, pop = deaths[countries], population[countries]
+        expected = (d * pop).sum(axis=1) / d.notna().mul(pop).sum(axis=1)
+        np.testing.assert_allclose(aggregator.aggregates[column].to_numpy(), expected.to_numpy())
+
+
+def test_missing_grouping_columns_raise(data_folder):
+    data_if = get_data_if(data_folder=data_folder, dataset_origin='johns_hopkins')
+
+    with pytest.raises(Exception, match='income are not in the metadata'):
+        GroupAggregator(data_if=data_if, groupings={'income': 'income'}).run()
+    with pytest.raises(Exception, match='not in the metadata: name .income. is not defined'):
+        GroupAggregator(data_if=data_if, groupings={'paper': GroupAggregator.paper_groups}).run()
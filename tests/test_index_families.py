@@ -0,0 +1,29 @@
+from src.data_handling.dataloader import DataLoader
+from src.data_handling.johns_hopkins_data_handler import JohnsHopkinsDataHandler
+from src.data_handling.who_data_handler import WHODataHandler
+
+
+def test_who_handler_with_list_of_index_types(data_folder):
+    handler = WHODataHandler(dl=DataLoader(data_folder, 'who', ['BCG', 'vodka']))
+    handler.run()
+
+    for index_type in ['BCG', 'vodka']:
+        single = WHODataHandler(dl=DataLoader(data_folder, 'who', index_type))
+        single.run()
+        assert handler.data_if.index_dicts[index_type] == {
+            'all': single.index_all_countries_dict,
+            'similar': single.index_similar_countries_dict
+        }
+        if index_type == 'BCG':
+            assert handler.data_if.index_all_countries_dict == single.index_all_countries_dict
+
+
+def test_johns_hopkins_handler_with_list_of_index_types(data_folder):
+    handler = JohnsHopkinsDataHandler(dl=DataLoader(data_folder, 'johns_hopkins', ['vodka', 'BCG']))
+    handler.run()
+
+    single = JohnsHopkinsDataHandler(dl=DataLoader(data_folder, 'johns_hopkins', 'BCG'))
+    single.run()
+
+    assert set(handler.data_if.index_dicts) == {'vodka', 'BCG'}
+    assert handler.data_if.index_dicts['BCG']['similar'] == single.index_similar_countries_dict
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Heavy or optional dependencies that may only be imported inside the functions using them
+# (pyarrow is left out, pandas imports it by itself when it is installed)
+LAZY_MODULES = ['scipy', 'gdown', 'openpyxl', 'polars']
+# Import time of the modules of a package in seconds, after numpy and pandas are imported
+# (about 0.05 s now, importing scipy.stats after pandas takes about 0.4 s)
+IMPORT_BUDGET = 0.25
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('package', ['src.data_handling', 'src.analysis'])
+def test_importing_modules_does_not_load_heavy_dependencies(package):
+    code = (
+        'import importlib, pkgutil, sys\n'
+        f'package = importlib.import_module({package!r})\n'
+        'for module in pkgutil.iter_modules(package.__path__):\n'
+        '    importlib.import_module(f"{package.__name__}.{module.name}")\n'
+        f'print(",".join(name for name in {LAZY_MODULES!r} if name in sys.modules))\n'
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True,
+                            text=True, check=True)
+
+    assert result.stdout.strip() == ''
+
+
+def test_importing_entry_points_does_not_load_heavy_dependencies():
+    code = (
+        'import sys\n'
+        'import src.__main__, src.batch_runner, src.stage_graph, src.query_service\n'
+        f'print(",".join(name for name in {LAZY_MODULES!r} if name in sys.modules))\n'
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True,
+                            text=True, check=True)
+
+    assert result.stdout.strip() == ''
+
+
+@pytest.mark.parametrize('package', ['src.data_handling', 'src.analysis'])
+def test_importing_modules_stays_within_the_budget(package):
+    code = (
+        'import importlib, pkgutil, time\n'
+        'import numpy, pandas\n'
+        'start = time.perf_counter()\n'
+        f'package = importlib.import_module({package!r})\n'
+        'for module in pkgutil.iter_modules(package.__path__):\n'
+        '    importlib.import_module(f"{package.__name__}.{module.name}")\n'
+        'print(time.perf_counter() - start)\n'
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True,
+                            text=True, check=True)
+
+    assert float(result.stdout) < IMPORT_BUDGET
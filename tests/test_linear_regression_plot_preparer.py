@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from src.analysis.linear_regression_plot_preparer import LinearRegressionPlotPreparer
+from src.data_handling.dataloader import DataLoader
+from src.data_handling.pipeline_orchestrator import run_handler
+
+
+@pytest.fixture(scope='module')
+def data_if(data_folder):
+    return run_handler(dataset_origin='johns_hopkins',
+                       dl=DataLoader(data_folder_path=data_folder, dataset_origin='johns_hopkins',
+                                     index_type='BCG'),
+                       handler_options={})
+
+
+@pytest.mark.parametrize('prepare_for_log_plot', [False, True])
+def test_jackknife_rows_match_refits_without_the_country(data_if, prepare_for_log_plot):
+    preparer = LinearRegressionPlotPreparer(data_if=data_if, countries_type='all',
+                                            do_align_data=True,
+                                            prepare_for_log_plot=prepare_for_log_plot)
+    days = [100, 450]
+    jackknife = preparer.run_jackknife(days_after_alignment=days)
+    y_matrix = preparer.get_y_matrix(days_after_alignment=days)
+    x = preparer.x_coordinates
+
+    # on day 450 some countries have no value, dropping them gives the full sample fit
+    assert y_matrix.loc[450].isna().any()
+    for day in days:
+        y = y_matrix.loc[day].to_numpy(dtype=float)
+        if prepare_for_log_plot:
+            y = np.log(y)
+        for i, country in enumerate(preparer.country_names):
+            kept = np.isfinite(y) & (np.arange(len(y)) != i)
+            expected = stats.linregress(x[kept], y[kept])
+            row = jackknife.loc[(day, country)]
+
+            assert row['slope'] == pytest.approx(expected.slope)
+            assert row['intercept'] == pytest.approx(expected.intercept)
+            assert row['r_squared'] == pytest.approx(expected.rvalue ** 2)
+            assert row['p_value'] == pytest.approx(expected.pvalue)
+            assert row['n'] == kept.sum()
+
+
+@pytest.mark.parametrize('prepare_for_log_plot', [False, True])
+def test_rolling_windows_match_linregress(data_if, prepare_for_log_plot):
+    preparer = LinearRegressionPlotPreparer(data_if=data_if, countries_type='all',
+                                            do_align_data=True,
+                                            prepare_for_log_plot=prepare_for_log_plot)
+    rolling = preparer.run_rolling_windows(window_lengths=[7, 30], starts=[0, 50, 480, 510])
+    aligned = preparer.get_y_matrix()
+    x = preparer.x_coordinates
+
+    # the start 510 is too late for a 30-day window
+    assert list(rolling.index) == [(7, 0), (7, 50), (7, 480), (7, 510),
+                                   (30, 0), (30, 50), (30, 480)]
+    for window, start in rolling.index:
+        y = aligned.loc[start + window].to_numpy(dtype=float) - aligned.loc[start].to_numpy(dtype=float)
+        if prepare_for_log_plot:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                y = np.log(y)
+        kept = np.isfinite(y)
+        expected = stats.linregress(x[kept], y[kept])
+        row = rolling.loc[(window, start)]
+
+        assert row['slope'] == pytest.approx(expected.slope, nan_ok=True)
+        assert row['intercept'] == pytest.approx(expected.intercept, nan_ok=True)
+        assert row['p_value'] == pytest.approx(expected.pvalue, nan_ok=True)
+        assert row['n'] == kept.sum()
+
+    pd.testing.assert_frame_equal(
+        rolling, preparer.run_rolling_windows(window_lengths=[7, 30]).loc[rolling.index]
+    )
+
+
+def test_rolling_windows_need_cumulative_data(data_if):
+    preparer = LinearRegressionPlotPreparer(data_if=data_if, countries_type='all',
+                                            do_align_data=True, prepare_for_log_plot=False,
+                                            data_type='deaths_new')
+
+    with pytest.raises(Exception, match='cumulative'):
+        preparer.run_rolling_windows(window_lengths=[7])
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_handling.dataloader import DataLoader
+from src.data_handling.johns_hopkins_data_handler import JohnsHopkinsDataHandler
+from src.data_handling.memory_tracker import MemoryTracker
+from src.data_handling.stringency_index_creator import StringencyIndexCreator
+
+# Size of the synthetic scale datasets: rows (countries and provinces) x days
+N_ROWS = 2000
+N_DAYS = 1000
+
+# Peak budgets of the stages on the scale datasets in MiB, one wide float table is about 15 MiB
+BUDGETS_MB = {
+    'JohnsHopkinsDataHandler.preprocess_df': 70,
+    'StringencyIndexCreator.preprocess_stringency_dataframe': 60
+}
+
+
+def get_scale_time_series(rng: np.random.Generator) -> pd.DataFrame:
+    dates = pd.date_range('2020-01-22', periods=N_DAYS)
+    df = pd.DataFrame(np.cumsum(rng.poisson(5, (N_ROWS, N_DAYS)), axis=1).astype(float),
+                      columns=[f'{d.month}/{d.day}/{d.strftime("%y")}' for d in dates],
+                      index=pd.Index([f'Country {i // 4}' for i in range(N_ROWS)],
+                                     name='Country/Region'))
+    df.insert(0, 'Long', 2.0)
+    df.insert(0, 'Lat', 1.0)
+    df.insert(0, 'Province/State', [f'Province {i % 4}' for i in range(N_ROWS)])
+
+    return df
+
+
+def get_scale_stringency(rng: np.random.Generator) -> pd.DataFrame:
+    dates = pd.date_range('2020-01-01', periods=N_DAYS + 59)
+    df = pd.DataFrame(rng.uniform(0, 100, (N_ROWS // 4, len(dates))),
+                      columns=dates.strftime('%Y%m%d'),
+                      index=pd.Index([f'Country {i}' for i in range(N_ROWS // 4)],
+                                     name='CountryName'))
+    for column in ['Jurisdiction', 'RegionCode', 'RegionName', 'Extra2', 'Extra1', 'CountryCode']:
+        df.insert(0, column, 'x')
+
+    return df
+
+
+@pytest.fixture
+def scale_tracker(data_folder) -> MemoryTracker:
+    """
+    Runs the memory hungry stages on the scale datasets and returns their measurements.
+    """
+    rng = np.random.default_rng(0)
+    tracker = MemoryTracker(budgets=BUDGETS_MB)
+
+    dl = DataLoader(data_folder, 'johns_hopkins', memory_tracker=tracker)
+    handler = JohnsHopkinsDataHandler(dl=dl)
+    handler.dl.time_series_data = {
+        'cases': get_scale_time_series(rng=rng),
+        'deaths': get_scale_time_series(rng=rng)
+    }
+    handler.preprocess_df()
+
+    StringencyIndexCreator(
+        deaths_data=handler.dl.time_series_data['deaths'],
+        stringency_data=get_scale_stringency(rng=rng),
+        meta_data=pd.DataFrame(index=handler.dl.time_series_data['deaths'].columns),
+        similar_only=False,
+        memory_tracker=tracker
+    ).run()
+
+    return tracker
+
+
+def test_stages_are_within_their_budgets(scale_tracker):
+    report = scale_tracker.report()
+
+    assert set(BUDGETS_MB) <= set(report['stage'])
+    scale_tracker.check_budgets()
+
+
+def test_exceeded_budget_fails(scale_tracker):
+    scale_tracker.budgets = {stage: 0.001 for stage in BUDGETS_MB}
+
+    with pytest.raises(Exception, match='exceeded their memory budgets'):
+        scale_tracker.check_budgets()
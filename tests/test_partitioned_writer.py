@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analysis.partitioned_writer import PartitionedWriter
+
+
+def get_parts(n_parts: int) -> list:
+    rng = np.random.default_rng(0)
+
+    return [
+        pd.DataFrame(
+            rng.normal(size=(3, 2)),
+            index=pd.MultiIndex.from_product([[7 * (i + 1)], [10, 11, 12]], names=['window', 'start']),
+            columns=['slope', 'p_value']
+        )
+        for i in range(n_parts)
+    ]
+
+
+@pytest.fixture(params=['npz', 'parquet', 'feather'])
+def writer(request, tmp_path) -> PartitionedWriter:
+    if request.param != 'npz':
+        pytest.importorskip('pyarrow')
+
+    return PartitionedWriter(root_path=str(tmp_path), file_format=request.param)
+
+
+def test_read_returns_parts_in_writing_order(writer):
+    parts = get_parts(n_parts=3)
+    paths = [writer.write(df=part, dataset='jh', index='BCG') for part in parts]
+
+    # modification times do not decide the order
+    for i, path in enumerate(paths):
+        os.utime(path, (1e9 - i, 1e9 - i))
+
+    pd.testing.assert_frame_equal(writer.read(dataset='jh', index='BCG'), pd.concat(parts),
+                                  check_index_type=False)
+
+
+def test_unchanged_parts_are_not_written_again(writer):
+    first, second = get_parts(n_parts=2)
+
+    assert writer.write(df=first, dataset='jh', index='BCG') is not None
+    assert writer.write(df=first, dataset='jh', index='BCG') is None
+
+    writer.write(df=second, dataset='jh', index='BCG', mode='overwrite')
+    pd.testing.assert_frame_equal(writer.read(dataset='jh', index='BCG'), second,
+                                  check_index_type=False)
@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from src.batch_runner import BatchRunner
+from src.data_handling.data_interface import DataInterface
+from src.data_handling.derived_series_calculator import DerivedSeriesCalculator
+from src.query_service import QueryService
+
+
+def test_concurrent_queries_share_the_coordinate_file(data_folder, tmp_path):
+    folder = shutil.copytree(data_folder, tmp_path / 'data')
+    for name in os.listdir(folder):
+        if name.startswith('x_coordinates'):
+            os.remove(folder / name)
+
+    runner = BatchRunner(
+        config={'data_folder_path': str(folder),
+                'datasets': [{'name': 'who_bcg', 'origin': 'who', 'index_type': 'BCG'}]},
+        results_dir=str(tmp_path / 'results'),
+        use_processes=False
+    )
+    service = QueryService(runner=runner)
+    service.run()
+
+    dates = [f'2021-03-{day:02d}' for day in range(1, 17)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(
+            lambda date: service.query(preparer_type='group',
+                                       params={'dataset': 'who_bcg', 'dates': [date]}),
+            dates
+        ))
+
+    with open(folder / 'x_coordinates.json') as f:
+        saved = json.load(f)['coordinates']
+    for response in responses:
+        assert response['runs'][0]['x_coordinates'] == saved
+
+
+def test_derived_series_are_computed_once_per_key(monkeypatch):
+    calculate = DerivedSeriesCalculator.calculate
+    calls = []
+
+    def slow_calculate(data, kind):
+        calls.append(kind)
+        time.sleep(0.05)
+        return calculate(data=data, kind=kind)
+
+    monkeypatch.setattr(DerivedSeriesCalculator, 'calculate', staticmethod(slow_calculate))
+    data_if = DataInterface(data={'deaths_df': pd.DataFrame({'A': range(30), 'B': range(30)},
+                                                            index=pd.date_range('2020-03-01', periods=30))})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda data_type: data_if.get_series(data_type=data_type),
+                                    ['deaths_new', 'deaths_rolling_7'] * 8))
+
+    assert sorted(calls) == ['new', 'rolling_7']
+    assert all(result is results[i % 2] for i, result in enumerate(results))
+
+
+def test_concurrent_identical_queries_run_the_preparer_once(data_folder, tmp_path, monkeypatch):
+    runner = BatchRunner(
+        config={'data_folder_path': data_folder,
+                'datasets': [{'name': 'who_bcg', 'origin': 'who', 'index_type': 'BCG'}]},
+        results_dir=str(tmp_path),
+        use_processes=False
+    )
+    service = QueryService(runner=runner)
+    service.run()
+
+    run_preparer = runner.run_preparer
+    calls = []
+
+    def counted_run_preparer(preparer_config):
+        calls.append(preparer_config)
+        time.sleep(0.05)
+        return run_preparer(preparer_config=preparer_config)
+
+    monkeypatch.setattr(runner, 'run_preparer', counted_run_preparer)
+    params = {'dataset': 'who_bcg', 'dates': ['2021-03-01']}
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(
+            lambda _: service.query(preparer_type='group', params=params), range(8)
+        ))
+
+    assert len(calls) == 1
+    assert sum(not response['cached'] for response in responses) == 1
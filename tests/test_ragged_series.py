@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from src.analysis.data_aligner import DataAligner
+from src.analysis.linear_regression_plot_preparer import LinearRegressionPlotPreparer
+from src.data_handling.dataloader import DataLoader
+from src.data_handling.pipeline_orchestrator import run_handler
+
+
+def get_data() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    values = np.cumsum(rng.poisson(2, (40, 5)), axis=0).astype(float)
+    for j, start in enumerate([0, 5, 20, 39, 40]):
+        values[:start, j] = 0
+
+    return pd.DataFrame(values, index=pd.date_range('2020-03-01', periods=40),
+                        columns=list('ABCDE'))
+
+
+def test_ragged_series_matches_dense_alignment():
+    data = get_data()
+    for threshold in [None, 30]:
+        ragged = DataAligner.align_data_ragged(data=data, threshold=threshold)
+        dense = DataAligner.align_data(data=data, threshold=threshold)
+
+        pd.testing.assert_frame_equal(ragged.to_frame(n_rows=len(data)), dense)
+        offsets = [0, 3, 19, 25, 39, 60]
+        pd.testing.assert_frame_equal(ragged.take(offsets=offsets), dense.reindex(offsets))
+        for offset in [-1, 0, 19, 39, 40]:
+            pd.testing.assert_series_equal(ragged.at(offset=offset),
+                                           dense.reindex([offset]).iloc[0], check_names=False)
+
+
+def test_y_matrix_of_days_after_alignment(data_folder):
+    data_if = run_handler(dataset_origin='johns_hopkins',
+                          dl=DataLoader(data_folder_path=data_folder,
+                                        dataset_origin='johns_hopkins', index_type='BCG'),
+                          handler_options={})
+    preparer = LinearRegressionPlotPreparer(data_if=data_if, countries_type='all',
+                                            do_align_data=True, prepare_for_log_plot=False)
+
+    days = [10, 100, 300, 2000]
+    y_matrix = preparer.get_y_matrix(days_after_alignment=days)
+    expected = DataAligner.align_data(data=preparer.filter_data()).reindex(days)
+
+    pd.testing.assert_frame_equal(y_matrix, expected)
+    assert y_matrix.loc[2000].isna().all()
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from src.analysis.regression_estimators import RegressionEstimators
+
+
+def get_inputs(tied: bool) -> tuple:
+    rng = np.random.default_rng(0)
+    x = rng.integers(0, 4, 30).astype(float) if tied else rng.uniform(0, 4, 30)
+    y = x[:, None] * 0.3 + rng.normal(0, 1, (30, 6))
+    if tied:
+        y = np.round(y)
+    y[[2, 5, 11], 1] = np.nan
+    y[:, 2] = np.nan
+    y[:3, 2] = [1., 2., 3.]
+
+    return x, y
+
+
+def columns(x: np.ndarray, y: np.ndarray):
+    for column in range(y.shape[1]):
+        valid = np.isfinite(y[:, column])
+        yield column, x[valid], y[valid, column]
+
+
+@pytest.mark.parametrize('tied', [False, True])
+def test_kendall_matches_scipy(tied):
+    x, y = get_inputs(tied=tied)
+    result = RegressionEstimators.kendall(x=x, y=y)
+
+    for column, x_valid, y_valid in columns(x=x, y=y):
+        expected = stats.kendalltau(x_valid, y_valid, method='asymptotic')
+        assert result['tau'][column] == pytest.approx(expected.statistic)
+        assert result['p_value'][column] == pytest.approx(expected.pvalue, nan_ok=True)
+
+
+@pytest.mark.parametrize('tied', [False, True])
+def test_spearman_matches_scipy(tied):
+    x, y = get_inputs(tied=tied)
+    result = RegressionEstimators.spearman(x=x, y=y)
+
+    for column, x_valid, y_valid in columns(x=x, y=y):
+        expected = stats.spearmanr(x_valid, y_valid)
+        assert result['rho'][column] == pytest.approx(expected.statistic)
+        if len(x_valid) >= 3:
+            assert result['p_value'][column] == pytest.approx(expected.pvalue)
+
+
+@pytest.mark.parametrize('tied', [False, True])
+def test_theil_sen_matches_scipy(tied):
+    x, y = get_inputs(tied=tied)
+    result = RegressionEstimators.theil_sen(x=x, y=y)
+
+    for column, x_valid, y_valid in columns(x=x, y=y):
+        slope = stats.theilslopes(y_valid, x_valid).slope
+        assert result['slope'][column] == pytest.approx(slope)
+        assert result['intercept'][column] == pytest.approx(np.median(y_valid - slope * x_valid))
+        assert result['n'][column] == len(y_valid)
@@ -0,0 +1,88 @@
+import shutil
+
+import pandas as pd
+
+from src.data_handling.dataloader import DataLoader
+from src.data_handling.pipeline_orchestrator import run_handler
+from src.stage_graph import StageGraph, build_regression_graph
+
+
+def get_regression(data_folder: str, handler_options: dict) -> pd.DataFrame:
+    graph = build_regression_graph(data_folder_path=data_folder, dataset_origin='johns_hopkins',
+                                   index_type='vodka', handler_options=handler_options,
+                                   labels=[50, 100])
+
+    return graph.run(name='regression')
+
+
+def test_handler_options_only_recompute_the_index_stage(data_folder):
+    graph = build_regression_graph(data_folder_path=data_folder, dataset_origin='johns_hopkins',
+                                   index_type='vodka', labels=[50, 100])
+    graph.run(name='regression')
+    assert graph.computed == ['loader', 'handler', 'indices', 'alignment', 'regression']
+
+    graph.set_params('indices', handler_options={'take_log_of_vodka': True})
+    result = graph.run(name='regression')
+    assert graph.computed == ['indices', 'alignment', 'regression']
+
+    # same result as a graph built with the option from the start
+    pd.testing.assert_frame_equal(
+        result, get_regression(data_folder=data_folder,
+                               handler_options={'take_log_of_vodka': True})
+    )
+
+
+def test_index_stage_matches_the_handler(data_folder):
+    graph = build_regression_graph(data_folder_path=data_folder, dataset_origin='who',
+                                   index_type='BCG')
+    data_if = graph.run(name='indices')
+
+    expected = run_handler(dataset_origin='who',
+                           dl=DataLoader(data_folder_path=data_folder, dataset_origin='who',
+                                         index_type='BCG'),
+                           handler_options={})
+    pd.testing.assert_frame_equal(data_if.deaths_df, expected.deaths_df)
+    assert data_if.index_all_countries_dict == expected.index_all_countries_dict
+    assert data_if.index_similar_countries_dict == expected.index_similar_countries_dict
+
+
+def test_fingerprint_depends_on_the_code():
+    namespace = {}
+    exec('def stage(x=1):\n    return x\n', namespace)
+    first = namespace['stage']
+    exec('def stage(x=1):\n    return x + 1\n', namespace)
+    second = namespace['stage']
+
+    graph = StageGraph()
+    graph.add_node(name='stage', function=first, params={'x': 1})
+    fingerprint = graph.get_fingerprint(name='stage')
+
+    graph.add_node(name='stage', function=second, params={'x': 1})
+    assert graph.get_fingerprint(name='stage') != fingerprint
+
+    graph.add_node(name='stage', function=first, params={'x': 1})
+    assert graph.get_fingerprint(name='stage') == fingerprint
+    graph.code_version = 'edited'
+    assert graph.get_fingerprint(name='stage') != fingerprint
+
+
+def test_changed_data_files_are_not_read_from_the_disk_cache(data_folder, tmp_path):
+    folder = shutil.copytree(data_folder, tmp_path / 'data')
+    cache_dir = str(tmp_path / 'cache')
+
+    graph = build_regression_graph(data_folder_path=str(folder), dataset_origin='who',
+                                   index_type='BCG', cache_dir=cache_dir)
+    graph.run(name='loader')
+    assert graph.computed == ['loader']
+
+    graph = build_regression_graph(data_folder_path=str(folder), dataset_origin='who',
+                                   index_type='BCG', cache_dir=cache_dir)
+    graph.run(name='loader')
+    assert graph.computed == []
+
+    meta_data = pd.read_csv(folder / 'meta.csv')
+    meta_data.iloc[:-1].to_csv(folder / 'meta.csv', index=False)
+    graph = build_regression_graph(data_folder_path=str(folder), dataset_origin='who',
+                                   index_type='BCG', cache_dir=cache_dir)
+    graph.run(name='loader')
+    assert graph.computed == ['loader']